@@ -1,7 +1,13 @@
+from datetime import date
 from flask import Blueprint, jsonify, request, current_app
-from models import Item, User
+from models import Item, Staff, User
 from extensions import db
 from functools import wraps
+from pagination import keyset_paginate, InvalidCursor
+from http_cache import conditional, make_etag
+from report_cache import data_version
+from sync import item_changes, CursorExpired
+from storage_utils import release_image
 
 bp = Blueprint("api", __name__)
 
@@ -29,47 +35,183 @@ def token_auth_required(f):
 
 # --- LIST ITEMS ---
 @bp.route("/items", methods=["GET"])
+@token_auth_required
 def list_items():
-    page = request.args.get("page", 1, type=int)
-    per_page = current_app.config.get("ITEMS_PER_PAGE", 20)
+    """
+    Lists the token owner's items.
 
-    items = Item.query.order_by(Item.created_at.desc()).paginate(
-        page=page, per_page=per_page
-    )
+    Keyset pagination by default: follow `next_cursor` until it is null.
+    Each page is a range scan on ix_item_user_created (user_id, created_at, id).
+    Passing ?page=N keeps the legacy page-number response.
+    Optional ?total=exact|approx adds a total; approx is a planner estimate
+    on Postgres and falls back to an exact COUNT on other databases.
+    """
+    # Any write to the user's items bumps their data version, so an unchanged
+    # version + query string means the same JSON: answer 304 without querying.
+    etag = make_etag("items", request.user.id, data_version(request.user.id),
+                     sorted(request.args.items(multi=True)))
+    return conditional(etag, _list_items)
+
+
+def _list_items():
+    per_page = max(1, min(
+        request.args.get("per_page", current_app.config.get("ITEMS_PER_PAGE", 20), type=int),
+        current_app.config.get("API_MAX_PER_PAGE", 100),
+    ))
+    page = request.args.get("page", type=int)
+    query = Item.query.filter_by(user_id=request.user.id)
+
+    if page is not None:
+        items = query.order_by(Item.created_at.desc(), Item.id.desc()).paginate(
+            page=page, per_page=per_page
+        )
+
+        return jsonify(
+            {
+                "items": [i.to_dict() for i in items.items],
+                "total": items.total,
+                "page": items.page,
+                "pages": items.pages,
+            }
+        )
+
+    total = request.args.get("total")
+    if total not in ("exact", "approx"):
+        total = None
+
+    try:
+        items = keyset_paginate(
+            query, Item, cursor=request.args.get("cursor"), per_page=per_page, total=total
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
     return jsonify(
         {
             "items": [i.to_dict() for i in items.items],
+            "next_cursor": items.next_cursor,
+            "prev_cursor": items.prev_cursor,
             "total": items.total,
-            "page": items.page,
-            "pages": items.pages,
         }
     )
 
 
+# --- DELTA SYNC ---
+@bp.route("/items/changes", methods=["GET"])
+@token_auth_required
+def items_changes():
+    """
+    Inserts, updates and deletes since ?since=<cursor>, oldest first.
+
+    Start without a cursor (everything), store `next_cursor`, and call
+    again right away while `has_more` is true; otherwise poll later with
+    the same cursor. 410 means the cursor is too old: resync from scratch.
+    """
+    try:
+        changes, next_cursor, has_more = item_changes(
+            request.user.id, since=request.args.get("since"), limit=request.args.get("limit", type=int)
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except CursorExpired:
+        return jsonify({"error": "Cursor expired, full resync required"}), 410
+
+    return jsonify({"changes": changes, "next_cursor": next_cursor, "has_more": has_more})
+
+
 # --- GET SINGLE ITEM ---
 @bp.route("/items/<int:item_id>", methods=["GET"])
+@token_auth_required
 def get_item(item_id):
-    item = Item.query.get_or_404(item_id)
-    return jsonify(item.to_dict())
+    item = Item.query.filter_by(id=item_id, user_id=request.user.id).first()
+    if item is None:
+        return jsonify({"error": "Item not found"}), 404
+    etag = make_etag("item", item.id, item.updated_at)
+    return conditional(etag, lambda: jsonify(item.to_dict()), last_modified=item.updated_at)
+
+
+# --- FIELD VALIDATION ---
+# field -> max length, for the free-text columns
+TEXT_FIELDS = {
+    "name": 120, "description": None, "category": 80,
+    "serial_number": 100, "reference_code": 100,
+}
+
+
+def _is_id(value):
+    # JSON true / false are ints to Python, but never valid ids
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _apply_fields(item, data, staff_by_id):
+    """Copies the writable fields present in `data` onto `item`; returns an error or None."""
+    for field, max_length in TEXT_FIELDS.items():
+        if field in data:
+            value = data[field]
+            if value is not None and not isinstance(value, str):
+                return f"'{field}' must be a string"
+            if max_length and value and len(value) > max_length:
+                return f"'{field}' is longer than {max_length} characters"
+            if field != "name":
+                value = value or None  # "" clears optional fields
+            setattr(item, field, value)
+    if not item.name:
+        return "Field 'name' is required"
+
+    if "quantity" in data:
+        quantity = data["quantity"]
+        if not _is_id(quantity):  # no silent truncation of 1.9 or "3"
+            return "'quantity' must be an integer"
+        if not 0 <= quantity <= 100000:
+            return "'quantity' must be between 0 and 100000"
+        item.quantity = quantity
+
+    if "assigned_date" in data:
+        try:
+            item.assigned_date = date.fromisoformat(data["assigned_date"]) if data["assigned_date"] else None
+        except (TypeError, ValueError):
+            return "'assigned_date' must be an ISO date (YYYY-MM-DD)"
+
+    if "assigned_staff_id" in data:
+        staff_id = data["assigned_staff_id"]
+        if staff_id is not None and not _is_id(staff_id):
+            return "'assigned_staff_id' must be an integer or null"
+        if staff_id is not None and staff_id not in staff_by_id:
+            return f"Unknown staff member {staff_id!r}"
+        item.set_assigned_staff(staff_by_id.get(staff_id))
+    return None
+
+
+def _staff_by_id(user_id, rows):
+    """The user's staff referenced by `rows`, in one query."""
+    ids = {r.get("assigned_staff_id") for r in rows if _is_id(r.get("assigned_staff_id"))}
+    if not ids:
+        return {}
+    return {s.id: s for s in Staff.query.filter(Staff.user_id == user_id, Staff.id.in_(ids))}
+
+
+def _batch_rows(key):
+    """The list under `key` in the JSON body, or an error response."""
+    data = request.get_json(silent=True) or {}
+    rows = data.get(key)
+    if not isinstance(rows, list) or not rows:
+        return None, (jsonify({"error": f"'{key}' must be a non-empty list"}), 400)
+    limit = current_app.config.get("API_BATCH_MAX_ITEMS", 500)
+    if len(rows) > limit:
+        return None, (jsonify({"error": f"At most {limit} {key} per request"}), 413)
+    return rows, None
 
 
 # --- CREATE ITEM ---
 @bp.route("/items", methods=["POST"])
 @token_auth_required
 def create_item():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
 
-    if "name" not in data:
-        return jsonify({"error": "Field 'name' is required"}), 400
-
-    item = Item(
-        name=data.get("name"),
-        description=data.get("description", ""),
-        quantity=int(data.get("quantity", 0)),
-        price=float(data.get("price", 0.0)),
-        owner_id=request.user.id,
-    )
+    item = Item(user_id=request.user.id, quantity=0)
+    error = _apply_fields(item, data, _staff_by_id(request.user.id, [data]))
+    if error:
+        return jsonify({"error": error}), 400
 
     db.session.add(item)
     db.session.commit()
@@ -77,6 +219,96 @@ def create_item():
     return jsonify(item.to_dict()), 201
 
 
+# --- BATCH WRITES ---
+# Each batch is one transaction: every row is validated first and nothing is
+# written unless all of them are valid. Errors are reported by list index.
+@bp.route("/items/batch", methods=["POST"])
+@token_auth_required
+def create_items_batch():
+    rows, error = _batch_rows("items")
+    if error:
+        return error
+
+    staff_by_id = _staff_by_id(request.user.id, [r for r in rows if isinstance(r, dict)])
+    items, errors = [], []
+    for index, row in enumerate(rows):
+        item = Item(user_id=request.user.id, quantity=0)
+        problem = _apply_fields(item, row, staff_by_id) if isinstance(row, dict) else "Expected an object"
+        if problem:
+            errors.append({"index": index, "error": problem})
+        items.append(item)
+    if errors:
+        db.session.rollback()
+        return jsonify({"errors": errors}), 400
+
+    db.session.add_all(items)
+    db.session.commit()
+    return jsonify({"items": [i.to_dict() for i in items]}), 201
+
+
+@bp.route("/items/batch", methods=["PATCH"])
+@token_auth_required
+def update_items_batch():
+    rows, error = _batch_rows("items")
+    if error:
+        return error
+
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"index": index, "error": "Expected an object"})
+        elif not _is_id(row.get("id")):
+            errors.append({"index": index, "error": "'id' must be an integer"})
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    ids = [r["id"] for r in rows]
+    existing = {
+        i.id: i for i in Item.query.filter(Item.user_id == request.user.id, Item.id.in_(ids))
+    }
+    staff_by_id = _staff_by_id(request.user.id, rows)
+
+    for index, row in enumerate(rows):
+        item = existing.get(row["id"])
+        problem = "Item not found" if item is None else _apply_fields(item, row, staff_by_id)
+        if problem:
+            errors.append({"index": index, "id": row["id"], "error": problem})
+    if errors:
+        db.session.rollback()  # undo the changes applied to the valid rows
+        return jsonify({"errors": errors}), 400
+
+    db.session.commit()
+    return jsonify({"items": [existing[i].to_dict() for i in ids]})
+
+
+@bp.route("/items/batch", methods=["DELETE"])
+@token_auth_required
+def delete_items_batch():
+    ids, error = _batch_rows("ids")
+    if error:
+        return error
+
+    invalid = [index for index, i in enumerate(ids) if not _is_id(i)]
+    if invalid:
+        return jsonify({"errors": [{"index": index, "error": "ids must be integers"} for index in invalid]}), 400
+
+    items = Item.query.filter(Item.user_id == request.user.id, Item.id.in_(ids)).all()
+    found = {i.id for i in items}
+    missing = [(index, i) for index, i in enumerate(ids) if i not in found]
+    if missing:
+        return jsonify({"errors": [{"index": index, "id": i, "error": "Item not found"}
+                                   for index, i in missing]}), 404
+
+    images = {i.image_filename for i in items} - {None}
+    for item in items:
+        # ORM deletes, so tombstones and data versions are recorded
+        db.session.delete(item)
+    db.session.commit()
+    for image in images:
+        release_image("uploads", image)
+    return jsonify({"deleted": sorted(found)})
+
+
 # --- GET TOKEN ---
 @bp.route("/token", methods=["POST"])
 def get_token():
@@ -92,6 +324,9 @@ def get_token():
     if not user or not user.check_password(password):
         return jsonify({"error": "Invalid username or password"}), 401
 
+    if not user.is_approved:
+        return jsonify({"error": "Account pending approval"}), 403
+
     token = user.generate_api_token()
 
     return jsonify(
@@ -2,7 +2,7 @@
 import os
 from flask import Flask
 from config import Config
-from extensions import db, login_manager, mail
+from extensions import db, login_manager, mail, migrate
 import pytz
 
 def create_app(test_config=None):
@@ -19,10 +19,29 @@ def create_app(test_config=None):
     # Make pytz available in Jinja templates
     app.jinja_env.globals['pytz'] = pytz
 
+    # Pool sizing / pre-ping / recycle, unless set explicitly
+    import db_pool
+    if "SQLALCHEMY_ENGINE_OPTIONS" not in app.config:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = db_pool.engine_options(app.config)
+
     # Initialize extensions
     db.init_app(app)
+    db_pool.init_app(app, db)
     login_manager.init_app(app)
     mail.init_app(app)
+    import email_utils
+    email_utils.init_app(app)
+    import pdf_render
+    pdf_render.init_app(app)
+    migrate.init_app(app, db)
+
+    # Caches the logged-in user between requests
+    import user_cache
+    user_cache.init_app(app)
+
+    # Full-text search: registers the FTS / GIN DDL hooks before create_all()
+    import search_index
+    search_index.init_app(app)
 
     # Register blueprints
     from main import bp as main_bp
@@ -30,12 +49,33 @@ def create_app(test_config=None):
     from dashboard import dashboard as dashboard_bp
     from profile import profile as profile_bp
     from reports import reports_bp # New reports blueprint
+    from api import bp as api_bp
+    from jobs import jobs_bp, init_app as init_jobs
+    import imports  # registers the import job handlers
+    import sync  # records deleted items for the delta sync API
+    import summary  # keeps the per-user inventory rollups current
+    summary.init_app(app)
 
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(dashboard_bp, url_prefix="/dashboard")
     app.register_blueprint(profile_bp, url_prefix="/profile")
     app.register_blueprint(reports_bp) # Register at root or /reports
+    app.register_blueprint(api_bp, url_prefix="/api")
+    app.register_blueprint(jobs_bp)
+    init_jobs(app)
+
+    # /health (liveness, for Koyeb) and /health/ready (readiness checks)
+    from health import health_bp
+    app.register_blueprint(health_bp)
+
+    # Resized item photos / avatars
+    import images
+    images.init_app(app)
+
+    # Opt-in request / query profiling
+    import profiler
+    profiler.init_app(app)
 
     # Create / update database schema (not in tests)
     # If models change after a first run, this ensures missing tables are created.
@@ -43,11 +83,6 @@ def create_app(test_config=None):
         with app.app_context():
             db.create_all()
 
-    # Health check endpoint for Koyeb
-    @app.route('/health')
-    def health_check():
-        return {'status': 'healthy'}, 200
-
     return app
 
 
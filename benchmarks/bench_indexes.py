@@ -0,0 +1,161 @@
+"""
+Benchmark the per-user hot queries with and without the composite indexes.
+
+Seeds a throw-away database with items and staff spread across several
+tenants, then runs the queries behind ``main.index()``, ``dashboard.home()``
+and ``reports`` twice: once with the secondary indexes dropped and once with
+them in place. For each query the plan and the median latency are printed.
+
+Usage:
+    python benchmarks/bench_indexes.py                     # SQLite temp file
+    python benchmarks/bench_indexes.py --items 200000
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_indexes.py
+
+Never point BENCH_DATABASE_URL at a real database: all tables are dropped.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text, insert
+
+from app import create_app
+from extensions import db
+from models import User, Item, Staff
+
+
+CATEGORIES = ["mobilier", "informatique", "audiovisuel", "electromenager", "electricite", None]
+
+# (label, SQL) pairs mirroring the ORM queries issued by the views.
+QUERIES = [
+    ("index: latest page",
+     "SELECT id FROM item WHERE user_id = :uid ORDER BY created_at DESC, id DESC LIMIT 6"),
+    ("index: total count",
+     "SELECT count(*) FROM item WHERE user_id = :uid"),
+    ("index/dashboard: low stock count",
+     "SELECT count(*) FROM item WHERE user_id = :uid AND quantity < 5"),
+    ("reports: items of one staff",
+     "SELECT id FROM item WHERE user_id = :uid AND assigned_to = :staff"),
+    ("reports: distinct categories",
+     "SELECT DISTINCT category FROM item WHERE user_id = :uid AND category IS NOT NULL"),
+    ("staff list",
+     "SELECT id FROM staff WHERE user_id = :uid ORDER BY name"),
+]
+
+
+def seed(n_items, n_users, n_staff):
+    now = datetime.utcnow()
+    users = [{"username": f"bench{u}", "password_hash": "x", "is_approved": True} for u in range(n_users)]
+    db.session.execute(insert(User), users)
+    user_ids = [u.id for u in User.query.order_by(User.id).all()]
+
+    staff_rows = []
+    for uid in user_ids:
+        for s in range(n_staff):
+            staff_rows.append({"name": f"Staff {s:04d}", "user_id": uid, "created_at": now})
+    db.session.execute(insert(Staff), staff_rows)
+
+    rng = random.Random(42)
+    batch = []
+    for i in range(n_items):
+        batch.append({
+            "name": f"Item {i}",
+            "quantity": rng.randint(0, 200),
+            "category": rng.choice(CATEGORIES),
+            "assigned_to": f"Staff {rng.randrange(n_staff):04d}" if rng.random() < 0.6 else None,
+            "serial_number": f"SN-{i:08d}",
+            "user_id": rng.choice(user_ids),
+            "created_at": now - timedelta(minutes=i),
+        })
+        if len(batch) == 5000:
+            db.session.execute(insert(Item), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Item), batch)
+    db.session.commit()
+    return user_ids
+
+
+def explain(sql, params):
+    if db.engine.dialect.name == "postgresql":
+        rows = db.session.execute(text("EXPLAIN ANALYZE " + sql), params).all()
+        return "\n".join(r[0] for r in rows)
+    rows = db.session.execute(text("EXPLAIN QUERY PLAN " + sql), params).all()
+    return "\n".join(r[-1] for r in rows)
+
+
+def time_query(sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.session.execute(text(sql), params).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_suite(label, user_ids, repeat):
+    print(f"\n=== {label} ===")
+    results = {}
+    params = {"uid": user_ids[len(user_ids) // 2], "staff": "Staff 0003"}
+    for name, sql in QUERIES:
+        ms = time_query(sql, params, repeat)
+        results[name] = ms
+        print(f"\n-- {name}: {ms:.3f} ms (median of {repeat})")
+        print(explain(sql, params))
+    return results
+
+
+def index_objects():
+    for table in (Item.__table__, Staff.__table__):
+        for index in table.indexes:
+            yield index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--staff", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=25)
+    args = parser.parse_args()
+
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": url})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        print(f"Seeding {args.items} items for {args.users} users on {db.engine.dialect.name}...")
+        user_ids = seed(args.items, args.users, args.staff)
+
+        for index in index_objects():
+            index.drop(db.engine)
+        db.session.execute(text("ANALYZE"))
+        before = run_suite("without composite indexes", user_ids, args.repeat)
+
+        for index in index_objects():
+            index.create(db.engine)
+        db.session.execute(text("ANALYZE"))
+        after = run_suite("with composite indexes", user_ids, args.repeat)
+
+        print("\n=== summary (median ms) ===")
+        print(f"{'query':40} {'before':>10} {'after':>10} {'speedup':>8}")
+        for name, _sql in QUERIES:
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            print(f"{name:40} {before[name]:10.3f} {after[name]:10.3f} {speedup:7.1f}x")
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
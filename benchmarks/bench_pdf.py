@@ -0,0 +1,122 @@
+"""
+Benchmark PDF report rendering inline vs in the PDF worker pool.
+
+Renders the global report template for a table of --rows rows, --renders
+times from --threads threads (like concurrent report jobs on one worker),
+once with PDF_WORKERS = 0 (xhtml2pdf in the calling thread) and once with
+the pool. A last run renders the same rows in parts of --chunk rows that
+are merged afterwards (the chunked global report). Meanwhile a "ping"
+thread wakes up every 10 ms, standing in for the other requests served by
+the same process; its worst delay shows how long they were frozen behind
+the GIL.
+
+Usage:
+    python benchmarks/bench_pdf.py
+    python benchmarks/bench_pdf.py --rows 5000 --renders 4 --workers 4
+    python benchmarks/bench_pdf.py --rows 20000 --renders 1 --chunk 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import render_template
+
+from app import create_app
+from pdf_render import PdfRenderer
+from reports import _global_pdf_parts
+
+HEADERS = ["Article", "Catégorie", "Quantité", "Assigné à", "Date de création"]
+
+
+def build_rows(rows):
+    return [(f"Article {i}", "informatique", i % 50, f"Staff {i % 40}", "2024-01-01") for i in range(rows)]
+
+
+def build_html(app, rows):
+    with app.test_request_context():
+        return render_template("reports/global_pdf.html", data=[dict(zip(HEADERS, r)) for r in build_rows(rows)],
+                               headers=HEADERS, date=datetime.now(), column_count=len(HEADERS),
+                               first=True, last=True)
+
+
+def build_parts(app, rows, chunk):
+    with app.test_request_context():
+        return list(_global_pdf_parts(iter(build_rows(rows)), HEADERS, chunk))
+
+
+class Ping(threading.Thread):
+    """Records how late a 10 ms timer fires while renders are running."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.worst = 0.0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            start = time.perf_counter()
+            time.sleep(0.01)
+            self.worst = max(self.worst, time.perf_counter() - start - 0.01)
+
+
+def run(app, html, workers, renders, threads, out_dir, parts=None):
+    app.config["PDF_WORKERS"] = workers
+    renderer = PdfRenderer(app)
+    if workers:
+        renderer.render("<p>warm-up</p>", os.path.join(out_dir, "warmup.pdf"))  # start the processes
+
+    ping = Ping()
+    ping.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        futures = []
+        for n in range(renders):
+            dest = os.path.join(out_dir, f"{workers}-{n}-{bool(parts)}.pdf")
+            if parts:
+                futures.append(pool.submit(renderer.render_parts, parts, dest))
+            else:
+                futures.append(pool.submit(renderer.render, html, dest))
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    ping.stopped.set()
+    ping.join()
+    renderer.close()
+    return elapsed, ping.worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--renders", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--chunk", type=int, default=1000, help="rows per part in the chunked run")
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "PDF_MAX_PENDING": args.renders * args.workers})
+    html = build_html(app, args.rows)
+    parts = build_parts(app, args.rows, args.chunk)
+    print(f"{args.renders} renders of {args.rows} rows from {args.threads} threads")
+
+    runs = [
+        ("inline", 0, None),
+        (f"pool ({args.workers} workers)", args.workers, None),
+        (f"pool, {len(parts)} parts", args.workers, parts),
+    ]
+    with tempfile.TemporaryDirectory() as out_dir:
+        for label, workers, chunks in runs:
+            elapsed, worst = run(app, html, workers, args.renders, args.threads, out_dir, chunks)
+            print(f"{label:<22} {elapsed:7.2f}s  {args.renders / elapsed:6.2f} PDF/s  "
+                  f"worst ping delay {worst * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,8 +25,99 @@ class Config:
     SQLALCHEMY_DATABASE_URI = uri
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool (Postgres only, see db_pool.engine_options). Sized per
+    # gunicorn worker: one connection per thread, plus DB_MAX_OVERFLOW.
+    WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))   # gunicorn workers
+    GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 1))
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 0)) or None  # None = GUNICORN_THREADS
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 2))
+    DB_MAX_CONNECTIONS = int(os.environ.get("DB_MAX_CONNECTIONS", 0)) or None  # cap across workers
+    DB_POOL_TIMEOUT = 10        # seconds to wait for a free connection
+    DB_POOL_RECYCLE = 280       # seconds; below Neon's 5 minute idle suspend
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 30000))
+
+    # /health/ready: results cached per process; past a threshold the check is "degraded"
+    HEALTH_CACHE_SECONDS = 5
+    HEALTH_DB_SLOW_MS = 250
+    HEALTH_POOL_SATURATION = 0.9   # checked out / (pool_size + max_overflow)
+    HEALTH_JOB_BACKLOG = 100       # runnable queued jobs
+    HEALTH_JOB_MAX_AGE = 600       # seconds the oldest runnable job has waited
+    HEALTH_MIN_FREE_MB = 500
+
     # Pagination
     ITEMS_PER_PAGE = 6
+    # Above this many rows listings switch from ?page=N (OFFSET) to ?cursor= (keyset)
+    KEYSET_PAGINATION_THRESHOLD = 1000
+    API_MAX_PER_PAGE = 100
+    STAFF_SEARCH_LIMIT = 20
+
+    # Exports
+    EXPORT_CHUNK_SIZE = 1000  # rows fetched / flushed per chunk
+    EXPORT_GZIP = True        # gzip Content-Encoding when the client accepts it
+
+    # Imports
+    IMPORT_CHUNK_SIZE = 1000  # rows validated / inserted per transaction
+    IMPORT_REPORT_DIR = None  # rejected-row reports, defaults to <instance>/import_reports
+
+    # Background jobs (imports, reports)
+    # Off: jobs run inside the request. On: a `jobs-worker` process picks them up.
+    JOBS_ASYNC = os.environ.get("JOBS_ASYNC", "false").lower() in ("1", "true", "yes")
+    JOBS_DIR = os.environ.get("JOBS_DIR")  # uploads / results, defaults to <instance>/jobs
+    JOBS_RETRY_BACKOFF = 30    # seconds before the first retry, doubled each time
+    JOBS_STALE_AFTER = 3600    # a 'running' job older than this is considered abandoned
+    JOBS_RESULT_TTL = 86400    # finished jobs and their files are purged after this
+
+    # Report artifact cache (PDF / Excel), reused until the user's data changes
+    REPORT_CACHE_DIR = os.environ.get("REPORT_CACHE_DIR")  # defaults to <instance>/report_cache
+    REPORT_CACHE_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # 0 disables
+
+    # PDF rendering pool (pdf_render.py): xhtml2pdf runs in separate processes
+    # so a large report doesn't hold the GIL of a web / job worker.
+    PDF_WORKERS = int(os.environ.get("PDF_WORKERS", 2))  # 0 renders in the calling thread
+    PDF_MAX_PENDING = 8           # renders running or waiting per process
+    PDF_QUEUE_TIMEOUT = 5         # seconds to wait for a slot before PdfBusy
+    PDF_TIMEOUT = int(os.environ.get("PDF_TIMEOUT", 120))  # the worker is killed after this
+    PDF_MAX_MEMORY_MB = int(os.environ.get("PDF_MAX_MEMORY_MB", 1024))  # per worker, 0 = no cap
+    PDF_MAX_TASKS_PER_CHILD = 50  # workers are recycled to bound leaks
+    PDF_START_METHOD = "spawn"    # no fork() from a multi-threaded process
+    GLOBAL_PDF_CHUNK_ROWS = 1000  # global report rows per part, parts are rendered in parallel
+
+    # Profiling (opt-in): Server-Timing header, /admin/profiler, slow-query log
+    PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+    SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", 200))
+    PROFILER_DUPLICATE_THRESHOLD = 5  # same statement this many times in one request is logged
+    PROFILER_HISTORY = 200            # requests kept in memory per process
+
+    # Logged-in user cache: "local" (per process), an import path to a shared
+    # backend class, or "" to query the user on every request
+    USER_CACHE_BACKEND = os.environ.get("USER_CACHE_BACKEND", "local")
+    USER_CACHE_TTL = 60       # seconds; bounds staleness across processes
+    USER_CACHE_MAXSIZE = 1024
+
+    # Delta sync (/api/items/changes)
+    SYNC_BATCH_SIZE = 500          # changes per response, at most
+    SYNC_SETTLE_SECONDS = 5        # rows younger than this wait for the next poll
+    SYNC_TOMBSTONE_TTL_DAYS = 30   # deletions remembered; older cursors must resync
+
+    # Conditional GET (http_cache.py). Part of every ETag; defaults to the
+    # templates' last modification time so a deploy invalidates rendered pages.
+    HTTP_CACHE_VERSION = os.environ.get("HTTP_CACHE_VERSION")
+
+    # Image derivatives (thumbnail / medium, JPEG + WebP)
+    IMAGE_DERIVATIVES_EAGER = True   # build at upload time; otherwise on first request
+    IMAGE_CACHE_MAX_AGE = 31536000   # content-addressed names never change meaning
+
+    # Remote image store. Uploads are saved locally, then pushed by a
+    # "remote_upload" job. "cloudinary", "stub" (copies to REMOTE_STUB_DIR,
+    # for development/tests) or "" for local only; unset = Cloudinary if configured.
+    REMOTE_STORAGE = os.environ.get("REMOTE_STORAGE")
+    REMOTE_STUB_DIR = os.environ.get("REMOTE_STUB_DIR", "remote_stub")
+    REMOTE_STUB_BASE_URL = os.environ.get("REMOTE_STUB_BASE_URL", "http://remote.invalid")
+    REMOTE_UPLOAD_MAX_ATTEMPTS = 5   # retried with the JOBS_RETRY_BACKOFF schedule
+
+    # Stock alerts
+    LOW_STOCK_THRESHOLD = 5
+    LOW_STOCK_LIST_LIMIT = 10  # rows shown on the dashboard, the count is always exact
 
     # Mail Configuration
     # Mail Configuration
@@ -38,6 +129,20 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME', 'afifjouili9@gmail.com')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', 'Papa22030671')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'afifjouili9@gmail.com')
+
+    # Sender pool (email_utils.MailSender)
+    MAIL_WORKERS = 2            # sending threads per process
+    MAIL_QUEUE_SIZE = 500       # waiting messages; send_email blocks MAIL_ENQUEUE_TIMEOUT then drops
+    MAIL_ENQUEUE_TIMEOUT = 2
+    MAIL_BATCH_SIZE = 20        # messages sent over one SMTP connection
+    MAIL_MAX_ATTEMPTS = 3       # connection attempts per batch
+    MAIL_RETRY_BACKOFF = 2      # seconds before the first retry, doubled each time
     
+    # JSON API tokens (JWT, HS256)
+    JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")  # defaults to SECRET_KEY
+    JWT_ALGORITHM = "HS256"
+    JWT_EXP_DELTA_SECONDS = int(os.environ.get("JWT_EXP_DELTA_SECONDS", 3600))
+    API_BATCH_MAX_ITEMS = 500   # items per /api/items/batch request
+
     # Security
     SECURITY_PASSWORD_SALT = os.environ.get('SECURITY_PASSWORD_SALT', 'security-password-salt')
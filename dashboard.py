@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
-from extensions import db
 from models import Item
+from stats import get_inventory_stats, get_low_stock_items
 
 dashboard = Blueprint("dashboard", __name__)
 
@@ -10,12 +10,10 @@ dashboard = Blueprint("dashboard", __name__)
 def home():
 
     # Show only items that belong to logged-in user
-    total_items = Item.query.filter_by(user_id=current_user.id).count()
+    stats = get_inventory_stats(current_user.id)
 
-    low_stock = Item.query.filter(
-        Item.user_id == current_user.id,
-        Item.quantity < 5
-    ).all()
+    # Capped list; the exact count is in stats.low_stock_count
+    low_stock = get_low_stock_items(current_user.id, stats.low_stock_threshold)
 
     latest_items = Item.query.filter_by(
         user_id=current_user.id
@@ -23,7 +21,7 @@ def home():
 
     return render_template(
         "dashboard.html",
-        total_items=total_items,
+        stats=stats,
         low_stock=low_stock,
         latest_items=latest_items
     )
@@ -0,0 +1,132 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+# -----------------------------
+# INSTRUMENTED POOL
+# -----------------------------
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 2),
+                "timeouts": self.timeouts,
+                "invalidated": self.invalidated,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to get a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+# -----------------------------
+# SIZING
+# -----------------------------
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Every gunicorn worker process has its own pool, and each of its threads
+    holds at most one connection, so the pool is sized from the thread count.
+    DB_MAX_CONNECTIONS (e.g. the Postgres / Neon plan limit) caps the total
+    across WEB_CONCURRENCY workers. SQLite keeps Flask-SQLAlchemy's defaults.
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    threads = max(1, int(config.get("GUNICORN_THREADS") or 1))
+    workers = max(1, int(config.get("WEB_CONCURRENCY") or 1))
+    pool_size = config.get("DB_POOL_SIZE") or threads
+    max_overflow = config.get("DB_MAX_OVERFLOW", 2)
+
+    max_connections = config.get("DB_MAX_CONNECTIONS")
+    if max_connections:
+        per_worker = max(1, int(max_connections) // workers)
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 10),
+        # Neon / serverless Postgres closes idle connections: test each one on
+        # checkout and replace them before the server side gives up on them
+        "pool_pre_ping": True,
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 280),
+    }
+
+
+# -----------------------------
+# CONNECTION SETUP / METRICS
+# -----------------------------
+def pool_status(engine):
+    """Pool metrics for /health (no query is run)."""
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, TimedQueuePool):
+        status.update(pool.stats.as_dict())
+    return status
+
+
+def init_app(app, db):
+    timeout_ms = app.config.get("DB_STATEMENT_TIMEOUT_MS")
+
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name == "postgresql" and timeout_ms:
+        @event.listens_for(engine, "connect")
+        def _set_statement_timeout(dbapi_connection, connection_record):
+            # per connection rather than a startup option: Neon's pooler rejects those
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+            cursor.close()
+            dbapi_connection.commit()
+
+    @event.listens_for(engine, "invalidate")
+    def _count_invalidated(dbapi_connection, connection_record, exception):
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.stats.invalidated += 1
@@ -1,19 +1,134 @@
-from flask_mail import Message
+import atexit
+import queue
+import smtplib
+import threading
+import time
+import click
+from flask_mail import Message, BadHeaderError
 from flask import current_app, render_template, url_for
 from extensions import mail
-from threading import Thread
 
-def send_async_email(app, msg):
-    with app.app_context():
+
+# -----------------------------
+# SENDER POOL
+# -----------------------------
+# Errors that won't go away by retrying: the message is dropped
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, BadHeaderError)
+
+
+class MailSender:
+    """
+    MAIL_WORKERS threads fed by a bounded queue. Each worker takes up to
+    MAIL_BATCH_SIZE waiting messages and sends them over one SMTP
+    connection (mail.connect()), reconnecting with backoff on failure.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue(maxsize=app.config.get("MAIL_QUEUE_SIZE", 500))
+        self.workers = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # started on first use, so forked gunicorn workers each get their own threads
+        with self._lock:
+            if self.workers:
+                return
+            for n in range(self.app.config.get("MAIL_WORKERS", 2)):
+                worker = threading.Thread(target=self._run, name=f"mail-sender-{n}", daemon=True)
+                worker.start()
+                self.workers.append(worker)
+            atexit.register(self.close, timeout=self.app.config.get("MAIL_SHUTDOWN_TIMEOUT", 10))
+
+    def submit(self, msg):
+        """Queues a message. Returns False if the queue stayed full (message dropped)."""
+        self._start()
         try:
-            mail.send(msg)
-        except Exception as e:
-            print(f"Failed to send email: {e}")
+            self.queue.put(msg, timeout=self.app.config.get("MAIL_ENQUEUE_TIMEOUT", 2))
+        except queue.Full:
+            self.app.logger.error(f"Mail queue full, dropped email to {msg.recipients}: {msg.subject}")
+            return False
+        return True
+
+    def _run(self):
+        batch_size = self.app.config.get("MAIL_BATCH_SIZE", 20)
+        with self.app.app_context():
+            while True:
+                msg = self.queue.get()
+                if msg is None:
+                    self.queue.task_done()
+                    return
+                batch = [msg]
+                while len(batch) < batch_size:
+                    try:
+                        msg = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if msg is None:
+                        self.queue.put(None)  # another worker's stop signal
+                        self.queue.task_done()
+                        break
+                    batch.append(msg)
+                try:
+                    self._deliver(batch)
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+
+    def _deliver(self, batch):
+        pending = list(batch)
+        max_attempts = self.app.config.get("MAIL_MAX_ATTEMPTS", 3)
+        backoff = self.app.config.get("MAIL_RETRY_BACKOFF", 2)
+        failures = 0
+        while pending:
+            try:
+                with mail.connect() as conn:
+                    while pending:
+                        try:
+                            conn.send(pending[0])
+                        except PERMANENT_ERRORS as e:
+                            self.app.logger.error(f"Email to {pending[0].recipients} rejected: {e}")
+                        except smtplib.SMTPResponseException as e:
+                            if e.smtp_code < 500:
+                                raise  # temporary: reconnect and try again
+                            # this message only; the connection is still good for the others
+                            self.app.logger.error(f"Email to {pending[0].recipients} rejected: {e}")
+                        pending.pop(0)
+            except Exception as e:
+                if not pending:
+                    return  # everything was sent, only QUIT failed
+                failures += 1
+                if failures >= max_attempts:
+                    self.app.logger.error(
+                        f"Giving up on {len(pending)} email(s) after {failures} attempts: {e}")
+                    return
+                self.app.logger.warning(f"SMTP error ({e}), retrying {len(pending)} email(s)")
+                time.sleep(backoff * 2 ** (failures - 1))
+
+    def flush(self, timeout=None):
+        """Waits until every queued message has been handled (tests, shutdown)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        with self._lock:
+            workers, self.workers = self.workers, []
+        for _ in workers:
+            self.queue.put(None)
+        for worker in workers:
+            worker.join(timeout)
+
 
 def send_email(subject, recipients, text_body, html_body=None):
     # Check if email is configured
     if not current_app.config.get('MAIL_USERNAME') or not current_app.config.get('MAIL_PASSWORD'):
-        print(f"Email not configured. Would have sent to {recipients}: {subject}")
+        current_app.logger.info(f"Email not configured. Would have sent to {recipients}: {subject}")
         return
     
     msg = Message(subject, recipients=recipients)
@@ -21,8 +136,33 @@ def send_email(subject, recipients, text_body, html_body=None):
     if html_body:
         msg.html = html_body
     
-    # Send asynchronously
-    Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()
+    # Sent in the background by the sender pool
+    current_app.extensions["mail_sender"].submit(msg)
+
+
+def init_app(app):
+    app.extensions["mail_sender"] = MailSender(app)
+
+    @app.cli.command("mail-debug-server")
+    @click.option("--port", default=1025, show_default=True)
+    def mail_debug_server(port):
+        """Local SMTP server that prints what it receives (MAIL_PORT=1025, MAIL_USE_TLS=false)."""
+        from smtp_debug import DebugSMTPServer
+
+        server = DebugSMTPServer(port=port).start()
+        click.echo(f"Debug SMTP server on 127.0.0.1:{server.port}, Ctrl+C to stop")
+        seen = 0
+        try:
+            while True:
+                time.sleep(0.5)
+                for received in server.messages[seen:]:
+                    message = received["message"]
+                    click.echo(f"--- {message['Subject']} -> {', '.join(received['recipients'])}")
+                    click.echo(message.get_body(("plain", "html")).get_content())
+                seen = len(server.messages)
+        except KeyboardInterrupt:
+            server.stop()
+
 
 def send_credentials_email(user, password):
     subject = "Your Account Credentials - IWATCH-INV"
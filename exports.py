@@ -0,0 +1,99 @@
+import csv
+import zlib
+from io import StringIO
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from extensions import db
+from models import Item
+
+
+# -----------------------------
+# ITEM CSV EXPORT (STREAMED)
+# -----------------------------
+ITEM_CSV_COLUMNS = ["id", "name", "description", "quantity", "assigned_to", "assigned_date",
+                    "serial_number", "reference_code", "category", "image_filename", "created_at"]
+
+
+def _item_csv_row(row):
+    return [
+        row.id,
+        row.name,
+        row.description or "",
+        row.quantity,
+        row.assigned_to or "",
+        row.assigned_date.isoformat() if row.assigned_date else "",
+        row.serial_number or "",
+        row.reference_code or "",
+        row.category or "",
+        row.image_filename or "",
+        row.created_at.isoformat() if row.created_at else "",
+    ]
+
+
+def iter_items_csv(user_id, chunk_size=1000):
+    """
+    Yields the user's items as UTF-8 CSV, one chunk of `chunk_size` rows at a time.
+
+    Rows are fetched as plain column tuples with yield_per(), which uses a
+    server-side cursor on Postgres, so memory stays flat whatever the size
+    of the export.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ITEM_CSV_COLUMNS)
+
+    rows = db.session.query(*[getattr(Item, c) for c in ITEM_CSV_COLUMNS]) \
+        .filter(Item.user_id == user_id) \
+        .order_by(Item.id) \
+        .yield_per(chunk_size)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(_item_csv_row(row))
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """Compresses an iterable of byte chunks into a single gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# -----------------------------
+# EXCEL (WRITE-ONLY)
+# -----------------------------
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def write_xlsx(dest, sheets):
+    """
+    Writes an .xlsx workbook to `dest` (a path or a binary file object).
+
+    `sheets` is a list of (title, header, rows); `rows` can be any iterable,
+    such as a yield_per() query. openpyxl's write-only mode writes each row
+    to the sheet's temp file as it comes, instead of keeping every cell in
+    memory.
+    """
+    workbook = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        sheet = workbook.create_sheet(title=title)
+        sheet.append([_header_cell(sheet, name) for name in header])
+        for row in rows:
+            sheet.append(tuple(row))  # openpyxl rejects SQLAlchemy Row objects
+    workbook.save(dest)
+
+
+def _header_cell(sheet, name):
+    cell = WriteOnlyCell(sheet, value=name)
+    cell.font = Font(bold=True)  # as pandas' to_excel did
+    return cell
@@ -1,11 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
+from flask_migrate import Migrate
 
 # Global extensions (used by blueprints)
 db = SQLAlchemy()
 login_manager = LoginManager()
 mail = Mail()
+# render_as_batch lets ALTER-style migrations run on SQLite as well as Postgres
+migrate = Migrate(render_as_batch=True)
 
 # Where users get redirected when not logged in
 login_manager.login_view = "auth.login"
@@ -74,6 +74,11 @@ class AvatarUploadForm(FlaskForm):
 # ---------------------------
 # INVENTORY: ADD ITEM FORM
 # ---------------------------
+def _optional_int(value):
+    # "" (the "Unassigned" choice) -> None
+    return int(value) if value not in (None, "", "None") else None
+
+
 class AddItemForm(FlaskForm):
     name = StringField("Name", validators=[DataRequired(), Length(max=150)])
     description = TextAreaField("Description", validators=[Optional(), Length(max=500)])
@@ -82,7 +87,7 @@ class AddItemForm(FlaskForm):
     # Price removed
     
     # New fields
-    assigned_to = SelectField("Assigned To (Employee)", choices=[], validators=[Optional()])
+    assigned_staff_id = SelectField("Assigned To (Employee)", choices=[], coerce=_optional_int, validators=[Optional()])
     assigned_date = DateField("Assigned Date", format='%Y-%m-%d', validators=[Optional()])
 
     serial_number = StringField("Serial Number", validators=[Optional(), Length(max=100)])
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from flask import Blueprint, current_app
+from sqlalchemy import func, text
+from extensions import db
+from models import Job
+import db_pool
+
+
+health_bp = Blueprint("health", __name__)
+
+# worst status wins
+SEVERITY = {"ok": 0, "degraded": 1, "fail": 2}
+
+
+# -----------------------------
+# CHECKS
+# -----------------------------
+# Each returns a dict with at least "status". A "fail" takes the worker out
+# of rotation (503); "degraded" is reported but traffic keeps flowing.
+def _check_database(config):
+    start = time.perf_counter()
+    try:
+        db.session.execute(text("SELECT 1"))
+        db.session.rollback()  # don't keep the connection checked out
+    except Exception as e:
+        db.session.rollback()
+        return {"status": "fail", "error": f"{type(e).__name__}: {e}"[:300]}
+    ms = (time.perf_counter() - start) * 1000
+    status = "degraded" if ms > config.get("HEALTH_DB_SLOW_MS", 250) else "ok"
+    return {"status": status, "latency_ms": round(ms, 2)}
+
+
+def _check_pool(config):
+    pool = db_pool.pool_status(db.engine)
+    result = {"status": "ok", **pool}
+    if "size" in pool:
+        capacity = pool["size"] + max(0, pool["max_overflow"])
+        saturation = pool["checked_out"] / capacity if capacity else 0.0
+        result["saturation"] = round(saturation, 2)
+        if saturation >= config.get("HEALTH_POOL_SATURATION", 0.9):
+            result["status"] = "degraded"
+    return result
+
+
+def _check_uploads(config):
+    folder = os.path.join(current_app.root_path, "static", "uploads")
+    try:
+        os.makedirs(folder, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=folder, prefix=".health-"):
+            pass
+    except OSError as e:
+        return {"status": "degraded", "error": str(e)[:300]}
+    return {"status": "ok"}
+
+
+def _check_jobs(config):
+    now = datetime.utcnow()
+    backlog, oldest = db.session.query(func.count(Job.id), func.min(Job.run_after)).filter(
+        Job.status == "queued", Job.run_after <= now
+    ).one()
+    db.session.rollback()
+    age = (now - oldest).total_seconds() if oldest else 0
+    status = "ok"
+    if backlog > config.get("HEALTH_JOB_BACKLOG", 100) or age > config.get("HEALTH_JOB_MAX_AGE", 600):
+        status = "degraded"
+    return {"status": status, "backlog": backlog, "oldest_age_s": round(age)}
+
+
+def _check_disk(config):
+    usage = shutil.disk_usage(current_app.root_path)
+    free_mb = usage.free // (1024 * 1024)
+    status = "degraded" if free_mb < config.get("HEALTH_MIN_FREE_MB", 500) else "ok"
+    return {"status": status, "free_mb": free_mb}
+
+
+CHECKS = {
+    "database": _check_database,
+    "pool": _check_pool,
+    "uploads": _check_uploads,
+    "jobs": _check_jobs,
+    "disk": _check_disk,
+}
+
+
+def run_checks():
+    config = current_app.config
+    checks = {}
+    for name, check in CHECKS.items():
+        start = time.perf_counter()
+        try:
+            result = check(config)
+        except Exception as e:
+            result = {"status": "fail", "error": f"{type(e).__name__}: {e}"[:300]}
+        result["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        checks[name] = result
+
+    status = max((c["status"] for c in checks.values()), key=SEVERITY.get)
+    return {"status": status, "checked_at": datetime.utcnow().isoformat() + "Z", "checks": checks}
+
+
+# -----------------------------
+# CACHE (PER PROCESS)
+# -----------------------------
+# Each worker answers for its own connections, so results are cached per
+# process and probes hit the database at most once per HEALTH_CACHE_SECONDS.
+_cache_lock = threading.Lock()
+
+
+def cached_checks():
+    state = current_app.extensions.setdefault("health", {"expires": 0.0, "report": None})
+    with _cache_lock:
+        if state["report"] is not None and state["expires"] > time.monotonic():
+            return {**state["report"], "cached": True}
+        report = run_checks()
+        state["report"] = report
+        state["expires"] = time.monotonic() + current_app.config.get("HEALTH_CACHE_SECONDS", 5)
+    return {**report, "cached": False}
+
+
+# -----------------------------
+# ROUTES
+# -----------------------------
+@health_bp.route("/health")
+def health_check():
+    """Liveness (for Koyeb): the process answers. No query is run."""
+    return {"status": "healthy", "db_pool": db_pool.pool_status(db.engine)}, 200
+
+
+@health_bp.route("/health/ready")
+def ready():
+    """Readiness: database round trip, pool, uploads, job backlog, disk."""
+    report = cached_checks()
+    return report, 503 if report["status"] == "fail" else 200
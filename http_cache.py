@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from flask import current_app, request, session
+
+
+# -----------------------------
+# VALIDATORS
+# -----------------------------
+def _release():
+    """
+    Changes whenever the templates do, so a deploy doesn't keep serving 304s
+    for pages rendered by the old templates. HTTP_CACHE_VERSION overrides it.
+    """
+    app = current_app._get_current_object()
+    version = app.config.get("HTTP_CACHE_VERSION") or app.extensions.get("http_cache_version")
+    if version is None:
+        latest = 0.0
+        for folder, _, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+            for name in files:
+                latest = max(latest, os.path.getmtime(os.path.join(folder, name)))
+        version = app.extensions["http_cache_version"] = str(latest)
+    return version
+
+
+def make_etag(*parts):
+    """Strong ETag for everything a response depends on (ids, versions, timestamps...)."""
+    payload = json.dumps([_release(), *parts], default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _is_fresh(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+# -----------------------------
+# RESPONSES
+# -----------------------------
+def conditional(etag, build, last_modified=None):
+    """
+    Returns 304 Not Modified if the client's copy matches `etag` (or
+    `last_modified`); otherwise calls build() for the body. Either way the
+    response carries the validators and must be revalidated on every use.
+
+    Pages with pending flash messages are always rendered: a 304 would
+    swallow the message.
+    """
+    if request.method in ("GET", "HEAD") and "_flashes" not in session and _is_fresh(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(build())
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # per-user data: browsers may keep it, shared caches may not
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.update(("Cookie", "Authorization"))
+    return response
@@ -0,0 +1,180 @@
+import os
+import re
+from flask import Blueprint, abort, current_app, send_file, url_for
+from PIL import Image, ImageOps, UnidentifiedImageError
+from werkzeug.utils import secure_filename
+
+
+images_bp = Blueprint("images", __name__)
+
+# name -> (max width, max height, crop to fill). Sized at 2x the CSS box
+# they are shown in, for high-density screens.
+SIZES = {
+    "thumb": (96, 96, True),       # w-12 h-12 list thumbnails, navbar avatar
+    "medium": (640, 640, False),   # item page, profile picture, edit preview
+}
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpg": ("JPEG", "image/jpeg"),
+}
+FOLDERS = ("uploads", "avatars")
+
+DERIVED_DIR = "_derived"
+QUALITY = {"WEBP": 80, "JPEG": 82}
+
+
+# -----------------------------
+# PATHS
+# -----------------------------
+def _original_path(folder, filename):
+    return os.path.join(current_app.root_path, "static", folder, filename)
+
+
+def derivative_path(folder, filename, size, fmt):
+    stem, _ = os.path.splitext(filename)
+    return os.path.join(current_app.root_path, "static", folder, DERIVED_DIR, size, f"{stem}.{fmt}")
+
+
+# -----------------------------
+# RESIZING
+# -----------------------------
+def _resize(image, size):
+    width, height, crop = SIZES[size]
+    image = ImageOps.exif_transpose(image)  # phone photos are often stored rotated
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.LANCZOS)  # never upscales
+    return image
+
+
+def _encode(image, path, fmt):
+    pil_format, _ = FORMATS[fmt]
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        # no alpha in JPEG: flatten transparent PNGs onto white
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+        image = background
+    elif pil_format == "WEBP" and image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    options = {"quality": QUALITY[pil_format], "optimize": True}
+    if pil_format == "JPEG":
+        options["progressive"] = True
+    else:
+        options["method"] = 4
+    image.save(tmp, pil_format, **options)
+    os.replace(tmp, path)  # readers never see a half-written file
+
+
+def make_derivatives(folder, filename, sizes=None):
+    """
+    Writes every size x format derivative of a locally stored upload.
+    Returns False if the file is not an image Pillow can read.
+    """
+    try:
+        with Image.open(_original_path(folder, filename)) as original:
+            original.load()
+            for size in sizes or SIZES:
+                resized = _resize(original, size)
+                for fmt in FORMATS:
+                    _encode(resized, derivative_path(folder, filename, size, fmt), fmt)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        current_app.logger.warning(f"Could not build derivatives for {folder}/{filename}: {e}")
+        return False
+    return True
+
+
+def remove_derivatives(folder, filename):
+    for size in SIZES:
+        for fmt in FORMATS:
+            try:
+                os.remove(derivative_path(folder, filename, size, fmt))
+            except OSError:
+                pass
+
+
+# -----------------------------
+# URLS (USED BY TEMPLATES)
+# -----------------------------
+def _cloudinary_url(url, size, fmt):
+    # Cloudinary resizes on its CDN when the transformation is in the path
+    width, height, crop = SIZES[size]
+    mode = "c_fill" if crop else "c_limit"
+    transform = f"{mode},w_{width},h_{height},q_auto,f_{'webp' if fmt == 'webp' else 'jpg'}"
+    if "/upload/" not in url:
+        return url
+    return url.replace("/upload/", f"/upload/{transform}/", 1)
+
+
+def image_url(folder, filename, size="medium", fmt="jpg"):
+    """URL of a resized version of an uploaded image (local file or Cloudinary URL)."""
+    if not filename:
+        return None
+    if filename.startswith("http"):
+        return _cloudinary_url(filename, size, fmt)
+    return url_for("images.derivative", folder=folder, size=size, fmt=fmt, filename=filename)
+
+
+# -----------------------------
+# LAZY GENERATION ENDPOINT
+# -----------------------------
+# "ab/cd/<sha256>.jpg" (content-addressed) or a legacy flat name
+STORED_NAME = re.compile(r"^(?:[0-9a-f]{2}/[0-9a-f]{2}/)?[\w.-]+$")
+
+
+@images_bp.route("/media/<folder>/<size>/<fmt>/<path:filename>")
+def derivative(folder, size, fmt, filename):
+    """
+    Serves a derivative, building it on first request. This covers uploads
+    made before derivatives existed and sizes added later.
+    """
+    if folder not in FOLDERS or size not in SIZES or fmt not in FORMATS:
+        abort(404)
+    if not STORED_NAME.match(filename) or secure_filename(os.path.basename(filename)) != os.path.basename(filename):
+        abort(404)
+
+    path = derivative_path(folder, filename, size, fmt)
+    if not os.path.exists(path):
+        if not os.path.exists(_original_path(folder, filename)):
+            abort(404)
+        if not make_derivatives(folder, filename, sizes=[size]):
+            abort(404)
+
+    return _send_cached(path, filename, FORMATS[fmt][1], f"{size}:{fmt}:{QUALITY[FORMATS[fmt][0]]}")
+
+
+@images_bp.route("/media/<folder>/original/<path:filename>")
+def original(folder, filename):
+    """The stored upload itself, with the same caching as the derivatives."""
+    if folder not in FOLDERS or not STORED_NAME.match(filename) \
+            or secure_filename(os.path.basename(filename)) != os.path.basename(filename):
+        abort(404)
+    path = _original_path(folder, filename)
+    if not os.path.exists(path):
+        abort(404)
+    return _send_cached(path, filename, None, "original")
+
+
+def _send_cached(path, filename, mimetype, variant):
+    # A content-addressed name never points at different bytes: cache it for
+    # good and use the name as the ETag. Legacy flat names could be
+    # overwritten, so browsers revalidate them (mtime/size ETag).
+    if "/" not in filename:
+        return send_file(path, mimetype=mimetype, max_age=0)
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        max_age=current_app.config.get("IMAGE_CACHE_MAX_AGE", 31536000),
+        etag=f"{filename}:{variant}",
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.register_blueprint(images_bp)
+    app.jinja_env.globals["image_url"] = image_url
@@ -0,0 +1,319 @@
+import csv
+import io
+import os
+import secrets
+import zipfile
+import openpyxl
+import pandas as pd
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from extensions import db
+from models import Item, Staff
+from jobs import job_handler
+from report_cache import bump_data_version
+from summary import record_inserted_items
+
+
+ImportResult = namedtuple("ImportResult", ["imported", "rejected", "report_token"])
+
+
+class RowError(ValueError):
+    pass
+
+
+# -----------------------------
+# ROW VALIDATION
+# -----------------------------
+MAX_QUANTITY = 100000  # same limit as the add / edit forms
+
+ITEM_TEXT_LIMITS = {
+    "name": 120,
+    "serial_number": 100,
+    "reference_code": 100,
+    "assigned_to": 100,
+    "category": 80,
+}
+
+
+def _clean(value):
+    value = (value or "").strip()
+    return value or None
+
+
+def validate_item_row(row, user_id):
+    """
+    Turns one CSV row into an insert mapping for Item, or raises RowError
+    with a human-readable reason.
+    """
+    values = {k: _clean(row.get(k)) for k in ITEM_TEXT_LIMITS}
+
+    if not values["name"]:
+        raise RowError("name is required")
+    for field, limit in ITEM_TEXT_LIMITS.items():
+        if values[field] and len(values[field]) > limit:
+            raise RowError(f"{field} is longer than {limit} characters")
+
+    quantity = _clean(row.get("quantity"))
+    try:
+        quantity = int(quantity) if quantity is not None else 0
+    except ValueError:
+        raise RowError(f"quantity {quantity!r} is not a whole number")
+    if not 0 <= quantity <= MAX_QUANTITY:
+        raise RowError(f"quantity must be between 0 and {MAX_QUANTITY}")
+
+    assigned_date = _clean(row.get("assigned_date"))
+    if assigned_date:
+        try:
+            assigned_date = datetime.strptime(assigned_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise RowError(f"assigned_date {assigned_date!r} is not YYYY-MM-DD")
+
+    values.update(
+        description=_clean(row.get("description")),
+        quantity=quantity,
+        assigned_date=assigned_date,
+        user_id=user_id,
+    )
+    return values
+
+
+# -----------------------------
+# ERROR REPORTS
+# -----------------------------
+def _report_dir():
+    path = current_app.config.get("IMPORT_REPORT_DIR") or \
+        os.path.join(current_app.instance_path, "import_reports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def report_path(user_id, token):
+    """Path of a rejected-rows report. Reports are namespaced by owner."""
+    if not token.isalnum():
+        return None
+    return os.path.join(_report_dir(), f"{user_id}_{token}.csv")
+
+
+def _write_report(user_id, fieldnames, errors):
+    token = secrets.token_hex(16)
+    with open(report_path(user_id, token), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["line", "reason"] + list(fieldnames))
+        for line_no, reason, row in errors:
+            writer.writerow([line_no, reason] + [row.get(k, "") for k in fieldnames])
+    return token
+
+
+# -----------------------------
+# BULK IMPORT
+# -----------------------------
+def _flush(batch, model=Item):
+    if batch:
+        # executemany: one round trip per chunk instead of one INSERT per ORM object
+        db.session.execute(insert(model), batch)
+        # Core inserts skip the ORM flush events, so bump the report cache version here
+        bump_data_version(db.session.connection(), {row["user_id"] for row in batch})
+        if model is Item:
+            record_inserted_items(db.session.connection(), batch)
+        db.session.commit()
+
+
+def import_items_csv(binary_stream, user_id, chunk_size=1000, on_progress=None):
+    """
+    Streams a CSV upload into Item rows.
+
+    Rows are validated one by one and inserted in chunks of `chunk_size`,
+    each chunk in its own transaction, so a bad row never loses the good
+    ones. Rejected rows are written to a CSV report whose token is returned.
+    `on_progress(imported, rejected)` is called after each chunk.
+    """
+    text = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+
+    # assigned_to holds a staff name in the file; link it to the staff row
+    staff_ids = dict(db.session.query(Staff.name, Staff.id).filter(Staff.user_id == user_id))
+
+    imported, batch, errors = 0, [], []
+    try:
+        for row in reader:
+            try:
+                values = validate_item_row(row, user_id)
+            except RowError as e:
+                errors.append((reader.line_num, str(e), row))
+                continue
+            values["assigned_staff_id"] = staff_ids.get(values["assigned_to"])
+            batch.append(values)
+
+            if len(batch) >= chunk_size:
+                _flush(batch)
+                imported += len(batch)
+                batch = []
+                if on_progress:
+                    on_progress(imported, len(errors))
+    except (UnicodeDecodeError, csv.Error) as e:
+        errors.append((reader.line_num, f"unreadable file: {e}", {}))
+
+    _flush(batch)
+    imported += len(batch)
+
+    token = _write_report(user_id, reader.fieldnames or [], errors) if errors else None
+    text.detach()
+    return ImportResult(imported, len(errors), token)
+
+
+@job_handler("import_items_csv")
+def run_items_csv_import(ctx):
+    def on_progress(imported, rejected):
+        ctx.progress(imported + rejected, message=f"{imported} rows imported, {rejected} rejected")
+
+    with open(ctx.params["input_path"], "rb") as f:
+        result = import_items_csv(
+            f, ctx.user_id, chunk_size=ctx.params.get("chunk_size", 1000), on_progress=on_progress
+        )
+    if result.report_token:
+        ctx.set_result_file(report_path(ctx.user_id, result.report_token), "import_errors.csv", "text/csv")
+    return result._asdict()
+
+
+# -----------------------------
+# STAFF EXCEL IMPORT
+# -----------------------------
+# Staff field -> accepted headers (English / French), most specific first
+STAFF_HEADERS = {
+    "name": ("name", "nom"),
+    "email": ("email",),
+    "phone": ("phone", "téléphone", "telephone"),
+    "position": ("position", "fonction"),
+    "department": ("department", "département"),
+}
+STAFF_TEXT_LIMITS = {"name": 100, "email": 120, "phone": 20, "position": 100, "department": 100}
+
+
+def _map_staff_headers(header_row):
+    """Staff field -> column index, resolved once from the header row."""
+    positions = {}
+    for index, header in enumerate(header_row):
+        key = str(header).strip().lower() if header is not None else ""
+        positions.setdefault(key, index)
+    columns = {}
+    for field, aliases in STAFF_HEADERS.items():
+        for alias in aliases:
+            if alias in positions:
+                columns[field] = positions[alias]
+                break
+    return columns
+
+
+def _cell_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN (pandas fallback)
+            return None
+        if value.is_integer():
+            value = int(value)  # phone numbers typed as numbers
+    elif isinstance(value, datetime):
+        value = value.date()
+    text = str(value).strip()
+    return text or None
+
+
+def _iter_sheet_rows(path):
+    """
+    Rows of the first sheet as tuples. .xlsx files are streamed with
+    openpyxl in read-only mode, so memory does not grow with the sheet.
+    Other formats go through pandas (needs the matching engine, e.g. xlrd).
+    """
+    if zipfile.is_zipfile(path):
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.worksheets[0].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+        return
+    frame = pd.read_excel(path, header=None, dtype=object)
+    yield from frame.itertuples(index=False, name=None)
+
+
+def _validate_staff_chunk(rows, columns, user_id):
+    """
+    Normalises and validates a chunk column by column. Returns the insert
+    mappings and a list of (chunk index, reason) for rejected rows.
+    """
+    values = {
+        field: [_cell_text(row[i]) if i < len(row) else None for row in rows]
+        for field, i in columns.items()
+    }
+    reasons = {}
+    for index, name in enumerate(values.get("name") or [None] * len(rows)):
+        if name is None:
+            reasons[index] = "name is required"
+    for field, column in values.items():
+        limit = STAFF_TEXT_LIMITS[field]
+        for index, text in enumerate(column):
+            if text is not None and len(text) > limit and index not in reasons:
+                reasons[index] = f"{field} is longer than {limit} characters"
+
+    mappings = [
+        dict({field: column[index] for field, column in values.items()}, user_id=user_id)
+        for index in range(len(rows)) if index not in reasons
+    ]
+    return mappings, sorted(reasons.items())
+
+
+def import_staff_excel(path, user_id, chunk_size=1000, on_progress=None):
+    """
+    Imports staff members from the first sheet of an Excel file.
+
+    Headers are matched once; rows are then read as a stream, validated a
+    chunk (column by column) at a time and inserted with one executemany
+    per chunk. Blank rows are ignored; rows without a name or with values
+    too long for the database are rejected and listed in a report.
+    """
+    rows = _iter_sheet_rows(path)
+    header = next(rows, None) or ()
+    columns = _map_staff_headers(header)
+    fieldnames = [str(h) if h is not None else "" for h in header]
+
+    imported, errors, chunk, line_numbers = 0, [], [], []
+
+    def flush():
+        nonlocal imported
+        mappings, rejected = _validate_staff_chunk(chunk, columns, user_id)
+        for index, reason in rejected:
+            errors.append((line_numbers[index], reason, dict(zip(fieldnames, chunk[index]))))
+        _flush(mappings, Staff)
+        imported += len(mappings)
+        chunk.clear()
+        line_numbers.clear()
+        if on_progress:
+            on_progress(imported, len(errors))
+
+    for line_no, row in enumerate(rows, start=2):
+        if all(v is None or (isinstance(v, str) and not v.strip()) for v in row):
+            continue
+        chunk.append(row)
+        line_numbers.append(line_no)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    token = _write_report(user_id, fieldnames, errors) if errors else None
+    return ImportResult(imported, len(errors), token)
+
+
+@job_handler("import_staff")
+def run_staff_import(ctx):
+    def on_progress(imported, rejected):
+        ctx.progress(imported + rejected, message=f"{imported} staff imported, {rejected} rejected")
+
+    result = import_staff_excel(
+        ctx.params["input_path"], ctx.user_id,
+        chunk_size=ctx.params.get("chunk_size", 1000), on_progress=on_progress,
+    )
+    if result.report_token:
+        ctx.set_result_file(report_path(ctx.user_id, result.report_token), "import_errors.csv", "text/csv")
+    return result._asdict()
@@ -0,0 +1,314 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+import click
+from flask import (
+    Blueprint, current_app, jsonify, render_template, send_file,
+    abort, url_for, flash, redirect, has_request_context
+)
+from flask_login import login_required, current_user
+from sqlalchemy import update
+from werkzeug.utils import secure_filename
+from extensions import db
+from models import Job
+
+
+jobs_bp = Blueprint("jobs", __name__)
+
+# kind -> handler(ctx). Handlers live next to the code they run
+# (reports.py, imports.py) and register themselves with @job_handler.
+HANDLERS = {}
+
+
+def job_handler(kind):
+    def decorator(f):
+        HANDLERS[kind] = f
+        return f
+    return decorator
+
+
+def _job_dir(sub):
+    path = current_app.config.get("JOBS_DIR") or os.path.join(current_app.instance_path, "jobs")
+    path = os.path.join(path, sub)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# -----------------------------
+# HANDLER CONTEXT
+# -----------------------------
+class JobContext:
+    """What a handler gets: its params, the owner, and progress / result helpers."""
+
+    def __init__(self, job):
+        self.job = job
+        self.params = json.loads(job.params or "{}")
+        self.user_id = job.user_id
+
+    def progress(self, done, total=None, message=None):
+        self.job.progress = done
+        if total is not None:
+            self.job.total = total
+        if message is not None:
+            self.job.message = message[:300]
+        db.session.commit()
+
+    def result_file(self, download_name, mimetype):
+        """Returns the path the handler should write its downloadable output to."""
+        path = os.path.join(_job_dir("results"), f"{self.job.id}_{secure_filename(download_name)}")
+        self.set_result_file(path, download_name, mimetype)
+        return path
+
+    def set_result_file(self, path, download_name, mimetype):
+        self.job.result_path = path
+        self.job.result_name = download_name
+        self.job.result_mimetype = mimetype
+
+
+# -----------------------------
+# ENQUEUE / RUN
+# -----------------------------
+def save_job_input(file_storage):
+    """Stores an upload so a worker process can read it later; returns its path."""
+    name = f"{time.time_ns()}_{secure_filename(file_storage.filename or 'upload')}"
+    path = os.path.join(_job_dir("inputs"), name)
+    file_storage.save(path)
+    return path
+
+
+def enqueue(kind, user_id, params=None, max_attempts=1, run_after=None, inline=None):
+    """
+    Queues a job. Unless JOBS_ASYNC is on (a `jobs-worker` process is
+    running), the job is run right away in the current process, so callers
+    handle both cases the same way by looking at job.status afterwards.
+    """
+    if kind not in HANDLERS:
+        raise KeyError(f"No job handler registered for {kind!r}")
+
+    job = Job(
+        kind=kind,
+        user_id=user_id,
+        params=json.dumps(params or {}),
+        max_attempts=max_attempts,
+        run_after=run_after or datetime.utcnow(),
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    if inline is None:
+        inline = not current_app.config.get("JOBS_ASYNC", False)
+    if inline:
+        run_job(job)
+    return job
+
+
+def _retry_delay(attempts):
+    base = current_app.config.get("JOBS_RETRY_BACKOFF", 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def run_job(job):
+    """Runs one job to completion, recording the outcome on the row."""
+    handler = HANDLERS[job.kind]
+    job.status = "running"
+    job.attempts = (job.attempts or 0) + 1
+    job.started_at = datetime.utcnow()
+    job.error = None
+    db.session.commit()
+    job_id = job.id
+
+    try:
+        ctx = JobContext(job)
+        if has_request_context():
+            result = handler(ctx)
+        else:
+            # templates rendered by handlers call url_for()
+            with current_app.test_request_context():
+                result = handler(ctx)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        current_app.logger.exception(f"Job {job_id} ({job.kind}) failed")
+        job.error = f"{type(e).__name__}: {e}"
+        if job.attempts < (job.max_attempts or 1):
+            job.status = "queued"
+            job.run_after = datetime.utcnow() + _retry_delay(job.attempts)
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+    else:
+        job.status = "done"
+        job.result = json.dumps(result) if result is not None else None
+        if job.total is not None:
+            job.progress = job.total
+        job.finished_at = datetime.utcnow()
+
+    if job.status != "queued":
+        _remove_input(job)
+    db.session.commit()
+    return job
+
+
+def _remove_input(job):
+    path = json.loads(job.params or "{}").get("input_path")
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def claim_next_job():
+    """
+    Atomically moves the oldest runnable job from queued to running.
+    Postgres uses SKIP LOCKED so several workers never block each other.
+    """
+    now = datetime.utcnow()
+    query = Job.query.filter(Job.status == "queued", Job.run_after <= now).order_by(Job.id)
+
+    if db.engine.dialect.name == "postgresql":
+        job = query.with_for_update(skip_locked=True).first()
+        if job is None:
+            db.session.rollback()
+            return None
+        job.status = "running"
+        db.session.commit()
+        return job
+
+    job = query.first()
+    if job is None:
+        return None
+    claimed = db.session.execute(
+        update(Job).where(Job.id == job.id, Job.status == "queued").values(status="running")
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return None
+    db.session.refresh(job)
+    return job
+
+
+# -----------------------------
+# HOUSEKEEPING
+# -----------------------------
+def requeue_stale_jobs():
+    """Jobs left 'running' by a killed worker are retried or failed."""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get("JOBS_STALE_AFTER", 3600))
+    stale = Job.query.filter(Job.status == "running", Job.started_at < cutoff).all()
+    for job in stale:
+        if job.attempts < (job.max_attempts or 1):
+            job.status = "queued"
+        else:
+            job.status = "failed"
+            job.error = "Worker stopped while running this job."
+            job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return len(stale)
+
+
+def purge_expired_jobs():
+    """Deletes finished jobs (and their files) older than JOBS_RESULT_TTL seconds."""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get("JOBS_RESULT_TTL", 86400))
+    expired = Job.query.filter(Job.status.in_(("done", "failed")), Job.finished_at < cutoff).all()
+    for job in expired:
+        _remove_input(job)
+        if job.result_path:
+            try:
+                os.remove(job.result_path)
+            except OSError:
+                pass
+        db.session.delete(job)
+    db.session.commit()
+    return len(expired)
+
+
+def work(once=False, poll_interval=1.0):
+    """Worker loop: run jobs as they come, tidy up while idle."""
+    last_housekeeping = None
+    while True:
+        if last_housekeeping is None or time.monotonic() - last_housekeeping > 60:
+            requeue_stale_jobs()
+            purge_expired_jobs()
+            from sync import purge_tombstones
+            purge_tombstones()
+            last_housekeeping = time.monotonic()
+
+        job = claim_next_job()
+        if job is not None:
+            run_job(job)
+            db.session.remove()
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+def init_app(app):
+    @app.cli.command("jobs-worker")
+    @click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+    @click.option("--poll", default=1.0, show_default=True, help="Seconds between polls when idle.")
+    def jobs_worker_command(once, poll):
+        """Run queued imports, exports and reports."""
+        click.echo("Job worker started.")
+        work(once=once, poll_interval=poll)
+
+
+# -----------------------------
+# STATUS / DOWNLOAD ENDPOINTS
+# -----------------------------
+def _get_own_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    return job
+
+
+def job_status_dict(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "message": job.message,
+        "error": job.error if job.status == "failed" else None,
+        "result": json.loads(job.result) if job.result else None,
+        "download_url": url_for("jobs.download", job_id=job.id)
+        if job.status == "done" and job.result_path else None,
+    }
+
+
+@jobs_bp.route("/jobs/<int:job_id>")
+@login_required
+def status_page(job_id):
+    return render_template("job_status.html", job=_get_own_job(job_id))
+
+
+@jobs_bp.route("/jobs/<int:job_id>/status")
+@login_required
+def status(job_id):
+    return jsonify(job_status_dict(_get_own_job(job_id)))
+
+
+@jobs_bp.route("/jobs/<int:job_id>/download")
+@login_required
+def download(job_id):
+    job = _get_own_job(job_id)
+    if job.status != "done" or not job.result_path or not os.path.exists(job.result_path):
+        abort(404)
+    return send_file(job.result_path, mimetype=job.result_mimetype,
+                     as_attachment=True, download_name=job.result_name)
+
+
+def job_response(job, fallback_endpoint):
+    """
+    What a view returns after enqueue(): the file itself when the job
+    already ran inline, otherwise the status page.
+    """
+    if job.status == "done" and job.result_path:
+        return download(job.id)
+    if job.status == "failed":
+        flash("The task failed. Please try again.", "danger")
+        return redirect(url_for(fallback_endpoint))
+    return redirect(url_for("jobs.status_page", job_id=job.id))
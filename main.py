@@ -1,16 +1,21 @@
+import json
 import os
-import csv
-import pandas as pd
-from sqlalchemy import or_
-from io import BytesIO, StringIO
-from datetime import datetime
 from werkzeug.utils import secure_filename
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, abort
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, current_app, send_file, abort, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy import update
 from extensions import db
 from models import Item, Staff, User
 from forms import AddItemForm, EditItemForm, StaffForm
-from storage_utils import save_image_file
+from storage_utils import save_image_file, release_image, schedule_remote_upload
+from stats import get_inventory_stats, get_low_stock_items
+from pagination import keyset_paginate, InvalidCursor
+from search_index import search_items, search_staff
+from exports import iter_items_csv, gzip_chunks
+from imports import report_path
+from jobs import enqueue, save_job_input
+from http_cache import conditional, make_etag
+from report_cache import bump_data_version
 
 
 bp = Blueprint("main", __name__, template_folder="templates")
@@ -33,6 +38,35 @@ def allowed_file(filename):
 # -----------------------------
 
 
+# -----------------------------
+# LISTING PAGINATION
+# -----------------------------
+def _paginate_items(query, total=None):
+    """
+    Page-number pagination for small result sets, keyset (cursor)
+    pagination above KEYSET_PAGINATION_THRESHOLD or whenever the request
+    carries a ?cursor= token. `total`, when known, avoids a COUNT query.
+    """
+    per_page = current_app.config.get("ITEMS_PER_PAGE", 6)
+    cursor = request.args.get("cursor")
+    threshold = current_app.config.get("KEYSET_PAGINATION_THRESHOLD", 1000)
+
+    if cursor or (total is not None and total > threshold):
+        try:
+            items = keyset_paginate(query, Item, cursor=cursor, per_page=per_page)
+        except InvalidCursor:
+            abort(400)
+        items.total = total
+        return items
+
+    page = request.args.get("page", 1, type=int)
+    items = query.order_by(Item.created_at.desc(), Item.id.desc()) \
+        .paginate(page=page, per_page=per_page, error_out=False, count=total is None)
+    if total is not None:
+        items.total = total
+    return items
+
+
 
 # -----------------------------
 # HOME PAGE (USER ITEMS ONLY)
@@ -40,27 +74,17 @@ def allowed_file(filename):
 @bp.route("/")
 @login_required
 def index():
-    page = request.args.get("page", 1, type=int)
-    per_page = current_app.config.get("ITEMS_PER_PAGE", 6)
-    low_stock_threshold = current_app.config.get("LOW_STOCK_THRESHOLD", 5)
-
-    items = Item.query.filter_by(user_id=current_user.id) \
-        .order_by(Item.created_at.desc()) \
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Summary stats in one round trip; the total also feeds the pager,
+    # so no separate COUNT is needed.
+    stats = get_inventory_stats(current_user.id)
 
-    # Summary Stats for Dashboard
-    total_items = Item.query.filter_by(user_id=current_user.id).count()
-    low_stock_count = Item.query.filter(
-        Item.user_id == current_user.id,
-        Item.quantity < low_stock_threshold
-    ).count()
+    items = _paginate_items(Item.query.filter_by(user_id=current_user.id), total=stats.total_items)
 
     return render_template(
         "index.html", 
         items=items, 
-        low_stock_threshold=low_stock_threshold,
-        total_items=total_items,
-        low_stock_count=low_stock_count
+        stats=stats,
+        low_stock_threshold=stats.low_stock_threshold
     )
 
 
@@ -75,7 +99,18 @@ def view(item_id):
         flash("Unauthorized access.", "danger")
         return redirect(url_for("main.index"))
 
-    return render_template("view.html", item=item)
+    # The page shows the item and, in the navbar, the user: unchanged both -> 304
+    etag = make_etag("item", item.id, item.updated_at,
+                     current_user.id, current_user.username, current_user.avatar, current_user.role)
+    return conditional(etag, lambda: render_template("view.html", item=item),
+                       last_modified=item.updated_at)
+
+
+def _own_staff(staff_id):
+    """The current user's staff member with this id, or None."""
+    if staff_id is None:
+        return None
+    return Staff.query.filter_by(id=staff_id, user_id=current_user.id).first()
 
 
 # -----------------------------
@@ -88,7 +123,7 @@ def add():
 
     # Populate staff choices
     staff_members = Staff.query.filter_by(user_id=current_user.id).order_by(Staff.name).all()
-    form.assigned_to.choices = [("", "— Unassigned —")] + [(s.name, s.name) for s in staff_members]
+    form.assigned_staff_id.choices = [("", "— Unassigned —")] + [(s.id, s.name) for s in staff_members]
 
     if form.validate_on_submit():
         if form.quantity.data > 100000:
@@ -103,7 +138,6 @@ def add():
             description=form.description.data,
             quantity=form.quantity.data,
             # price removed
-            assigned_to=form.assigned_to.data,
             assigned_date=form.assigned_date.data,
             serial_number=form.serial_number.data,
             reference_code=form.reference_code.data,
@@ -111,9 +145,11 @@ def add():
             image_filename=image_filename,
             user_id=current_user.id  # 🔥 IMPORTANT FIX
         )
+        item.set_assigned_staff(_own_staff(form.assigned_staff_id.data))
 
         db.session.add(item)
         db.session.commit()
+        schedule_remote_upload("uploads", image_filename, current_user.id)
 
         flash("Item added successfully!", "success")
         return redirect(url_for("main.index"))
@@ -137,7 +173,7 @@ def edit(item_id):
 
     # Populate staff choices
     staff_members = Staff.query.filter_by(user_id=current_user.id).order_by(Staff.name).all()
-    form.assigned_to.choices = [("", "— Unassigned —")] + [(s.name, s.name) for s in staff_members]
+    form.assigned_staff_id.choices = [("", "— Unassigned —")] + [(s.id, s.name) for s in staff_members]
 
     if form.validate_on_submit():
         if form.quantity.data > 100000:
@@ -145,31 +181,27 @@ def edit(item_id):
             return redirect(url_for("main.edit", item_id=item.id))
 
         # Replace image if new one uploaded
+        old_image = None
         if form.image.data and form.image.data.filename:
-            if item.image_filename:
-                old_path = os.path.join(
-                    current_app.config.get(
-                        "UPLOAD_FOLDER",
-                        os.path.join(current_app.root_path, "static", "uploads")
-                    ),
-                    item.image_filename
-                )
-                if os.path.exists(old_path) and not item.image_filename.startswith("http"):
-                    os.remove(old_path)
-
+            old_image = item.image_filename
             item.image_filename = save_image_file(form.image.data, "uploads")
 
         item.name = form.name.data
         item.description = form.description.data
         item.quantity = form.quantity.data
         # price removed
-        item.assigned_to = form.assigned_to.data
+        item.set_assigned_staff(_own_staff(form.assigned_staff_id.data))
         item.assigned_date = form.assigned_date.data
         item.serial_number = form.serial_number.data
         item.reference_code = form.reference_code.data
         item.category = form.category.data or None
 
         db.session.commit()
+        # the old photo may still be used by other items (content-addressed storage)
+        if old_image and old_image != item.image_filename:
+            release_image("uploads", old_image)
+        if form.image.data and form.image.data.filename:
+            schedule_remote_upload("uploads", item.image_filename, current_user.id)
 
         flash("Item updated!", "success")
         return redirect(url_for("main.view", item_id=item.id))
@@ -189,21 +221,13 @@ def delete(item_id):
         flash("Unauthorized.", "danger")
         return redirect(url_for("main.index"))
 
-    # Delete image file
-    if item.image_filename and not item.image_filename.startswith("http"):
-        try:
-            path = os.path.join(
-                current_app.config.get("UPLOAD_FOLDER", os.path.join(current_app.root_path, "static", "uploads")),
-                item.image_filename,
-            )
-            if os.path.exists(path):
-                os.remove(path)
-        except:
-            pass
-
+    image = item.image_filename
     db.session.delete(item)
     db.session.commit()
 
+    # Delete image file unless another item still uses it
+    release_image("uploads", image)
+
     flash("Item deleted.", "info")
     return redirect(url_for("main.index"))
 
@@ -215,8 +239,6 @@ def delete(item_id):
 @login_required
 def search():
     q = request.args.get("q", "")
-    page = request.args.get("page", 1, type=int)
-
     if not q:
         empty = type(
             "obj",
@@ -225,22 +247,13 @@ def search():
         )()
         return render_template("search.html", items=empty, staff_members=[], q=None)
 
-    # Search Items
-    items = Item.query.filter(
-        Item.user_id == current_user.id,
-        Item.name.ilike(f"%{q}%")
-    ).paginate(page=page, per_page=6, error_out=False)
-    
+    # Search Items (ranked, so page numbers rather than created_at cursors)
+    page = request.args.get("page", 1, type=int)
+    per_page = current_app.config.get("ITEMS_PER_PAGE", 6)
+    items = search_items(current_user.id, q).paginate(page=page, per_page=per_page, error_out=False)
+
     # Search Staff
-    staff_members = Staff.query.filter(
-        Staff.user_id == current_user.id,
-        or_(
-            Staff.name.ilike(f"%{q}%"),
-            Staff.email.ilike(f"%{q}%"),
-            Staff.position.ilike(f"%{q}%"),
-            Staff.department.ilike(f"%{q}%")
-        )
-    ).all()
+    staff_members = search_staff(current_user.id, q, limit=current_app.config.get("STAFF_SEARCH_LIMIT", 20))
 
     return render_template("search.html", items=items, staff_members=staff_members, q=q)
 
@@ -251,20 +264,21 @@ def search():
 @bp.route("/dashboard")
 @login_required
 def dashboard():
-    total_items = Item.query.filter_by(user_id=current_user.id).count()
+    stats = get_inventory_stats(current_user.id)
 
     # Price removed, so total value is not applicable or 0
     total_value = 0
 
-    recent_items = Item.query.filter_by(user_id=current_user.id) \
+    latest_items = Item.query.filter_by(user_id=current_user.id) \
         .order_by(Item.created_at.desc()) \
         .limit(5).all()
 
     return render_template(
         "dashboard.html",
-        total_items=total_items,
+        stats=stats,
         total_value=total_value,
-        recent_items=recent_items
+        low_stock=get_low_stock_items(current_user.id, stats.low_stock_threshold),
+        latest_items=latest_items
     )
 
 
@@ -274,31 +288,20 @@ def dashboard():
 @bp.route("/export/csv")
 @login_required
 def export_csv():
-    items = Item.query.filter_by(user_id=current_user.id).order_by(Item.id).all()
-
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(["id", "name", "description", "quantity", "assigned_to", "assigned_date", "serial_number", "reference_code", "category", "image_filename", "created_at"])
+    body = iter_items_csv(current_user.id, chunk_size=current_app.config.get("EXPORT_CHUNK_SIZE", 1000))
 
-    for it in items:
-        writer.writerow([
-            it.id,
-            it.name,
-            it.description or "",
-            it.quantity,
-            it.assigned_to or "",
-            it.assigned_date.isoformat() if it.assigned_date else "",
-            it.serial_number or "",
-            it.reference_code or "",
-            it.category or "",
-            it.image_filename or "",
-            it.created_at.isoformat(),
-        ])
+    # Compress on the fly when the client accepts it (CSV shrinks ~5-10x)
+    use_gzip = current_app.config.get("EXPORT_GZIP", True) and \
+        "gzip" in request.headers.get("Accept-Encoding", "")
+    if use_gzip:
+        body = gzip_chunks(body)
 
-    mem = BytesIO(si.getvalue().encode("utf-8"))
-    mem.seek(0)
-
-    return send_file(mem, mimetype="text/csv", as_attachment=True, download_name="items_export.csv")
+    response = Response(stream_with_context(body), mimetype="text/csv")
+    response.headers["Content-Disposition"] = 'attachment; filename="items_export.csv"'
+    response.headers["Vary"] = "Accept-Encoding"
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
 
 
 # -----------------------------
@@ -313,52 +316,35 @@ def import_csv():
             flash("No file uploaded", "danger")
             return redirect(url_for("main.import_csv"))
 
-        try:
-            content = f.stream.read().decode("utf-8")
-        except:
-            flash("Unable to read file.", "danger")
+        job = enqueue("import_items_csv", current_user.id, {
+            "input_path": save_job_input(f),
+            "chunk_size": current_app.config.get("IMPORT_CHUNK_SIZE", 1000),
+        })
+        if job.status in ("queued", "running"):
+            flash("Import started. You can follow its progress here.", "info")
+            return redirect(url_for("jobs.status_page", job_id=job.id))
+        if job.status == "failed":
+            flash("Import failed. Check the file format.", "danger")
             return redirect(url_for("main.import_csv"))
 
-        stream = StringIO(content)
-        reader = csv.DictReader(stream)
-        count = 0
-
-        for row in reader:
-            try:
-                name = row.get("name") or ""
-                if not name:
-                    continue
-                
-                assigned_date_str = row.get("assigned_date", "")
-                assigned_date = None
-                if assigned_date_str:
-                    try:
-                        assigned_date = datetime.strptime(assigned_date_str, "%Y-%m-%d").date()
-                    except:
-                        pass
-
-                item = Item(
-                    name=name,
-                    description=row.get("description", ""),
-                    quantity=int(row.get("quantity", 0)),
-                    assigned_to=row.get("assigned_to", ""),
-                    assigned_date=assigned_date,
-                    serial_number=row.get("serial_number", ""),
-                    reference_code=row.get("reference_code", ""),
-                    category=row.get("category") or None,
-                    user_id=current_user.id   # 👈 import also belongs to user!
-                )
-
-                db.session.add(item)
-                count += 1
-            except:
-                continue
+        result = json.loads(job.result)
+        if result["rejected"]:
+            flash(f"Imported {result['imported']} items, {result['rejected']} rows rejected.", "warning")
+            return redirect(url_for("main.import_csv", report=result["report_token"]))
 
-        db.session.commit()
-        flash(f"Imported {count} items successfully!", "success")
+        flash(f"Imported {result['imported']} items successfully!", "success")
         return redirect(url_for("main.index"))
 
-    return render_template("import_csv.html")
+    return render_template("import_csv.html", report=request.args.get("report"))
+
+
+@bp.route("/import/csv/report/<token>")
+@login_required
+def import_csv_report(token):
+    path = report_path(current_user.id, token)
+    if not path or not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype="text/csv", as_attachment=True, download_name="import_errors.csv")
 
 
 # -----------------------------
@@ -392,6 +378,14 @@ def add_staff():
     return render_template("add_staff.html", form=form, title="Add Staff")
 
 
+def _update_assigned_items(staff, **values):
+    """Sets `values` on every item assigned to `staff` in one UPDATE, without loading them."""
+    db.session.execute(update(Item).where(Item.assigned_staff_id == staff.id).values(**values))
+    # a Core UPDATE skips the flush hooks: bump the data version here (the
+    # summary tables only lose the staff row, which the delete flush drops)
+    bump_data_version(db.session.connection(), [staff.user_id])
+
+
 @bp.route("/staff/edit/<int:staff_id>", methods=["GET", "POST"])
 @login_required
 def edit_staff(staff_id):
@@ -406,6 +400,8 @@ def edit_staff(staff_id):
         staff.phone = form.phone.data
         staff.position = form.position.data
         staff.department = form.department.data
+        # keep the denormalised name on assigned items in step
+        _update_assigned_items(staff, assigned_to=staff.name)
         db.session.commit()
         flash("Staff member updated!", "success")
         return redirect(url_for("main.staff_list"))
@@ -420,6 +416,8 @@ def delete_staff(staff_id):
     if staff.user_id != current_user.id:
         abort(403)
     
+    # ON DELETE SET NULL only clears the id; the name would stay behind
+    _update_assigned_items(staff, assigned_staff_id=None, assigned_to=None)
     db.session.delete(staff)
     db.session.commit()
     flash("Staff member deleted.", "success")
@@ -435,53 +433,25 @@ def import_staff():
             flash("Aucun fichier sélectionné", "danger")
             return redirect(url_for("main.import_staff"))
         
-        try:
-            # Read Excel file
-            df = pd.read_excel(file)
-            count = 0
-            
-            for index, row in df.iterrows():
-                # Normalize column names handling
-                row = {k.lower(): v for k, v in row.items()}
-                
-                # Check for name (required)
-                name = row.get("name") or row.get("nom")
-                if not name or pd.isna(name):
-                    continue
-                
-                # Get other fields with fallback
-                email = row.get("email")
-                email = str(email) if email and not pd.isna(email) else None
-                
-                phone = row.get("phone") or row.get("téléphone") or row.get("telephone")
-                phone = str(phone) if phone and not pd.isna(phone) else None
-                
-                position = row.get("position") or row.get("fonction")
-                position = str(position) if position and not pd.isna(position) else None
-                
-                department = row.get("department") or row.get("département")
-                department = str(department) if department and not pd.isna(department) else None
-                
-                staff = Staff(
-                    name=str(name),
-                    email=email,
-                    phone=phone,
-                    position=position,
-                    department=department,
-                    user_id=current_user.id
-                )
-                db.session.add(staff)
-                count += 1
-            
-            db.session.commit()
-            flash(f"{count} membres du personnel importés avec succès !", "success")
-            return redirect(url_for("main.staff_list"))
-            
-        except Exception as e:
-            current_app.logger.error(f"Import Error: {e}")
+        job = enqueue("import_staff", current_user.id, {
+            "input_path": save_job_input(file),
+            "chunk_size": current_app.config.get("IMPORT_CHUNK_SIZE", 1000),
+        })
+        if job.status in ("queued", "running"):
+            flash("Import started. You can follow its progress here.", "info")
+            return redirect(url_for("jobs.status_page", job_id=job.id))
+        if job.status == "failed":
             flash("Erreur lors de l'importation. Vérifiez le format du fichier Excel.", "danger")
             return redirect(url_for("main.import_staff"))
-            
+
+        result = json.loads(job.result)
+        if result["rejected"]:
+            # the job page links to the rejected-rows report
+            flash(f"{result['imported']} membres importés, {result['rejected']} lignes rejetées.", "warning")
+            return redirect(url_for("jobs.status_page", job_id=job.id))
+        flash(f"{result['imported']} membres du personnel importés avec succès !", "success")
+        return redirect(url_for("main.staff_list"))
+
     return render_template("import_staff.html")
 
 
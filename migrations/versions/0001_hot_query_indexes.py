@@ -0,0 +1,46 @@
+"""composite indexes for the per-user hot queries
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+Databases created by ``db.create_all()`` before this revision have no
+secondary indexes at all; fresh databases already get them from the model
+``__table_args__``, so every index is only created when it is missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('item', 'ix_item_user_created', ['user_id', 'created_at', 'id']),
+    ('item', 'ix_item_user_quantity', ['user_id', 'quantity']),
+    ('item', 'ix_item_user_assigned_to', ['user_id', 'assigned_to']),
+    ('item', 'ix_item_user_category', ['user_id', 'category']),
+    ('staff', 'ix_staff_user_name', ['user_id', 'name']),
+]
+
+
+def _existing_indexes(table):
+    inspector = sa.inspect(op.get_bind())
+    return {ix['name'] for ix in inspector.get_indexes(table)}
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, _columns in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
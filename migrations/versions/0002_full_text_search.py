@@ -0,0 +1,87 @@
+"""full-text search: FTS5 tables on SQLite, GIN indexes on Postgres
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00.000000
+
+Mirrors the DDL that search_index.py attaches to db.create_all(). Every
+statement is IF NOT EXISTS, so it is safe on databases that already have it.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+SOURCES = {
+    'item': ['name', 'serial_number', 'reference_code', 'category', 'description'],
+    'staff': ['name', 'email', 'position', 'department'],
+}
+ITEM_TRIGRAM_COLUMNS = ['serial_number', 'reference_code']
+
+
+def _tsvector_sql(columns):
+    parts = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return f"to_tsvector('simple', {parts})"
+
+
+def _upgrade_sqlite():
+    for source, columns in SOURCES.items():
+        fts = f'{source}_fts'
+        cols = ', '.join(columns)
+        new_vals = ', '.join(f'new.{c}' for c in columns)
+        old_vals = ', '.join(f'old.{c}' for c in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{source}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {source} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _upgrade_postgres():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for source, columns in SOURCES.items():
+        op.execute(
+            f'CREATE INDEX IF NOT EXISTS ix_{source}_search ON {source} USING gin ({_tsvector_sql(columns)})'
+        )
+    for c in ITEM_TRIGRAM_COLUMNS:
+        op.execute(f'CREATE INDEX IF NOT EXISTS ix_item_{c}_trgm ON item USING gin ({c} gin_trgm_ops)')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _upgrade_sqlite()
+    elif dialect == 'postgresql':
+        _upgrade_postgres()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for source in SOURCES:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {source}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {source}_fts')
+    elif dialect == 'postgresql':
+        for name in ('ix_item_search', 'ix_staff_search',
+                     'ix_item_serial_number_trgm', 'ix_item_reference_code_trgm'):
+            op.execute(f'DROP INDEX IF EXISTS {name}')
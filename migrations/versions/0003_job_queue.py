@@ -0,0 +1,55 @@
+"""job table for background imports, exports and reports
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all() may already have made it
+    if sa.inspect(op.get_bind()).has_table('job'):
+        return
+
+    op.create_table(
+        'job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('params', sa.Text(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('progress', sa.Integer(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('message', sa.String(length=300), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('result_path', sa.String(length=300), nullable=True),
+        sa.Column('result_name', sa.String(length=200), nullable=True),
+        sa.Column('result_mimetype', sa.String(length=100), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('max_attempts', sa.Integer(), nullable=True),
+        sa.Column('run_after', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_job_status_run_after', 'job', ['status', 'run_after'])
+    op.create_index('ix_job_user_created', 'job', ['user_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_job_user_created', table_name='job')
+    op.drop_index('ix_job_status_run_after', table_name='job')
+    op.drop_table('job')
@@ -0,0 +1,63 @@
+"""item.assigned_staff_id foreign key, backfilled from assigned_to names
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00.000000
+
+Items were linked to staff by name only. The backfill matches the name
+against the owner's staff. When several staff share a name, the oldest
+one (lowest id) wins. Names with no matching staff stay unlinked, and
+assigned_to keeps the text either way.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {c['name'] for c in inspector.get_columns('item')}
+
+    if 'assigned_staff_id' not in columns:
+        if bind.dialect.name == 'sqlite':
+            # A batch (copy-and-swap) rebuild would drop the item_fts triggers;
+            # SQLite accepts a REFERENCES clause on ADD COLUMN directly.
+            op.execute(
+                'ALTER TABLE item ADD COLUMN assigned_staff_id INTEGER '
+                'REFERENCES staff (id) ON DELETE SET NULL'
+            )
+        else:
+            op.add_column('item', sa.Column('assigned_staff_id', sa.Integer(), nullable=True))
+            op.create_foreign_key(
+                'fk_item_assigned_staff_id_staff', 'item', 'staff',
+                ['assigned_staff_id'], ['id'], ondelete='SET NULL',
+            )
+
+    if 'ix_item_user_assigned_staff' not in {ix['name'] for ix in inspector.get_indexes('item')}:
+        op.create_index('ix_item_user_assigned_staff', 'item', ['user_id', 'assigned_staff_id'])
+
+    op.execute("""
+        UPDATE item SET assigned_staff_id = (
+            SELECT MIN(staff.id) FROM staff
+            WHERE staff.user_id = item.user_id AND staff.name = item.assigned_to
+        )
+        WHERE assigned_staff_id IS NULL AND assigned_to IS NOT NULL
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_item_user_assigned_staff', table_name='item')
+    if op.get_bind().dialect.name == 'sqlite':
+        # Dropping a referencing column means rebuilding the table (and losing
+        # the search triggers); the unused column is left in place instead.
+        return
+    op.drop_constraint('fk_item_assigned_staff_id_staff', 'item', type_='foreignkey')
+    op.drop_column('item', 'assigned_staff_id')
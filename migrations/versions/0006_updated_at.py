@@ -0,0 +1,38 @@
+"""updated_at on item and staff, for ETag / Last-Modified
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00.000000
+
+Existing rows get their created_at as a starting value.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+TABLES = ('item', 'staff')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if 'updated_at' not in {c['name'] for c in inspector.get_columns(table)}:
+            # plain ADD COLUMN, no batch rebuild (that would drop the item_fts triggers)
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+            "WHERE updated_at IS NULL"
+        )
+
+
+def downgrade():
+    # ALTER TABLE ... DROP COLUMN (SQLite 3.35+), again without a rebuild
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
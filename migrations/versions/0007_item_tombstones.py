@@ -0,0 +1,44 @@
+"""item tombstones and (user_id, updated_at, id) index for delta sync
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 17:00:00.000000
+
+Items deleted before this revision leave no tombstone; clients syncing
+from an older cursor should resync once.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('item_tombstone'):
+        op.create_table(
+            'item_tombstone',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('item_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('deleted_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_item_tombstone_user_deleted', 'item_tombstone', ['user_id', 'deleted_at', 'id'])
+
+    if 'ix_item_user_updated' not in {ix['name'] for ix in inspector.get_indexes('item')}:
+        op.create_index('ix_item_user_updated', 'item', ['user_id', 'updated_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_item_user_updated', table_name='item')
+    op.drop_index('ix_item_tombstone_user_deleted', table_name='item_tombstone')
+    op.drop_table('item_tombstone')
@@ -0,0 +1,66 @@
+"""per-user inventory summary tables (totals, per category, per assignee)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:00:00.000000
+
+The tables start empty: each user's rows are built from the item table on
+their first read (see summary.py), or all at once with
+`flask summary-rebuild`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    # create_all() may already have made them
+    if not inspector.has_table('inventory_summary'):
+        op.create_table(
+            'inventory_summary',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('total_items', sa.Integer(), nullable=False),
+            sa.Column('total_quantity', sa.Integer(), nullable=False),
+            sa.Column('low_stock_count', sa.Integer(), nullable=False),
+            sa.Column('low_stock_threshold', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id'),
+        )
+
+    if not inspector.has_table('category_summary'):
+        op.create_table(
+            'category_summary',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('category', sa.String(length=80), nullable=False),
+            sa.Column('item_count', sa.Integer(), nullable=False),
+            sa.Column('total_quantity', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'category'),
+        )
+
+    if not inspector.has_table('assignee_summary'):
+        op.create_table(
+            'assignee_summary',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('staff_id', sa.Integer(), nullable=False),
+            sa.Column('item_count', sa.Integer(), nullable=False),
+            sa.Column('total_quantity', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['staff_id'], ['staff.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'staff_id'),
+        )
+
+
+def downgrade():
+    op.drop_table('assignee_summary')
+    op.drop_table('category_summary')
+    op.drop_table('inventory_summary')
@@ -1,4 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import jwt
+from flask import current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from extensions import db, login_manager
@@ -33,16 +36,61 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    # API tokens (JWT, see api.py)
+    def generate_api_token(self):
+        now = datetime.utcnow()
+        payload = {
+            "sub": str(self.id),
+            "username": self.username,
+            "role": self.role,
+            "iat": now,
+            "exp": now + timedelta(seconds=current_app.config.get("JWT_EXP_DELTA_SECONDS", 3600)),
+        }
+        config = current_app.config
+        return jwt.encode(payload, config.get("JWT_SECRET_KEY") or config["SECRET_KEY"],
+                          algorithm=config.get("JWT_ALGORITHM", "HS256"))
+
+    @staticmethod
+    def verify_api_token(token):
+        """
+        Checks the signature and expiry only: no database lookup per request.
+        Returns the token's identity (id, username, role), or None. Tokens are
+        short-lived, so a deleted or demoted user loses access when theirs expires.
+        """
+        config = current_app.config
+        try:
+            payload = jwt.decode(token, config.get("JWT_SECRET_KEY") or config["SECRET_KEY"],
+                                 algorithms=[config.get("JWT_ALGORITHM", "HS256")],
+                                 options={"require": ["sub", "exp"]})
+            user_id = int(payload["sub"])
+        except (jwt.InvalidTokenError, ValueError):
+            return None
+        return SimpleNamespace(id=user_id, username=payload.get("username"), role=payload.get("role"))
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the identity cache when it is enabled (see user_cache.py)
+    from user_cache import load_user as load_cached_user
+    return load_cached_user(user_id)
 
 
 # -----------------------------
 # ITEM MODEL
 # -----------------------------
 class Item(db.Model):
+    # Every page filters by owner first, then sorts / filters on one of these
+    # columns (see migrations/versions/0001_hot_query_indexes.py).
+    __table_args__ = (
+        db.Index("ix_item_user_created", "user_id", "created_at", "id"),
+        db.Index("ix_item_user_quantity", "user_id", "quantity"),
+        db.Index("ix_item_user_assigned_to", "user_id", "assigned_to"),
+        db.Index("ix_item_user_assigned_staff", "user_id", "assigned_staff_id"),
+        db.Index("ix_item_user_category", "user_id", "category"),
+        # delta sync: changes since a (updated_at, id) cursor
+        db.Index("ix_item_user_updated", "user_id", "updated_at", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     name = db.Column(db.String(120), nullable=False)
@@ -55,6 +103,9 @@ class Item(db.Model):
     image_filename = db.Column(db.String(200), nullable=True)  # store filename under static/uploads/
     
     # NEW: Assignment details
+    # assigned_staff_id is the real link; assigned_to keeps the staff name for
+    # display and CSV export and is kept in sync by set_assigned_staff().
+    assigned_staff_id = db.Column(db.Integer, db.ForeignKey('staff.id', ondelete='SET NULL'), nullable=True)
     assigned_to = db.Column(db.String(100), nullable=True)
     assigned_date = db.Column(db.Date, nullable=True)
 
@@ -63,14 +114,57 @@ class Item(db.Model):
     reference_code = db.Column(db.String(100), nullable=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set on every UPDATE (ORM or Core); drives ETag / Last-Modified
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # optional: link item → user who added it
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
     user = db.relationship('User', backref='items')
+    assigned_staff = db.relationship('Staff', backref='assigned_items')
+
+    def set_assigned_staff(self, staff):
+        self.assigned_staff = staff
+        self.assigned_to = staff.name if staff else None
+
+    def to_dict(self):
+        def iso(value):
+            return value.isoformat() if value else None
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "quantity": self.quantity,
+            "category": self.category,
+            "image_filename": self.image_filename,
+            "assigned_staff_id": self.assigned_staff_id,
+            "assigned_to": self.assigned_to,
+            "assigned_date": iso(self.assigned_date),
+            "serial_number": self.serial_number,
+            "reference_code": self.reference_code,
+            "created_at": iso(self.created_at),
+            "updated_at": iso(self.updated_at),
+        }
+
+
+class ItemTombstone(db.Model):
+    """One row per deleted item, so sync clients learn about deletions (see sync.py)."""
+    __table_args__ = (
+        db.Index("ix_item_tombstone_user_deleted", "user_id", "deleted_at", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 
 class Staff(db.Model):
+    __table_args__ = (
+        db.Index("ix_staff_user_name", "user_id", "name"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=True)
@@ -78,7 +172,85 @@ class Staff(db.Model):
     position = db.Column(db.String(100), nullable=True)
     department = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Link to the user who added this staff member (optional but good for multi-user apps)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     user = db.relationship('User', backref='staff_members')
+
+
+# -----------------------------
+# BACKGROUND JOB MODEL
+# -----------------------------
+class Job(db.Model):
+    # The worker polls for the oldest runnable queued job
+    __table_args__ = (
+        db.Index("ix_job_status_run_after", "status", "run_after"),
+        db.Index("ix_job_user_created", "user_id", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)               # handler name, e.g. "global_report"
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued / running / done / failed
+
+    params = db.Column(db.Text)   # JSON arguments for the handler
+    result = db.Column(db.Text)   # JSON summary returned by the handler
+
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.String(300), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # Downloadable output (report, export, rejected-rows file)
+    result_path = db.Column(db.String(300), nullable=True)
+    result_name = db.Column(db.String(200), nullable=True)
+    result_mimetype = db.Column(db.String(100), nullable=True)
+
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=1)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user = db.relationship('User', backref='jobs')
+
+
+# -----------------------------
+# DATA VERSION (report cache key)
+# -----------------------------
+class DataVersion(db.Model):
+    # Bumped on every Item / Staff write of the user (see report_cache.py),
+    # so cached reports built from older data are never served.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# -----------------------------
+# INVENTORY SUMMARY (dashboard rollups)
+# -----------------------------
+# Kept up to date from Item writes by summary.py; a user's rows are built on
+# first read and can be rebuilt with `flask summary-rebuild`.
+class InventorySummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    total_items = db.Column(db.Integer, nullable=False, default=0)
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+    low_stock_count = db.Column(db.Integer, nullable=False, default=0)
+    # LOW_STOCK_THRESHOLD the count was built with; a different one triggers a rebuild
+    low_stock_threshold = db.Column(db.Integer, nullable=False)
+
+
+class CategorySummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    category = db.Column(db.String(80), primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AssigneeSummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    staff_id = db.Column(db.Integer, db.ForeignKey('staff.id', ondelete='CASCADE'), primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
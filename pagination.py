@@ -0,0 +1,160 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from extensions import db
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# -----------------------------
+# OPAQUE CURSOR TOKENS
+# -----------------------------
+def encode_cursor(created_at, item_id, direction="next"):
+    """
+    Encodes a (created_at, id) position as an opaque, URL-safe token.
+    """
+    payload = {"c": created_at.isoformat(), "i": item_id, "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Returns (created_at, id, direction) or raises InvalidCursor.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        direction = payload.get("d", "next")
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload["c"]), int(payload["i"]), direction
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {token!r}") from e
+
+
+# -----------------------------
+# KEYSET PAGE
+# -----------------------------
+class KeysetPage:
+    """
+    One page of a keyset-paginated query, ordered newest first.
+
+    Unlike flask_sqlalchemy's Pagination there is no page number: the
+    template / API follows next_cursor and prev_cursor instead.
+    """
+
+    is_keyset = True
+
+    def __init__(self, items, per_page, has_next, has_prev, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.total = total
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.items:
+            return None
+        last = self.items[-1]
+        return encode_cursor(last.created_at, last.id, "next")
+
+    @property
+    def prev_cursor(self):
+        if not self.has_prev or not self.items:
+            return None
+        first = self.items[0]
+        return encode_cursor(first.created_at, first.id, "prev")
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def keyset_paginate(query, model, cursor=None, per_page=20, total=None):
+    """
+    Paginates `query` on (model.created_at, model.id), newest first.
+
+    Each page is a single indexed range scan (see ix_item_user_created) with
+    no OFFSET and no COUNT, so deep pages cost the same as the first one.
+    Rows without created_at are never returned in this mode.
+
+    Args:
+        query: An unordered query over `model`, already filtered by owner.
+        cursor: A token from a previous page's next_cursor / prev_cursor.
+        total: "exact", "approx" or None (no total, cheapest). "approx"
+            is a planner estimate on Postgres and an exact COUNT elsewhere.
+    """
+    key = tuple_(model.created_at, model.id)
+    query = query.filter(model.created_at.isnot(None))
+    counted = query
+
+    direction = "next"
+    if cursor:
+        created_at, item_id, direction = decode_cursor(cursor)
+        if direction == "next":
+            query = query.filter(key < tuple_(created_at, item_id))
+        else:
+            query = query.filter(key > tuple_(created_at, item_id))
+
+    if direction == "next":
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == "next":
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+
+    if total == "exact":
+        total = counted.order_by(None).count()
+    elif total == "approx":
+        total = estimate_count(counted)
+
+    return KeysetPage(rows, per_page, has_next, has_prev, total=total)
+
+
+# -----------------------------
+# APPROXIMATE COUNTS
+# -----------------------------
+class _ExplainJSON(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, compiled with ordinary bind parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_ExplainJSON, "postgresql")
+def _compile_explain_json(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def estimate_count(query):
+    """
+    Row-count estimate for a query.
+
+    On Postgres this reads the planner's row estimate from EXPLAIN, which
+    does not scan the table. Other databases (SQLite in local dev and the
+    test suite) have no such estimate, so they run an exact COUNT instead:
+    "approx" is only cheap on Postgres.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return query.order_by(None).count()
+
+    plan = db.session.execute(_ExplainJSON(query.order_by(None).statement)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
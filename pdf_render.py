@@ -0,0 +1,190 @@
+import atexit
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from pypdf import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+from xhtml2pdf import pisa
+
+try:
+    import resource
+except ImportError:  # Windows: no memory cap
+    resource = None
+
+
+class PdfRenderError(RuntimeError):
+    """The PDF could not be rendered (bad HTML, worker crashed or ran out of memory)."""
+
+
+class PdfTimeout(PdfRenderError):
+    """Rendering took longer than PDF_TIMEOUT; the worker was killed."""
+
+
+class PdfBusy(PdfRenderError):
+    """PDF_MAX_PENDING renders already running or waiting in this process."""
+
+
+# -----------------------------
+# WORKER SIDE
+# -----------------------------
+def _limit_memory(max_mb):
+    # address-space cap: a runaway render raises MemoryError in the worker
+    # instead of pushing the whole machine into swap / the OOM killer
+    if resource is not None and max_mb:
+        limit = max_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def render_to_file(html_content, path):
+    """Converts an HTML string to a PDF at `path`. Returns the xhtml2pdf error count."""
+    with open(path, "wb") as dest:
+        return pisa.pisaDocument(io.BytesIO(html_content.encode("UTF-8")), dest).err
+
+
+def merge_pdfs(paths, dest_path):
+    """
+    Concatenates the PDFs into `dest_path` and stamps "n / total" at the
+    bottom right of every page. Returns the page count.
+    """
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    total = len(writer.pages)
+
+    # one overlay page per page, drawn with reportlab and merged on top
+    overlay = io.BytesIO()
+    stamp = canvas.Canvas(overlay)
+    for number, page in enumerate(writer.pages, start=1):
+        width, height = float(page.mediabox.width), float(page.mediabox.height)
+        stamp.setPageSize((width, height))
+        stamp.setFont("Helvetica", 8)
+        stamp.setFillColorRGB(0.42, 0.45, 0.5)
+        stamp.drawRightString(width - 36, 20, f"{number} / {total}")
+        stamp.showPage()
+    stamp.save()
+
+    for page, numbers in zip(writer.pages, PdfReader(overlay).pages):
+        page.merge_page(numbers)
+    with open(dest_path, "wb") as dest:
+        writer.write(dest)
+    return total
+
+
+# -----------------------------
+# POOL
+# -----------------------------
+class PdfRenderer:
+    """
+    PDF_WORKERS processes rendering xhtml2pdf documents, so a big report
+    burns CPU (and holds a GIL) outside the web / job worker. Callers block
+    on the result without holding the GIL; PDF_MAX_PENDING bounds how many
+    may be running or waiting at once. With PDF_WORKERS = 0 renders run in
+    the calling thread.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = None
+        self._atexit = False
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(app.config.get("PDF_MAX_PENDING", 8))
+
+    def _pool(self):
+        # created on first use, so forked gunicorn workers each get their own pool
+        with self._lock:
+            if self.executor is None:
+                config = self.app.config
+                self.executor = ProcessPoolExecutor(
+                    max_workers=config["PDF_WORKERS"],
+                    mp_context=multiprocessing.get_context(config.get("PDF_START_METHOD", "spawn")),
+                    initializer=_limit_memory,
+                    initargs=(config.get("PDF_MAX_MEMORY_MB"),),
+                    max_tasks_per_child=config.get("PDF_MAX_TASKS_PER_CHILD"),
+                )
+                if not self._atexit:
+                    atexit.register(self.close)
+                    self._atexit = True
+            return self.executor
+
+    def call(self, fn, *args):
+        """Runs fn(*args) in a worker process and returns its result."""
+        config = self.app.config
+        if not config.get("PDF_WORKERS"):
+            return fn(*args)
+        if not self._slots.acquire(timeout=config.get("PDF_QUEUE_TIMEOUT", 5)):
+            raise PdfBusy("Too many PDF renders in progress, try again later.")
+        try:
+            executor = self._pool()
+            future = executor.submit(fn, *args)
+            try:
+                return future.result(timeout=config.get("PDF_TIMEOUT", 120))
+            except FutureTimeout:
+                self._reset(executor)
+                raise PdfTimeout(f"PDF rendering took more than {config.get('PDF_TIMEOUT', 120)}s")
+            except BrokenProcessPool as e:
+                self._reset(executor)
+                raise PdfRenderError("PDF worker died (crash or memory limit)") from e
+            except MemoryError as e:
+                raise PdfRenderError("PDF worker hit PDF_MAX_MEMORY_MB") from e
+        finally:
+            self._slots.release()
+
+    def render(self, html_content, path):
+        """Writes the PDF for `html_content` to `path`; raises PdfRenderError on failure."""
+        if self.call(render_to_file, html_content, path):
+            raise PdfRenderError("Error creating PDF.")
+
+    def render_parts(self, html_parts, path):
+        """
+        Renders each HTML document of `html_parts` (any iterable, consumed as
+        workers free up) to its own PDF, up to PDF_WORKERS at a time, then
+        merges them into `path` with continuous page numbers. Returns the
+        page count.
+        """
+        window = max(1, self.app.config.get("PDF_WORKERS") or 1)
+        part_paths = []
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(path) or None) as tmp:
+            with ThreadPoolExecutor(window, thread_name_prefix="pdf-part") as threads:
+                pending = deque()
+                for html_content in html_parts:
+                    part_paths.append(os.path.join(tmp, f"part-{len(part_paths):05d}.pdf"))
+                    pending.append(threads.submit(self.render, html_content, part_paths[-1]))
+                    if len(pending) >= window:
+                        pending.popleft().result()  # raises the part's error, if any
+                for future in pending:
+                    future.result()
+            return self.call(merge_pdfs, part_paths, path)
+
+    def _reset(self, executor):
+        # a hung or crashed worker can't be reused: kill the pool, the next call
+        # starts a fresh one (renders running beside it fail with PdfRenderError)
+        with self._lock:
+            if self.executor is executor:
+                self.executor = None
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        with self._lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def render_pdf(html_content, path):
+    current_app.extensions["pdf_renderer"].render(html_content, path)
+
+
+def render_pdf_parts(html_parts, path):
+    return current_app.extensions["pdf_renderer"].render_parts(html_parts, path)
+
+
+def init_app(app):
+    app.extensions["pdf_renderer"] = PdfRenderer(app)
@@ -6,6 +6,7 @@ from flask import (
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from extensions import db
+from storage_utils import save_image_file, release_image, schedule_remote_upload
 from werkzeug.security import generate_password_hash
 
 # ----------------------------------------------------------
@@ -45,19 +46,20 @@ def update_avatar():
         flash("Please upload a file.", "warning")
         return redirect(url_for("profile.view_profile"))
 
-    filename = secure_filename(file.filename)
+    # Save file under its content hash (resized copies are cached by name)
+    filename = save_image_file(file, "avatars")
 
-    if filename == "":
+    if not filename:
         flash("Invalid file.", "danger")
         return redirect(url_for("profile.view_profile"))
 
-    # Save file
-    save_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(save_path)
-
     # Save to DB
+    old_avatar = current_user.avatar
     current_user.avatar = filename
     db.session.commit()
+    if old_avatar != filename:
+        release_image("avatars", old_avatar)
+        schedule_remote_upload("avatars", filename, current_user.id)
 
     flash("Avatar updated successfully!", "success")
     return redirect(url_for("profile.view_profile"))
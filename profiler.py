@@ -0,0 +1,217 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from flask import (
+    Blueprint, current_app, g, has_app_context, has_request_context,
+    redirect, render_template, request, url_for, flash, before_render_template, template_rendered
+)
+from flask_login import current_user, login_required
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+profiler_bp = Blueprint("profiler", __name__)
+
+slow_query_log = logging.getLogger("inventory.slow_query")
+
+
+# -----------------------------
+# PER-REQUEST RECORD
+# -----------------------------
+class RequestProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.statements = Counter()
+        self._render_start = None
+
+    def duplicates(self, min_count=2):
+        """Statements run at least `min_count` times: the N+1 suspects."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= min_count]
+
+
+def _normalise(statement):
+    # one line, so the same statement issued from different places counts once
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def _enabled():
+    return has_app_context() and current_app.config.get("PROFILER_ENABLED", False)
+
+
+# -----------------------------
+# SQLALCHEMY HOOKS
+# -----------------------------
+# Registered on the Engine class once, for every engine; they do nothing
+# unless PROFILER_ENABLED is set on the current app.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _enabled():
+        conn.info.setdefault("profiler_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("profiler_start")
+    if not starts or not _enabled():
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    profile = g.get("profile") if has_request_context() else None
+
+    if profile is not None:
+        profile.query_count += 1
+        profile.db_ms += elapsed_ms
+        profile.statements[_normalise(statement)] += 1
+
+    if elapsed_ms >= current_app.config.get("SLOW_QUERY_MS", 200):
+        # parameters are left out on purpose: they hold user data
+        slow_query_log.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(elapsed_ms, 1),
+            "statement": _normalise(statement)[:2000],
+            "endpoint": request.endpoint if has_request_context() else None,
+            "path": request.path if has_request_context() else None,
+        }))
+
+
+# -----------------------------
+# TEMPLATE RENDER TIME
+# -----------------------------
+def _before_render(sender, template, context, **extra):
+    profile = g.get("profile") if has_request_context() else None
+    if profile is not None and profile._render_start is None:
+        profile._render_start = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    profile = g.get("profile") if has_request_context() else None
+    if profile is not None and profile._render_start is not None:
+        # includes queries made from the template (lazy loads)
+        profile.render_ms += (time.perf_counter() - profile._render_start) * 1000
+        profile._render_start = None
+
+
+# -----------------------------
+# REQUEST HOOKS
+# -----------------------------
+class ProfileHistory:
+    """The last N request profiles of this process, for the admin page."""
+
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.entries)
+
+
+def _start_profile():
+    g.profile = RequestProfile()
+
+
+def _finish_profile(response):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+
+    total_ms = (time.perf_counter() - profile.start) * 1000
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={profile.db_ms:.1f};desc="{profile.query_count} queries", '
+        f"render;dur={profile.render_ms:.1f}, total;dur={total_ms:.1f}",
+    )
+
+    threshold = current_app.config.get("PROFILER_DUPLICATE_THRESHOLD", 5)
+    duplicates = profile.duplicates(threshold)
+    if duplicates:
+        slow_query_log.warning(json.dumps({
+            "event": "repeated_statements",
+            "endpoint": request.endpoint,
+            "path": request.path,
+            "statements": [{"count": n, "statement": sql[:500]} for sql, n in duplicates[:5]],
+        }))
+
+    current_app.extensions["profiler"].add({
+        "at": time.time(),
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "total_ms": round(total_ms, 1),
+        "db_ms": round(profile.db_ms, 1),
+        "render_ms": round(profile.render_ms, 1),
+        "query_count": profile.query_count,
+        "duplicates": [(sql[:300], n) for sql, n in profile.duplicates(2)[:5]],
+    })
+    return response
+
+
+def init_app(app):
+    app.extensions["profiler"] = ProfileHistory(app.config.get("PROFILER_HISTORY", 200))
+    app.register_blueprint(profiler_bp)
+    if not app.config.get("PROFILER_ENABLED", False):
+        return
+
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+
+# -----------------------------
+# ADMIN PAGE
+# -----------------------------
+def summarize(entries):
+    """Per-endpoint totals, slowest first."""
+    by_endpoint = {}
+    for e in entries:
+        s = by_endpoint.setdefault(e["endpoint"] or e["path"], {
+            "endpoint": e["endpoint"] or e["path"], "requests": 0,
+            "total_ms": 0.0, "db_ms": 0.0, "queries": 0, "max_ms": 0.0,
+        })
+        s["requests"] += 1
+        s["total_ms"] += e["total_ms"]
+        s["db_ms"] += e["db_ms"]
+        s["queries"] += e["query_count"]
+        s["max_ms"] = max(s["max_ms"], e["total_ms"])
+
+    rows = []
+    for s in by_endpoint.values():
+        n = s["requests"]
+        rows.append({
+            "endpoint": s["endpoint"],
+            "requests": n,
+            "avg_ms": round(s["total_ms"] / n, 1),
+            "avg_db_ms": round(s["db_ms"] / n, 1),
+            "avg_queries": round(s["queries"] / n, 1),
+            "max_ms": s["max_ms"],
+        })
+    return sorted(rows, key=lambda r: r["avg_ms"], reverse=True)
+
+
+@profiler_bp.route("/admin/profiler")
+@login_required
+def admin_profiler():
+    if current_user.role != 'admin':
+        flash("Access denied. Admins only.", "danger")
+        return redirect(url_for("main.index"))
+
+    entries = current_app.extensions["profiler"].snapshot()
+    recent = sorted(entries, key=lambda e: e["total_ms"], reverse=True)[:50]
+    return render_template(
+        "admin_profiler.html",
+        enabled=current_app.config.get("PROFILER_ENABLED", False),
+        endpoints=summarize(entries),
+        slowest=recent,
+        slow_query_ms=current_app.config.get("SLOW_QUERY_MS", 200),
+    )
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import shutil
+from flask import current_app
+from sqlalchemy import event, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import DataVersion, Item, Staff
+
+
+# -----------------------------
+# PER-USER DATA VERSION
+# -----------------------------
+def data_version(user_id):
+    version = db.session.query(DataVersion.version).filter_by(user_id=user_id).scalar()
+    return version or 0
+
+
+def bump_data_version(connection, user_ids):
+    """Increments the data version of each user, in the caller's transaction."""
+    for user_id in set(user_ids) - {None}:
+        dialect = connection.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = dialect_insert(DataVersion).values(user_id=user_id, version=1)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=[DataVersion.user_id],
+                set_={"version": DataVersion.version + 1},
+            ))
+            continue
+        bumped = connection.execute(
+            update(DataVersion).where(DataVersion.user_id == user_id)
+            .values(version=DataVersion.version + 1)
+        ).rowcount
+        if not bumped:
+            connection.execute(insert(DataVersion).values(user_id=user_id, version=1))
+
+
+@event.listens_for(db.session, "after_flush")
+def _bump_on_item_or_staff_write(session, flush_context):
+    user_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Item, Staff)) and (obj not in session.dirty or session.is_modified(obj)):
+            user_ids.add(obj.user_id)
+    if user_ids:
+        bump_data_version(session.connection(), user_ids)
+
+
+# -----------------------------
+# ARTIFACT CACHE (ON DISK, LRU)
+# -----------------------------
+def _cache_dir():
+    path = current_app.config.get("REPORT_CACHE_DIR") or \
+        os.path.join(current_app.instance_path, "report_cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def enabled():
+    return current_app.config.get("REPORT_CACHE_MAX_BYTES", 0) > 0
+
+
+def cache_key(user_id, report, params):
+    """
+    Identifies one artifact: same user, report, parameters (filters, columns,
+    format...) and data version means the same bytes.
+    """
+    payload = json.dumps(
+        [user_id, report, params, data_version(user_id)], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return os.path.join(_cache_dir(), key)
+
+
+def get(key):
+    """Path of the cached artifact, or None. A hit counts as a use for LRU."""
+    if not enabled():
+        return None
+    path = _path(key)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def put(key, source_path):
+    """Stores a copy of `source_path` under `key`, then evicts down to the size limit."""
+    if not enabled():
+        return
+    tmp = f"{_path(key)}.{os.getpid()}.tmp"
+    shutil.copyfile(source_path, tmp)
+    os.replace(tmp, _path(key))  # atomic: readers never see a half-written file
+    evict(current_app.config["REPORT_CACHE_MAX_BYTES"])
+
+
+def evict(max_bytes):
+    """Deletes least recently used artifacts until the cache fits in `max_bytes`."""
+    entries = []
+    with os.scandir(_cache_dir()) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
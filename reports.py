@@ -1,27 +1,51 @@
 
-import io
-import pandas as pd
+import shutil
+import tempfile
+from itertools import islice
 from flask import Blueprint, render_template, make_response, request, send_file, flash, redirect, url_for, current_app
 from flask_login import current_user, login_required
+from extensions import db
 from models import Item, Staff
-from xhtml2pdf import pisa
+from jobs import enqueue, job_handler, job_response
+from exports import XLSX_MIMETYPE, write_xlsx
+import report_cache
+import summary
+from pdf_render import render_pdf, render_pdf_parts
 from datetime import datetime
 
 reports_bp = Blueprint('reports', __name__, template_folder='templates')
 
-def _generate_pdf(html_content):
+# format -> (file extension, mimetype)
+REPORT_FORMATS = {
+    'excel': ('xlsx', XLSX_MIMETYPE),
+    'pdf': ('pdf', 'application/pdf'),
+}
+
+
+# -----------------------------
+# ARTIFACT CACHE
+# -----------------------------
+def _send_cached(report, params, download_prefix):
     """
-    Helper to convert HTML content string to PDF bytes.
+    Sends a report straight from the artifact cache when it was already built
+    from the current data; returns None on a miss.
     """
-    result = io.BytesIO()
-    # pisaDocument needs bytes or a file-like object usually
-    # encoding='UTF-8' helps with special characters
-    pdf = pisa.pisaDocument(io.BytesIO(html_content.encode("UTF-8")), result)
-    
-    if not pdf.err:
-        result.seek(0)
-        return result
-    return None
+    path = report_cache.get(report_cache.cache_key(current_user.id, report, params))
+    if not path:
+        return None
+    ext, mimetype = REPORT_FORMATS[params['format']]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return send_file(path, mimetype=mimetype, as_attachment=True,
+                     download_name=f"{download_prefix}_{timestamp}.{ext}")
+
+
+def _copy_from_cache(key, path):
+    cached = report_cache.get(key)
+    if not cached:
+        return False
+    shutil.copyfile(cached, path)
+    return True
+
 
 @reports_bp.route('/reports/staff/<int:staff_id>', methods=['GET'])
 @login_required
@@ -36,75 +60,75 @@ def export_staff(staff_id):
     if staff.user_id != current_user.id:
         flash("Unauthorized access.", "danger")
         return redirect(url_for('main.staff_list'))
-    
-    # Logic to find items assigned to this staff
-    # Matches by name string as per the current data model
-    items = Item.query.filter(
-        Item.user_id == current_user.id,
-        Item.assigned_to == staff.name
-    ).all()
+
+    if fmt not in ('excel', 'pdf'):
+        flash("Invalid format selected.", "warning")
+        return redirect(url_for('main.staff_list'))
+
+    params = {'staff_id': staff.id, 'format': fmt}
+    cached = _send_cached('staff_report', params, f"Staff_Report_{staff.name}")
+    if cached:
+        return cached
+
+    job = enqueue('staff_report', current_user.id, params)
+    return job_response(job, 'main.staff_list')
+
+
+STAFF_DETAIL_HEADER = ["Name", "Email", "Phone", "Position", "Department"]
+# "Assigned Items" sheet: header -> column
+STAFF_ITEM_HEADER = {
+    "Item Name": Item.name,
+    "Category": Item.category,
+    "Serial Number": Item.serial_number,
+    "Reference Code": Item.reference_code,
+    "Quantity": Item.quantity,
+    "Description": Item.description,
+    "Assigned Date": Item.assigned_date,
+}
+STAFF_ITEM_COLUMNS = list(STAFF_ITEM_HEADER.values())
+
+
+@job_handler('staff_report')
+def build_staff_report(ctx):
+    """Renders one staff sheet (PDF or Excel) into the job's result file."""
+    fmt = ctx.params['format']
+    key = report_cache.cache_key(ctx.user_id, 'staff_report', ctx.params)
+    staff = Staff.query.filter_by(id=ctx.params['staff_id'], user_id=ctx.user_id).one()
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ext, mimetype = REPORT_FORMATS[fmt]
+    path = ctx.result_file(f"Staff_Report_{staff.name}_{timestamp}.{ext}", mimetype)
+    if _copy_from_cache(key, path):
+        return {'cached': True}
+
+    # Items assigned to this staff member (indexed foreign key)
+    items = Item.query.filter(
+        Item.user_id == ctx.user_id,
+        Item.assigned_staff_id == staff.id
+    )
 
     if fmt == 'excel':
-        # Create Excel
-        # 1. Staff Info
-        staff_data = {
-            "Name": [staff.name],
-            "Email": [staff.email],
-            "Phone": [staff.phone],
-            "Position": [staff.position],
-            "Department": [staff.department]
-        }
-        
-        # 2. Items Info
-        items_data = []
-        for item in items:
-            items_data.append({
-                "Item Name": item.name,
-                "Category": item.category,
-                "Serial Number": item.serial_number,
-                "Reference Code": item.reference_code,
-                "Quantity": item.quantity,
-                "Description": item.description,
-                "Assigned Date": item.assigned_date
-            })
-            
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            pd.DataFrame(staff_data).to_excel(writer, sheet_name='Staff Details', index=False)
-            if items_data:
-                pd.DataFrame(items_data).to_excel(writer, sheet_name='Assigned Items', index=False)
-            else:
-                pd.DataFrame({"Info": ["No items assigned"]}).to_excel(writer, sheet_name='Assigned Items', index=False)
-                
-        output.seek(0)
-        return send_file(
-            output, 
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f"Staff_Report_{staff.name}_{timestamp}.xlsx"
-        )
-        
-    elif fmt == 'pdf':
-        # Render HTML template for PDF
-        html = render_template('reports/staff_pdf.html', staff=staff, items=items, date=datetime.now())
-        pdf_file = _generate_pdf(html)
-        
-        if pdf_file:
-            return send_file(
-                pdf_file,
-                mimetype='application/pdf',
-                as_attachment=True,
-                download_name=f"Staff_Report_{staff.name}_{timestamp}.pdf"
-            )
+        # Rows are streamed from the cursor into a write-only workbook
+        count = items.count()
+        staff_sheet = ('Staff Details', STAFF_DETAIL_HEADER,
+                       [[staff.name, staff.email, staff.phone, staff.position, staff.department]])
+        if count:
+            rows = items.with_entities(*STAFF_ITEM_COLUMNS).order_by(Item.id) \
+                .yield_per(current_app.config.get('EXPORT_CHUNK_SIZE', 1000))
+            items_sheet = ('Assigned Items', list(STAFF_ITEM_HEADER), rows)
         else:
-            flash("Error creating PDF.", "danger")
-            return redirect(url_for('main.staff_list'))
-            
+            items_sheet = ('Assigned Items', ['Info'], [['No items assigned']])
+        write_xlsx(path, [staff_sheet, items_sheet])
     else:
-        flash("Invalid format selected.", "warning")
-        return redirect(url_for('main.staff_list'))
+        # Render HTML template for PDF
+        items = items.all()
+        count = len(items)
+        html = render_template('reports/staff_pdf.html', staff=staff, items=items, date=datetime.now())
+        # Rendered in the PDF worker pool (pdf_render.py)
+        render_pdf(html, path)
+
+    report_cache.put(key, path)
+    return {'rows': count}
 
 
 @reports_bp.route('/reports/global', methods=['GET', 'POST'])
@@ -113,161 +137,165 @@ def global_report():
     """Configurer et exporter un rapport global avec filtres."""
 
     # Préparer les listes pour le formulaire (catégories, staff) pour GET et POST
-    categories = (
-        Item.query.with_entities(Item.category)
-        .filter(Item.user_id == current_user.id, Item.category.isnot(None))
-        .distinct()
-        .all()
-    )
-    categories = [c[0] for c in categories]
+    categories = summary.get_categories(current_user.id)
 
-    staff_names = (
-        Item.query.with_entities(Item.assigned_to)
-        .filter(Item.user_id == current_user.id, Item.assigned_to.isnot(None))
-        .distinct()
-        .all()
-    )
-    staff_names = [s[0] for s in staff_names]
+    staff_members = Staff.query.filter_by(user_id=current_user.id).order_by(Staff.name).all()
 
     if request.method == 'POST':
         # Format de sortie
         fmt = request.form.get('format', 'excel')
+        if fmt not in ('excel', 'pdf'):
+            flash("Invalid format selected.", "warning")
+            return redirect(url_for('reports.global_report'))
 
         # Filtres
-        selected_category = request.form.get('category') or None
-        selected_staff = request.form.get('staff') or None
-        date_from_str = request.form.get('date_from') or None
-        date_to_str = request.form.get('date_to') or None
-
-        date_from = datetime.strptime(date_from_str, '%Y-%m-%d') if date_from_str else None
-        date_to = datetime.strptime(date_to_str, '%Y-%m-%d') if date_to_str else None
+        filters = {
+            'category': request.form.get('category') or None,
+            'staff': request.form.get('staff', type=int),
+            'date_from': request.form.get('date_from') or None,
+            'date_to': request.form.get('date_to') or None,
+        }
 
         # Colonnes choisies
         selected_columns = request.form.getlist('columns')
 
         if not selected_columns:
-            selected_columns = ['name', 'category', 'quantity', 'assigned_to']
-
-        # Noms de colonnes lisibles (français)
-        allowed_attrs = {
-            'name': "Article",
-            'category': 'Catégorie',
-            'quantity': 'Quantité',
-            'assigned_to': 'Assigné à',
-            'serial_number': 'Numéro de série',
-            'reference_code': 'Code de référence',
-            'description': 'Description',
-            'assigned_date': "Date d'affectation",
-            'created_at': 'Date de création',
-        }
+            selected_columns = DEFAULT_GLOBAL_REPORT_COLUMNS
 
-        # Construire la requête avec filtres
-        query = Item.query.filter_by(user_id=current_user.id)
-        if selected_category:
-            query = query.filter(Item.category == selected_category)
-        if selected_staff:
-            query = query.filter(Item.assigned_to == selected_staff)
-        if date_from:
-            query = query.filter(Item.created_at >= date_from)
-        if date_to:
-            # inclure toute la journée de fin
-            end_of_day = date_to.replace(hour=23, minute=59, second=59)
-            query = query.filter(Item.created_at <= end_of_day)
-
-        items = query.all()
-        
-        # Build dataset
-        data = []
-        for item in items:
-            row = {}
-            for col in selected_columns:
-                if col in allowed_attrs:
-                    val = getattr(item, col, None)
-                    # format dates
-                    if hasattr(val, 'isoformat'):
-                        val = val.strftime('%Y-%m-%d')
-                    row[allowed_attrs[col]] = val
-            data.append(row)
-            
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        if fmt == 'excel':
-            df = pd.DataFrame(data)
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Rapport inventaire', index=False)
-            output.seek(0)
-            
-            return send_file(
-                output, 
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name=f"Global_Inventory_{timestamp}.xlsx"
-            )
-
-        elif fmt == 'pdf':
-            # Tableau HTML puis conversion en PDF
-            headers = [allowed_attrs[c] for c in selected_columns if c in allowed_attrs]
-            
-            html = render_template(
-                'reports/global_pdf.html',
-                data=data,
-                headers=headers,
-                date=datetime.now(),
-                column_count=len(headers)
-            )
-            pdf_file = _generate_pdf(html)
-            
-            if pdf_file:
-                return send_file(
-                    pdf_file,
-                    mimetype='application/pdf',
-                    as_attachment=True,
-                    download_name=f"Global_Inventory_{timestamp}.pdf"
-                )
-            else:
-                flash("Error creating PDF.", "danger")
-                return redirect(url_for('reports.global_report'))
+        params = {'format': fmt, 'filters': filters, 'columns': selected_columns}
+        cached = _send_cached('global_report', params, "Global_Inventory")
+        if cached:
+            return cached
+
+        job = enqueue('global_report', current_user.id, params)
+        return job_response(job, 'reports.global_report')
 
-    # GET request: Show configuration page
     # GET request: Show configuration page
     return render_template(
         'reports/global_report.html',
         categories=categories,
-        staff_names=staff_names,
+        staff_members=staff_members,
     )
 
 
+# Noms de colonnes lisibles (français)
+GLOBAL_REPORT_COLUMNS = {
+    'name': "Article",
+    'category': 'Catégorie',
+    'quantity': 'Quantité',
+    'assigned_to': 'Assigné à',
+    'serial_number': 'Numéro de série',
+    'reference_code': 'Code de référence',
+    'description': 'Description',
+    'assigned_date': "Date d'affectation",
+    'created_at': 'Date de création',
+}
+
+
+DEFAULT_GLOBAL_REPORT_COLUMNS = ['name', 'category', 'quantity', 'assigned_to']
+
+
+def _report_value(value):
+    # format dates
+    if hasattr(value, 'isoformat'):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def _global_pdf_parts(rows, headers, chunk):
+    """One global_pdf.html document per `chunk` rows; the title goes on the first, the footer on the last."""
+    date = datetime.now()
+    data = list(islice(rows, chunk))
+    first = True
+    while True:
+        following = list(islice(rows, chunk))
+        yield render_template(
+            'reports/global_pdf.html',
+            data=[dict(zip(headers, row)) for row in data],
+            headers=headers,
+            date=date,
+            column_count=len(headers),
+            first=first,
+            last=not following,
+        )
+        if not following:
+            return
+        data, first = following, False
+
+
+@job_handler('global_report')
+def build_global_report(ctx):
+    """Runs the filtered inventory report (Excel or PDF) into the job's result file."""
+    fmt = ctx.params['format']
+    filters = ctx.params['filters']
+    selected_columns = [c for c in ctx.params['columns'] if c in GLOBAL_REPORT_COLUMNS] \
+        or DEFAULT_GLOBAL_REPORT_COLUMNS
+
+    key = report_cache.cache_key(ctx.user_id, 'global_report', ctx.params)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ext, mimetype = REPORT_FORMATS[fmt]
+    path = ctx.result_file(f"Global_Inventory_{timestamp}.{ext}", mimetype)
+    if _copy_from_cache(key, path):
+        return {'cached': True}
+
+    date_from = datetime.strptime(filters['date_from'], '%Y-%m-%d') if filters.get('date_from') else None
+    date_to = datetime.strptime(filters['date_to'], '%Y-%m-%d') if filters.get('date_to') else None
+
+    # Construire la requête avec filtres
+    query = Item.query.filter_by(user_id=ctx.user_id)
+    if filters.get('category'):
+        query = query.filter(Item.category == filters['category'])
+    if filters.get('staff'):
+        query = query.filter(Item.assigned_staff_id == filters['staff'])
+    if date_from:
+        query = query.filter(Item.created_at >= date_from)
+    if date_to:
+        # inclure toute la journée de fin
+        end_of_day = date_to.replace(hour=23, minute=59, second=59)
+        query = query.filter(Item.created_at <= end_of_day)
+
+    total = query.count()
+    ctx.progress(0, total, "Building report")
+
+    # Only the selected columns, fetched in chunks (server-side cursor on Postgres)
+    headers = [GLOBAL_REPORT_COLUMNS[c] for c in selected_columns]
+    rows = query.with_entities(*[getattr(Item, c) for c in selected_columns]) \
+        .order_by(Item.id) \
+        .yield_per(current_app.config.get('EXPORT_CHUNK_SIZE', 1000))
+    rows = ([_report_value(v) for v in row] for row in rows)
+
+    if fmt == 'excel':
+        write_xlsx(path, [('Rapport inventaire', headers, rows)])
+    else:
+        # Tableau HTML par tranches de GLOBAL_PDF_CHUNK_ROWS lignes, rendues en
+        # parallèle puis fusionnées (pagination continue)
+        chunk = current_app.config.get('GLOBAL_PDF_CHUNK_ROWS', 1000)
+        render_pdf_parts(_global_pdf_parts(rows, headers, chunk), path)
+
+    report_cache.put(key, path)
+    return {'rows': total}
+
+
 @reports_bp.route('/reports/staff/all')
 @login_required
 def export_all_staff_list():
     """
     Export ALL staff members to Excel.
     """
-    staff_members = Staff.query.filter_by(user_id=current_user.id).order_by(Staff.name).all()
-    
-    data = []
-    for s in staff_members:
-        data.append({
-            "Nom": s.name,
-            "Email": s.email,
-            "Téléphone": s.phone,
-            "Fonction": s.position,
-            "Département": s.department
-        })
-    
-    df = pd.DataFrame(data)
+    rows = db.session.query(Staff.name, Staff.email, Staff.phone, Staff.position, Staff.department) \
+        .filter(Staff.user_id == current_user.id) \
+        .order_by(Staff.name) \
+        .yield_per(current_app.config.get('EXPORT_CHUNK_SIZE', 1000))
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Personnel')
-    
+
+    # Spooled to an anonymous temp file (removed when the response is closed)
+    output = tempfile.TemporaryFile()
+    write_xlsx(output, [('Personnel', ["Nom", "Email", "Téléphone", "Fonction", "Département"], rows)])
     output.seek(0)
-    
+
     return send_file(
         output,
         download_name=f"Liste_Personnel_{timestamp}.xlsx",
         as_attachment=True,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        mimetype=XLSX_MIMETYPE
     )
@@ -0,0 +1,213 @@
+import re
+import click
+from sqlalchemy import DDL, event, func, literal_column, or_, select, table, column, text
+from extensions import db
+from models import Item, Staff
+
+
+# -----------------------------
+# INDEXED COLUMNS
+# -----------------------------
+# Order matters: it is also the order of the bm25() weights below.
+ITEM_COLUMNS = ["name", "serial_number", "reference_code", "category", "description"]
+STAFF_COLUMNS = ["name", "email", "position", "department"]
+
+ITEM_WEIGHTS = [10.0, 8.0, 8.0, 2.0, 1.0]
+STAFF_WEIGHTS = [10.0, 4.0, 2.0, 2.0]
+
+# Columns that also get a trigram index on Postgres, for partial codes
+# typed from the middle ("0042" in "SN-00420042").
+ITEM_TRIGRAM_COLUMNS = ["serial_number", "reference_code"]
+
+
+def _tsvector_sql(columns, prefix=""):
+    """
+    The exact expression indexed on Postgres. Queries must use the same text
+    (up to table qualification) for the planner to pick the GIN index.
+    """
+    parts = " || ' ' || ".join(f"coalesce({prefix}{c}, '')" for c in columns)
+    return f"to_tsvector('simple', {parts})"
+
+
+# -----------------------------
+# SQLITE: FTS5 EXTERNAL-CONTENT TABLES
+# -----------------------------
+def _sqlite_ddl(source, columns):
+    fts = f"{source}_fts"
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"new.{c}" for c in columns)
+    old_vals = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{source}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+# -----------------------------
+# POSTGRES: GIN INDEXES
+# -----------------------------
+def _postgres_ddl(source, columns, trigram_columns=()):
+    statements = [
+        f"CREATE INDEX IF NOT EXISTS ix_{source}_search ON {source} USING gin ({_tsvector_sql(columns)})",
+    ]
+    if trigram_columns:
+        statements.insert(0, "CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for c in trigram_columns:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS ix_{source}_{c}_trgm ON {source} USING gin ({c} gin_trgm_ops)"
+        )
+    return statements
+
+
+for _table, _columns, _trigrams in (
+    (Item.__table__, ITEM_COLUMNS, ITEM_TRIGRAM_COLUMNS),
+    (Staff.__table__, STAFF_COLUMNS, ()),
+):
+    for _sql in _sqlite_ddl(_table.name, _columns):
+        event.listen(_table, "after_create", DDL(_sql).execute_if(dialect="sqlite"))
+    for _sql in _postgres_ddl(_table.name, _columns, _trigrams):
+        event.listen(_table, "after_create", DDL(_sql).execute_if(dialect="postgresql"))
+    event.listen(
+        _table, "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {_table.name}_fts").execute_if(dialect="sqlite"),
+    )
+
+
+# -----------------------------
+# QUERY HELPERS
+# -----------------------------
+def _tokens(q):
+    return re.findall(r"\w+", q or "", flags=re.UNICODE)
+
+
+def _like_pattern(q):
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _fts_match(q):
+    """Every token must match, as a prefix: 'lap 00' -> "lap"* AND "00"*"""
+    return " ".join(f'"{t}"*' for t in _tokens(q))
+
+
+def _pg_tsquery(q):
+    return " & ".join(f"{t}:*" for t in _tokens(q))
+
+
+def _ranked_sqlite(model, columns, weights, q):
+    fts_name = f"{model.__tablename__}_fts"
+    fts = table(fts_name, column("rowid"))
+    fts_ref = literal_column(fts_name)
+    return select(
+        fts.c.rowid.label("id"),
+        func.bm25(fts_ref, *weights).label("rank"),
+    ).select_from(fts).where(fts_ref.op("MATCH")(_fts_match(q))).subquery()
+
+
+def _matching_staff_ids(user_id, q, dialect):
+    """Subquery of the user's staff ids matching `q`, through the staff index."""
+    if dialect == "postgresql":
+        vector = literal_column(_tsvector_sql(STAFF_COLUMNS, prefix="staff."))
+        match = vector.op("@@")(func.to_tsquery("simple", _pg_tsquery(q)))
+        return select(Staff.id).where(Staff.user_id == user_id, match)
+    if dialect == "sqlite":
+        ranked = _ranked_sqlite(Staff, STAFF_COLUMNS, STAFF_WEIGHTS, q)
+        return select(ranked.c.id)
+    like = _like_pattern(q)
+    return select(Staff.id).where(
+        Staff.user_id == user_id, or_(*[getattr(Staff, c).ilike(like, escape="\\") for c in STAFF_COLUMNS])
+    )
+
+
+# -----------------------------
+# PUBLIC API
+# -----------------------------
+def search_items(user_id, q):
+    """
+    Returns a query of the user's items matching `q`, best match first.
+
+    Matches name, serial number, reference code, category and description
+    by word prefix, any substring of serial number / reference code, and
+    the name or department of the staff member the item is assigned to.
+    """
+    dialect = db.engine.dialect.name
+    like = _like_pattern(q)
+    query = Item.query.filter(Item.user_id == user_id)
+    partial_code = or_(
+        Item.serial_number.ilike(like, escape="\\"),
+        Item.reference_code.ilike(like, escape="\\"),
+    )
+
+    if not _tokens(q):
+        return query.filter(partial_code).order_by(Item.created_at.desc(), Item.id.desc())
+
+    # secondary hits rank after direct matches on the item itself
+    secondary = or_(partial_code, Item.assigned_staff_id.in_(_matching_staff_ids(user_id, q, dialect)))
+
+    if dialect == "postgresql":
+        vector = literal_column(_tsvector_sql(ITEM_COLUMNS, prefix="item."))
+        tsquery = func.to_tsquery("simple", _pg_tsquery(q))
+        return query.filter(or_(vector.op("@@")(tsquery), secondary)) \
+            .order_by(func.ts_rank(vector, tsquery).desc(), Item.id.desc())
+
+    if dialect == "sqlite":
+        ranked = _ranked_sqlite(Item, ITEM_COLUMNS, ITEM_WEIGHTS, q)
+        # bm25() is negative: lower is better; secondary-only hits sort last
+        return query.outerjoin(ranked, ranked.c.id == Item.id) \
+            .filter(or_(ranked.c.id.isnot(None), secondary)) \
+            .order_by(ranked.c.id.is_(None), ranked.c.rank, Item.id.desc())
+
+    return query.filter(or_(*[getattr(Item, c).ilike(like, escape="\\") for c in ITEM_COLUMNS], secondary)) \
+        .order_by(Item.created_at.desc(), Item.id.desc())
+
+
+def search_staff(user_id, q, limit=20):
+    """Returns up to `limit` of the user's staff members matching `q`, best match first."""
+    dialect = db.engine.dialect.name
+    query = Staff.query.filter(Staff.user_id == user_id)
+
+    if not _tokens(q):
+        return []
+
+    if dialect == "postgresql":
+        vector = literal_column(_tsvector_sql(STAFF_COLUMNS, prefix="staff."))
+        tsquery = func.to_tsquery("simple", _pg_tsquery(q))
+        query = query.filter(vector.op("@@")(tsquery)) \
+            .order_by(func.ts_rank(vector, tsquery).desc(), Staff.name)
+    elif dialect == "sqlite":
+        ranked = _ranked_sqlite(Staff, STAFF_COLUMNS, STAFF_WEIGHTS, q)
+        query = query.join(ranked, ranked.c.id == Staff.id).order_by(ranked.c.rank, Staff.name)
+    else:
+        like = _like_pattern(q)
+        query = query.filter(or_(*[getattr(Staff, c).ilike(like, escape="\\") for c in STAFF_COLUMNS])) \
+            .order_by(Staff.name)
+
+    return query.limit(limit).all()
+
+
+def rebuild_search_index():
+    """Rebuilds the search structures from the base tables (after restores or bulk SQL)."""
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        for name in ("item_fts", "staff_fts"):
+            db.session.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        for name in ("ix_item_search", "ix_item_serial_number_trgm",
+                     "ix_item_reference_code_trgm", "ix_staff_search"):
+            db.session.execute(text(f"REINDEX INDEX {name}"))
+    db.session.commit()
+
+
+def init_app(app):
+    @app.cli.command("search-reindex")
+    def search_reindex_command():
+        """Rebuild the full-text search index."""
+        rebuild_search_index()
+        click.echo("Search index rebuilt.")
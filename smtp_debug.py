@@ -0,0 +1,108 @@
+import socketserver
+import threading
+from email import message_from_bytes, policy
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib / Flask-Mail: EHLO, AUTH, MAIL, RCPT, DATA, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            refuse = server.fail_next > 0
+            server.fail_next -= refuse
+        if refuse:
+            self.reply("421 service not available, try again later")
+            return
+        self.reply("220 localhost debug SMTP")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                # any credentials are accepted
+                if len(command.split()) == 2:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                self.reply("235 authenticated")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address in server.refused:
+                    self.reply("550 no such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end data with <CR><LF>.<CR><LF>")
+                data = []
+                for raw in self.rfile:
+                    if raw in (b".\r\n", b".\n"):
+                        break
+                    data.append(raw[1:] if raw.startswith(b"..") else raw)
+                message = message_from_bytes(b"".join(data), policy=policy.default)
+                if message["Subject"] in server.rejected_subjects:
+                    self.reply("554 message rejected")
+                    continue
+                with server.lock:
+                    server.messages.append({"sender": sender, "recipients": recipients, "message": message})
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 command not implemented")
+
+
+class DebugSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP stand-in that keeps received messages in memory. For tests
+    and development: point MAIL_SERVER / MAIL_PORT at it, MAIL_USE_TLS off.
+
+    `fail_next` drops the next N connections with a 421, `refused` rejects
+    recipients and `rejected_subjects` answers 554 to those messages' DATA,
+    to exercise retries.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.fail_next = 0
+        self.refused = set()
+        self.rejected_subjects = set()
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,76 @@
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import func, case
+from extensions import db
+from models import Item
+import summary
+
+
+InventoryStats = namedtuple("InventoryStats", ["total_items", "low_stock_count", "total_quantity", "low_stock_threshold"])
+
+
+def get_low_stock_threshold():
+    return current_app.config.get("LOW_STOCK_THRESHOLD", 5)
+
+
+# -----------------------------
+# AGGREGATE STATS
+# -----------------------------
+def get_inventory_stats(user_id, low_stock_threshold=None):
+    """
+    Returns the summary numbers shown on the index and dashboard pages.
+
+    Read from the user's InventorySummary row (summary.py), a primary-key
+    lookup. Another threshold than LOW_STOCK_THRESHOLD is computed live.
+    """
+    if low_stock_threshold is None or low_stock_threshold == get_low_stock_threshold():
+        row = summary.get_summary(user_id)
+        if row is not None:
+            return InventoryStats(
+                total_items=row.total_items,
+                low_stock_count=row.low_stock_count,
+                total_quantity=row.total_quantity,
+                low_stock_threshold=row.low_stock_threshold,
+            )
+    return compute_inventory_stats(user_id, low_stock_threshold)
+
+
+def compute_inventory_stats(user_id, low_stock_threshold=None):
+    """
+    The same numbers straight from the item table: conditional aggregates
+    in a single SELECT instead of one COUNT each.
+    """
+    if low_stock_threshold is None:
+        low_stock_threshold = get_low_stock_threshold()
+
+    row = db.session.query(
+        func.count(Item.id),
+        func.coalesce(func.sum(case((Item.quantity < low_stock_threshold, 1), else_=0)), 0),
+        func.coalesce(func.sum(Item.quantity), 0),
+    ).filter(Item.user_id == user_id).one()
+
+    return InventoryStats(
+        total_items=row[0],
+        low_stock_count=row[1],
+        total_quantity=row[2],
+        low_stock_threshold=low_stock_threshold,
+    )
+
+
+# -----------------------------
+# LOW STOCK LIST (CAPPED)
+# -----------------------------
+def get_low_stock_items(user_id, low_stock_threshold=None, limit=None):
+    """
+    Returns at most `limit` low-stock items, lowest quantity first.
+    The full count comes from get_inventory_stats().
+    """
+    if low_stock_threshold is None:
+        low_stock_threshold = get_low_stock_threshold()
+    if limit is None:
+        limit = current_app.config.get("LOW_STOCK_LIST_LIMIT", 10)
+
+    return Item.query.filter(
+        Item.user_id == user_id,
+        Item.quantity < low_stock_threshold
+    ).order_by(Item.quantity, Item.id).limit(limit).all()
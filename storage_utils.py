@@ -1,6 +1,8 @@
 
+import hashlib
 import os
 import secrets
+import shutil
 try:
     import cloudinary
     import cloudinary.uploader
@@ -9,13 +11,23 @@ except ImportError:
 
 from flask import current_app
 from werkzeug.utils import secure_filename
+from extensions import db
+from jobs import job_handler
+
+_cloudinary_configured = None
+
 
 def get_cloudinary_config():
     """
     Returns True if Cloudinary env vars are set AND library is installed, else False.
-    Also configures the cloudinary library if keys are present.
+    Configures the cloudinary library once, the first time keys are found.
     """
+    global _cloudinary_configured
+    if _cloudinary_configured is not None:
+        return _cloudinary_configured
+
     if not cloudinary:
+        _cloudinary_configured = False
         return False
         
     cloud_name = os.environ.get("CLOUDINARY_CLOUD_NAME")
@@ -28,19 +40,23 @@ def get_cloudinary_config():
             api_key=api_key,
             api_secret=api_secret
         )
-        return True
-    return False
+        _cloudinary_configured = True
+    else:
+        _cloudinary_configured = False
+    return _cloudinary_configured
+
 
 def save_image_file(file_storage, folder="uploads"):
     """
-    Saves image to Cloudinary (if configured) OR Local Disk (fallback).
+    Saves image to Local Disk. Call schedule_remote_upload() once the row
+    using it is committed to have it moved to Cloudinary in the background.
     
     Args:
         file_storage: The file object from request.files['name']
         folder: 'uploads' (items) or 'avatars' (user profiles)
         
     Returns:
-        str: A full URL (if Cloudinary) OR a Filename (if Local).
+        str: The stored filename (relative to static/<folder>).
     """
     if not file_storage:
         return None
@@ -49,34 +65,169 @@ def save_image_file(file_storage, folder="uploads"):
     if not filename:
         return None
 
-    # 1. Try Cloudinary
-    if get_cloudinary_config():
-        try:
-            # We explicitly specify the folder in Cloudinary
-            res = cloudinary.uploader.upload(file_storage, folder=f"inventory_app/{folder}")
-            return res.get("secure_url")
-        except Exception as e:
-            # If upload fails, log it and fall back to local? 
-            # Or maybe just print error and continue to local.
-            print(f"Cloudinary upload failed: {e}")
-
-    # 2. Fallback to Local Storage
-    # Generate unique name
-    timestamp = secrets.token_hex(8)
+    # Content-addressed: the name is the SHA-256 of the bytes, so the same
+    # photo uploaded for many items is stored (and cached by browsers) once.
     _, ext = os.path.splitext(filename)
-    new_filename = f"{timestamp}{ext}" # 1234abcd.jpg
-    
-    # Check if folder is 'uploads' or 'avatars' to match existing logic
-    # Existing logic in main.py put items in 'static/uploads'
-    # Existing logic in profile.py put items in 'static/avatars'
-    
-    # We will return JUST the filename so the existing code (mostly) works, 
-    # BUT we need to distinguish between URL and Filename in the template.
-    
-    target_dir = os.path.join(current_app.root_path, "static", folder)
-    os.makedirs(target_dir, exist_ok=True)
-    
-    save_path = os.path.join(target_dir, new_filename)
-    file_storage.save(save_path)
+    new_filename = _store_blob(file_storage, folder, ext.lower())
+
+    # Thumbnail / medium / WebP copies, so pages never serve the full-size photo.
+    # Otherwise they are built on first request by images.derivative.
+    if current_app.config.get("IMAGE_DERIVATIVES_EAGER", True):
+        from images import make_derivatives, derivative_path
+        if not os.path.exists(derivative_path(folder, new_filename, "thumb", "webp")):
+            make_derivatives(folder, new_filename)
     
     return new_filename
+
+
+# -----------------------------
+# CONTENT-ADDRESSED BLOBS
+# -----------------------------
+CHUNK_SIZE = 64 * 1024
+# Never deleted, whatever the reference count says
+SHARED_FILES = {"default.png"}
+
+
+def _folder_path(folder):
+    return os.path.join(current_app.root_path, "static", folder)
+
+
+def _store_blob(file_storage, folder, ext):
+    """
+    Streams an upload to static/<folder>/<aa>/<bb>/<sha256><ext> and returns
+    that relative name. If the blob already exists the copy is dropped.
+    """
+    target_dir = _folder_path(folder)
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_path = os.path.join(target_dir, f".upload-{secrets.token_hex(8)}")
+
+    digest = hashlib.sha256()
+    stream = file_storage.stream
+    if stream.seekable():
+        stream.seek(0)
+    with open(tmp_path, "wb") as out:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            out.write(chunk)
+
+    hexdigest = digest.hexdigest()
+    name = f"{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{ext}"
+    final_path = os.path.join(target_dir, name)
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+    return name
+
+
+def count_references(folder, filename):
+    """How many rows still point at a stored file (items for uploads, users for avatars)."""
+    from models import Item, User
+    column = Item.image_filename if folder == "uploads" else User.avatar
+    return column.class_.query.filter(column == filename).count()
+
+
+def release_image(folder, filename):
+    """
+    Deletes a locally stored image and its resized copies once nothing
+    references it. Call after the referencing change is committed.
+    """
+    if not filename or filename.startswith("http") or filename in SHARED_FILES:
+        return False
+    if count_references(folder, filename):
+        return False
+
+    from images import remove_derivatives
+    path = os.path.join(_folder_path(folder), filename)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    remove_derivatives(folder, filename)
+    return True
+
+
+# -----------------------------
+# REMOTE STORAGE (BACKGROUND)
+# -----------------------------
+class CloudinaryStorage:
+    def upload(self, path, folder, public_id):
+        res = cloudinary.uploader.upload(
+            path,
+            folder=f"inventory_app/{folder}",
+            # same bytes -> same public id, so duplicates are not stored twice remotely
+            public_id=public_id,
+            overwrite=False,
+            unique_filename=False,
+        )
+        return res["secure_url"]
+
+
+class LocalStubStorage:
+    """Stand-in remote store for development and tests: copies into REMOTE_STUB_DIR."""
+
+    def upload(self, path, folder, public_id):
+        config = current_app.config
+        target_dir = os.path.join(config["REMOTE_STUB_DIR"], folder)
+        os.makedirs(target_dir, exist_ok=True)
+        name = public_id + os.path.splitext(path)[1]
+        shutil.copyfile(path, os.path.join(target_dir, name))
+        return f"{config.get('REMOTE_STUB_BASE_URL', 'http://remote.invalid')}/{folder}/{name}"
+
+
+def get_remote_storage():
+    """The configured remote backend, or None when images stay on local disk."""
+    backend = current_app.config.get("REMOTE_STORAGE")
+    if backend == "stub":
+        return LocalStubStorage()
+    if backend == "cloudinary" or (backend is None and get_cloudinary_config()):
+        return CloudinaryStorage() if get_cloudinary_config() else None
+    return None
+
+
+def schedule_remote_upload(folder, filename, user_id):
+    """
+    Queues the push of a local image to the remote store. Returns the job,
+    or None when there is nothing to do. Always left to the `jobs-worker`,
+    even with JOBS_ASYNC off: pages use the local copy until it is done.
+    """
+    if not filename or filename.startswith("http") or get_remote_storage() is None:
+        return None
+    from jobs import enqueue
+    return enqueue(
+        "remote_upload", user_id, {"folder": folder, "filename": filename},
+        max_attempts=current_app.config.get("REMOTE_UPLOAD_MAX_ATTEMPTS", 5),
+        inline=False,
+    )
+
+
+def _rows_using(folder, filename):
+    from models import Item, User
+    if folder == "uploads":
+        return Item.query.filter_by(image_filename=filename).all(), "image_filename"
+    return User.query.filter_by(avatar=filename).all(), "avatar"
+
+
+@job_handler("remote_upload")
+def run_remote_upload(ctx):
+    folder, filename = ctx.params["folder"], ctx.params["filename"]
+    rows, attr = _rows_using(folder, filename)
+    if not rows:
+        return {"skipped": "no longer used"}
+
+    storage = get_remote_storage()
+    if storage is None:
+        raise RuntimeError("Remote storage is not configured.")
+    path = os.path.join(_folder_path(folder), filename)
+    public_id = os.path.splitext(os.path.basename(filename))[0]
+    url = storage.upload(path, folder, public_id)  # failures are retried by the job queue
+
+    # Swap every row still pointing at the local file (ORM updates, so the
+    # report and user caches see the change), then drop the local copy.
+    rows, attr = _rows_using(folder, filename)
+    for row in rows:
+        setattr(row, attr, url)
+    db.session.commit()
+    release_image(folder, filename)
+    return {"url": url, "rows": len(rows)}
@@ -0,0 +1,294 @@
+import sys
+from collections import defaultdict
+import click
+from flask import current_app
+from sqlalchemy import case, delete, event, func, insert, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import AssigneeSummary, CategorySummary, InventorySummary, Item, Staff, User
+
+
+# Item columns the rollups depend on
+TRACKED = ("user_id", "quantity", "category", "assigned_staff_id")
+
+
+def _threshold():
+    return current_app.config.get("LOW_STOCK_THRESHOLD", 5)
+
+
+# -----------------------------
+# READS (PRIMARY-KEY LOOKUPS)
+# -----------------------------
+def get_summary(user_id):
+    """
+    The user's InventorySummary row (totals, low-stock count). Built from
+    the item table on first use, or when LOW_STOCK_THRESHOLD has changed.
+    """
+    row = _read(user_id)
+    if row is None or row.low_stock_threshold != _threshold():
+        try:
+            rebuild(user_id)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # built at the same time by another request
+        row = _read(user_id)
+    return row
+
+
+def _read(user_id):
+    return db.session.query(
+        InventorySummary.total_items,
+        InventorySummary.total_quantity,
+        InventorySummary.low_stock_count,
+        InventorySummary.low_stock_threshold,
+    ).filter(InventorySummary.user_id == user_id).first()
+
+
+def get_categories(user_id):
+    """The user's item categories, in alphabetical order."""
+    get_summary(user_id)  # the category rows are built with it
+    rows = db.session.query(CategorySummary.category) \
+        .filter(CategorySummary.user_id == user_id, CategorySummary.item_count > 0) \
+        .order_by(CategorySummary.category)
+    return [category for (category,) in rows]
+
+
+# -----------------------------
+# INCREMENTAL UPDATES
+# -----------------------------
+class _Deltas:
+    """Per-row changes to the summary tables collected over one flush."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.users = defaultdict(lambda: [0, 0, 0])     # user_id -> items, quantity, low stock
+        self.categories = defaultdict(lambda: [0, 0])   # (user_id, category) -> items, quantity
+        self.staff = defaultdict(lambda: [0, 0])        # (user_id, staff_id) -> items, quantity
+
+    def add(self, values, sign):
+        """Adds (sign=1) or removes (sign=-1) one item, given its TRACKED values."""
+        user_id, quantity, category, staff_id = values
+        if user_id is None:
+            return
+        total = self.users[user_id]
+        total[0] += sign
+        total[1] += sign * (quantity or 0)
+        if quantity is not None and quantity < self.threshold:
+            total[2] += sign
+        if category is not None:
+            self.categories[(user_id, category)][0] += sign
+            self.categories[(user_id, category)][1] += sign * (quantity or 0)
+        if staff_id is not None:
+            self.staff[(user_id, staff_id)][0] += sign
+            self.staff[(user_id, staff_id)][1] += sign * (quantity or 0)
+
+    def apply(self, connection, skip_users=(), skip_staff=()):
+        # Only users whose summary was built are maintained; the others get
+        # everything at once when it is first read.
+        built = set()
+        for user_id, (items, quantity, low) in self.users.items():
+            if user_id in skip_users:
+                continue
+            matched = connection.execute(
+                update(InventorySummary).where(InventorySummary.user_id == user_id).values(
+                    total_items=InventorySummary.total_items + items,
+                    total_quantity=InventorySummary.total_quantity + quantity,
+                    low_stock_count=InventorySummary.low_stock_count + low,
+                )
+            ).rowcount
+            if matched:
+                built.add(user_id)
+
+        for (user_id, category), (items, quantity) in self.categories.items():
+            if user_id in built and (items or quantity):
+                _add(connection, CategorySummary, {"user_id": user_id, "category": category},
+                     {"item_count": items, "total_quantity": quantity})
+        for (user_id, staff_id), (items, quantity) in self.staff.items():
+            if user_id in built and staff_id not in skip_staff and (items or quantity):
+                _add(connection, AssigneeSummary, {"user_id": user_id, "staff_id": staff_id},
+                     {"item_count": items, "total_quantity": quantity})
+
+
+def _add(connection, model, keys, values):
+    """Adds `values` to the row at `keys`, creating it if needed (same upsert as bump_data_version)."""
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(model).values(**keys, **values)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: getattr(model, name) + stmt.excluded[name] for name in values},
+        ))
+        return
+    added = connection.execute(
+        update(model).where(*[getattr(model, k) == v for k, v in keys.items()])
+        .values({name: getattr(model, name) + v for name, v in values.items()})
+    ).rowcount
+    if not added:
+        connection.execute(insert(model).values(**keys, **values))
+
+
+def _snapshot(session, item_ids=(), staff_ids=(), user_ids=()):
+    """TRACKED values of the matching items as stored in the database, by item id."""
+    conditions = []
+    if item_ids:
+        conditions.append(Item.id.in_(item_ids))
+    # items the flush itself unlinks from a deleted staff member / user
+    if staff_ids:
+        conditions.append(Item.assigned_staff_id.in_(staff_ids))
+    if user_ids:
+        conditions.append(Item.user_id.in_(user_ids))
+    if not conditions:
+        return {}
+    rows = session.connection().execute(
+        select(Item.id, *[getattr(Item, name) for name in TRACKED]).where(or_(*conditions))
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+@event.listens_for(db.session, "before_flush")
+def _remember_stored_values(session, flush_context, instances):
+    # Read back from the database rather than from attribute history: an
+    # expired attribute set after a commit has no old value in memory.
+    changed = [obj for obj in list(session.dirty) + list(session.deleted)
+               if isinstance(obj, Item) and obj.id is not None]
+    deleted_staff = [obj.id for obj in session.deleted if isinstance(obj, Staff)]
+    deleted_users = [obj.id for obj in session.deleted if isinstance(obj, User)]
+    if changed or deleted_staff or deleted_users:
+        session.info["summary_before"] = (
+            _snapshot(session, [obj.id for obj in changed], deleted_staff, deleted_users),
+            deleted_staff,
+            deleted_users,
+        )
+
+
+@event.listens_for(db.session, "after_flush")
+def _apply_item_changes(session, flush_context):
+    before, deleted_staff, deleted_users = session.info.pop("summary_before", ({}, [], []))
+    new_ids = [obj.id for obj in session.new if isinstance(obj, Item)]
+    if not (before or new_ids or deleted_staff or deleted_users):
+        return
+
+    connection = session.connection()
+    # ON DELETE CASCADE does the same, where foreign keys are enforced
+    if deleted_staff:
+        connection.execute(delete(AssigneeSummary).where(AssigneeSummary.staff_id.in_(deleted_staff)))
+    if deleted_users:
+        for model in (InventorySummary, CategorySummary, AssigneeSummary):
+            connection.execute(delete(model).where(model.user_id.in_(deleted_users)))
+
+    after = _snapshot(session, list(before) + new_ids)
+    deltas = _Deltas(_threshold())
+    for item_id in set(before) | set(after):
+        old, new = before.get(item_id), after.get(item_id)
+        if old != new:
+            if old is not None:
+                deltas.add(old, -1)
+            if new is not None:
+                deltas.add(new, 1)
+    deltas.apply(connection, skip_users=set(deleted_users), skip_staff=set(deleted_staff))
+
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_stored_values(session):
+    # a failed flush never reaches after_flush: don't diff the next one against it
+    session.info.pop("summary_before", None)
+
+
+def record_inserted_items(connection, rows):
+    """Core inserts skip the flush events: counts `rows` (Item column dicts) in."""
+    deltas = _Deltas(_threshold())
+    for row in rows:
+        deltas.add((row.get("user_id"), row.get("quantity", 0), row.get("category"),
+                    row.get("assigned_staff_id")), 1)
+    deltas.apply(connection)
+
+
+# -----------------------------
+# REBUILD / CHECK
+# -----------------------------
+def _user_totals(user_id, threshold):
+    query = select(
+        User.id,
+        func.count(Item.id),
+        func.coalesce(func.sum(Item.quantity), 0),
+        func.coalesce(func.sum(case((Item.quantity < threshold, 1), else_=0)), 0),
+        literal(threshold),
+    ).select_from(User).outerjoin(Item, Item.user_id == User.id).group_by(User.id)
+    return query.where(User.id == user_id) if user_id is not None else query
+
+
+def _group_totals(column, user_id):
+    query = select(Item.user_id, column, func.count(Item.id), func.coalesce(func.sum(Item.quantity), 0)) \
+        .where(Item.user_id.isnot(None), column.isnot(None)) \
+        .group_by(Item.user_id, column)
+    return query.where(Item.user_id == user_id) if user_id is not None else query
+
+
+def _tables(user_id, threshold):
+    # model, its columns in the order of the aggregate query, key length, aggregate query
+    return [
+        (InventorySummary, ["user_id", "total_items", "total_quantity", "low_stock_count", "low_stock_threshold"],
+         1, _user_totals(user_id, threshold)),
+        (CategorySummary, ["user_id", "category", "item_count", "total_quantity"],
+         2, _group_totals(Item.category, user_id)),
+        (AssigneeSummary, ["user_id", "staff_id", "item_count", "total_quantity"],
+         2, _group_totals(Item.assigned_staff_id, user_id)),
+    ]
+
+
+def rebuild(user_id=None):
+    """Recomputes the summary rows of one user (or everyone) from the item table. The caller commits."""
+    for model, columns, _, aggregate in _tables(user_id, _threshold()):
+        stale = delete(model)
+        if user_id is not None:
+            stale = stale.where(model.user_id == user_id)
+        db.session.execute(stale)
+        db.session.execute(insert(model).from_select(columns, aggregate))
+
+
+def check(user_id=None):
+    """
+    Compares the summary tables with a fresh aggregate of the item table.
+    Returns (table, key, stored, expected) for every difference. Users whose
+    summary hasn't been built yet are skipped.
+    """
+    problems = []
+    built = None
+    for model, columns, key_length, aggregate in _tables(user_id, _threshold()):
+        query = db.session.query(*[getattr(model, c) for c in columns])
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        stored = {tuple(row[:key_length]): tuple(row[key_length:]) for row in query}
+        expected = {tuple(row[:key_length]): tuple(row[key_length:]) for row in db.session.execute(aggregate)}
+        if built is None:
+            built = {key[0] for key in stored}
+        else:
+            stored = {k: v for k, v in stored.items() if any(v)}  # emptied rows are kept at zero
+        for key in sorted(set(stored) | set(expected), key=repr):
+            if key[0] in built and stored.get(key) != expected.get(key):
+                problems.append((model.__tablename__, key, stored.get(key), expected.get(key)))
+    return problems
+
+
+def init_app(app):
+    @app.cli.command("summary-rebuild")
+    @click.option("--user", "user_id", type=int, help="Only this user's rows.")
+    def summary_rebuild_command(user_id):
+        """Rebuild the inventory summary tables from the items."""
+        rebuild(user_id)
+        db.session.commit()
+        click.echo("Inventory summary rebuilt.")
+
+    @app.cli.command("summary-check")
+    @click.option("--user", "user_id", type=int, help="Only this user's rows.")
+    def summary_check_command(user_id):
+        """Compare the inventory summary tables with the items; exit 1 on drift."""
+        problems = check(user_id)
+        for table, key, stored, expected in problems:
+            click.echo(f"{table} {key}: stored {stored}, expected {expected}")
+        if problems:
+            click.echo(f"{len(problems)} difference(s); run `flask summary-rebuild` to fix them.")
+            sys.exit(1)
+        click.echo("Inventory summary is consistent.")
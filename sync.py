@@ -0,0 +1,126 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, insert, tuple_
+from extensions import db
+from models import Item, ItemTombstone
+from pagination import InvalidCursor
+
+
+class CursorExpired(Exception):
+    """The cursor is older than the tombstones kept: the client must resync."""
+
+
+# -----------------------------
+# TOMBSTONES
+# -----------------------------
+@event.listens_for(db.session, "after_flush")
+def _record_deleted_items(session, flush_context):
+    rows = [
+        {"item_id": obj.id, "user_id": obj.user_id, "deleted_at": datetime.utcnow()}
+        for obj in session.deleted
+        if isinstance(obj, Item) and obj.user_id is not None
+    ]
+    if rows:
+        session.connection().execute(insert(ItemTombstone), rows)
+
+
+def purge_tombstones():
+    """Drops tombstones older than SYNC_TOMBSTONE_TTL_DAYS; older cursors get 410."""
+    deleted = ItemTombstone.query.filter(ItemTombstone.deleted_at < _retention_horizon()).delete()
+    db.session.commit()
+    return deleted
+
+
+def _retention_horizon():
+    return datetime.utcnow() - timedelta(days=current_app.config.get("SYNC_TOMBSTONE_TTL_DAYS", 30))
+
+
+# -----------------------------
+# CURSOR
+# -----------------------------
+# A position in the change stream: (timestamp, kind, id). At the same
+# timestamp upserts ("u") sort before deletes ("d"), see KIND_ORDER.
+KIND_ORDER = {"u": 0, "d": 1}
+
+
+def encode_cursor(ts, kind, row_id):
+    raw = json.dumps({"t": ts.isoformat(), "k": kind, "i": row_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["k"] not in ("u", "d"):
+            raise ValueError(payload["k"])
+        return datetime.fromisoformat(payload["t"]), payload["k"], int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {token!r}") from e
+
+
+# -----------------------------
+# CHANGES
+# -----------------------------
+def item_changes(user_id, since=None, limit=None):
+    """
+    Inserts, updates and deletes of a user's items after `since`, oldest
+    first, at most `limit` of them. Returns (changes, next_cursor, has_more).
+
+    "insert" (created after the cursor) and "update" are a hint only:
+    clients should apply both as upserts by id.
+
+    Rows written in the last SYNC_SETTLE_SECONDS are held back: a slower
+    transaction may still commit a row with an earlier updated_at, and a
+    client whose cursor had already moved past it would never see it.
+    """
+    config = current_app.config
+    batch_size = config.get("SYNC_BATCH_SIZE", 500)
+    # at least one change per call, or a sync loop on has_more never advances
+    limit = max(1, min(limit or batch_size, batch_size))
+    horizon = datetime.utcnow() - timedelta(seconds=config.get("SYNC_SETTLE_SECONDS", 5))
+
+    items = Item.query.filter(Item.user_id == user_id, Item.updated_at <= horizon)
+    tombstones = ItemTombstone.query.filter(
+        ItemTombstone.user_id == user_id, ItemTombstone.deleted_at <= horizon
+    )
+    since_ts = None
+    if since:
+        since_ts, kind, row_id = decode_cursor(since)
+        if since_ts < _retention_horizon():
+            raise CursorExpired()
+        if kind == "u":
+            items = items.filter(tuple_(Item.updated_at, Item.id) > tuple_(since_ts, row_id))
+            tombstones = tombstones.filter(ItemTombstone.deleted_at >= since_ts)
+        else:
+            items = items.filter(Item.updated_at > since_ts)
+            tombstones = tombstones.filter(
+                tuple_(ItemTombstone.deleted_at, ItemTombstone.id) > tuple_(since_ts, row_id)
+            )
+
+    # each side is an index range scan; merge the two and keep the first `limit`
+    upserts = items.order_by(Item.updated_at, Item.id).limit(limit + 1).all()
+    deletes = tombstones.order_by(ItemTombstone.deleted_at, ItemTombstone.id).limit(limit + 1).all()
+    stream = sorted(
+        [(i.updated_at, "u", i.id, i) for i in upserts] + [(t.deleted_at, "d", t.id, t) for t in deletes],
+        key=lambda change: (change[0], KIND_ORDER[change[1]], change[2]),
+    )
+    has_more = len(stream) > limit
+    stream = stream[:limit]
+
+    changes = []
+    for ts, kind, _, row in stream:
+        if kind == "d":
+            changes.append({"op": "delete", "id": row.item_id, "at": ts.isoformat()})
+        else:
+            op = "insert" if since_ts is None or row.created_at > since_ts else "update"
+            changes.append({"op": op, "id": row.id, "item": row.to_dict()})
+
+    if stream:
+        ts, kind, row_id, _ = stream[-1]
+        next_cursor = encode_cursor(ts, kind, row_id)
+    else:
+        next_cursor = since  # nothing new: poll again with the same cursor
+    return changes, next_cursor, has_more
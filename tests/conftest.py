@@ -8,8 +8,21 @@ from app import create_app
 from extensions import db
 
 @pytest.fixture
-def app():
-    app = create_app({'TESTING': True, 'WTF_CSRF_ENABLED': False})
+def app_config():
+    """Extra config for `app`: override this fixture in a module, or parametrize it."""
+    return {}
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        # keep generated files out of instance/ and away from other tests
+        'JOBS_DIR': str(tmp_path / "jobs"),
+        'IMPORT_REPORT_DIR': str(tmp_path / "import_reports"),
+        'REPORT_CACHE_DIR': str(tmp_path / "report_cache"),
+        **app_config,
+    })
 
     with app.app_context():
         db.create_all()
@@ -20,3 +33,29 @@ def app():
 @pytest.fixture
 def client(app):
     return app.test_client()
+
+@pytest.fixture
+def make_user(app):
+    """Creates an approved user; other User columns (role...) as keyword arguments."""
+    from models import User
+
+    def _make_user(username, password="pass", **fields):
+        fields.setdefault("is_approved", True)
+        user = User(username=username, email=f"{username}@example.com", **fields)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return _make_user
+
+@pytest.fixture
+def login(client, make_user):
+    """Creates an approved user and logs the test client in as them."""
+
+    def _login(username, password="pass", **fields):
+        user = make_user(username, password, **fields)
+        client.post('/auth/login', data={"username": username, "password": password})
+        return user
+
+    return _login
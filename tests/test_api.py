@@ -0,0 +1,169 @@
+import pytest
+from sqlalchemy import event
+from extensions import db
+from models import Item, ItemTombstone, Staff
+
+
+@pytest.fixture
+def api_user(make_user):
+    return make_user("integration")
+
+
+@pytest.fixture
+def auth(client, api_user):
+    response = client.post('/api/token', json={"username": "integration", "password": "pass"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json['token']}"}
+
+
+def test_tokens_are_checked_without_loading_the_user(client, app, auth):
+    user_selects = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM "user"' in statement or "FROM user" in statement:
+            user_selects.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = client.get('/api/items', headers=auth)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert user_selects == []
+
+    assert client.get('/api/items').status_code == 401
+    assert client.get('/api/items', headers={"Authorization": "Bearer not.a.jwt"}).status_code == 401
+
+
+def test_expired_tokens_and_pending_accounts_are_refused(client, app, api_user, make_user):
+    app.config["JWT_EXP_DELTA_SECONDS"] = -1
+    token = client.post('/api/token', json={"username": "integration", "password": "pass"}).json["token"]
+    assert client.get('/api/items', headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+    make_user("waiting", is_approved=False)
+    assert client.post('/api/token', json={"username": "waiting", "password": "pass"}).status_code == 403
+
+
+def test_items_are_scoped_to_the_token_owner(client, auth, api_user, make_user):
+    other = make_user("other_owner")
+    theirs = Item(name="Theirs", user_id=other.id)
+    db.session.add(theirs)
+    db.session.commit()
+
+    created = client.post('/api/items', json={"name": "Mine", "quantity": 2}, headers=auth)
+    assert created.status_code == 201
+    assert created.json["quantity"] == 2
+
+    assert client.get(f'/api/items/{created.json["id"]}', headers=auth).json["name"] == "Mine"
+    assert client.get(f'/api/items/{theirs.id}', headers=auth).status_code == 404
+    assert [i["name"] for i in client.get('/api/items', headers=auth).json["items"]] == ["Mine"]
+
+
+def test_unchanged_listing_returns_304(client, auth, api_user):
+    first = client.get('/api/items', headers=auth)
+    polled = client.get('/api/items', headers={**auth, "If-None-Match": first.headers["ETag"]})
+    assert polled.status_code == 304
+
+    client.post('/api/items', json={"name": "Scanner"}, headers=auth)
+    changed = client.get('/api/items', headers={**auth, "If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+
+
+def test_per_page_is_at_least_one(client, auth, api_user):
+    db.session.add_all([Item(name=f"Tape {n}", user_id=api_user.id) for n in range(3)])
+    db.session.commit()
+
+    for per_page in (0, -5):
+        keyset = client.get(f'/api/items?per_page={per_page}', headers=auth)
+        assert len(keyset.json["items"]) == 1 and keyset.json["next_cursor"]
+        paged = client.get(f'/api/items?page=1&per_page={per_page}', headers=auth)
+        assert paged.status_code == 200 and len(paged.json["items"]) == 1
+
+
+def test_batch_create_update_and_delete(client, auth, api_user):
+    staff = Staff(name="Nadia", user_id=api_user.id)
+    db.session.add(staff)
+    db.session.commit()
+
+    rows = [{"name": f"Badge {n}", "quantity": n} for n in range(300)]
+    rows[0]["assigned_staff_id"] = staff.id
+    created = client.post('/api/items/batch', json={"items": rows}, headers=auth)
+    assert created.status_code == 201
+    ids = [i["id"] for i in created.json["items"]]
+    assert len(ids) == 300
+    assert created.json["items"][0]["assigned_to"] == "Nadia"
+
+    patched = client.patch('/api/items/batch', headers=auth, json={
+        "items": [{"id": i, "quantity": 7} for i in ids[:200]],
+    })
+    assert patched.status_code == 200
+    assert Item.query.filter_by(user_id=api_user.id, quantity=7).count() == 200
+
+    deleted = client.delete('/api/items/batch', json={"ids": ids[:50]}, headers=auth)
+    assert deleted.status_code == 200
+    assert Item.query.filter_by(user_id=api_user.id).count() == 250
+    assert ItemTombstone.query.filter_by(user_id=api_user.id).count() == 50
+
+
+def test_a_bad_row_rejects_the_whole_batch(client, auth, api_user):
+    created = client.post('/api/items/batch', headers=auth, json={
+        "items": [{"name": "Valid"}, {"quantity": 3}, {"name": "Bad qty", "quantity": "many"}],
+    })
+    assert created.status_code == 400
+    assert [e["index"] for e in created.json["errors"]] == [1, 2]
+    assert Item.query.filter_by(user_id=api_user.id).count() == 0
+
+    item = Item(name="Stable", quantity=1, user_id=api_user.id)
+    db.session.add(item)
+    db.session.commit()
+    patched = client.patch('/api/items/batch', headers=auth, json={
+        "items": [{"id": item.id, "quantity": 5}, {"id": 999999, "quantity": 5}],
+    })
+    assert patched.status_code == 400
+    assert db.session.get(Item, item.id).quantity == 1
+
+    assert client.delete('/api/items/batch', json={"ids": [item.id, 999999]}, headers=auth).status_code == 404
+    assert db.session.get(Item, item.id) is not None
+
+    too_many = client.post('/api/items/batch', headers=auth, json={"items": [{"name": "x"}] * 501})
+    assert too_many.status_code == 413
+
+
+def test_malformed_ids_and_values_are_rejected_by_index(client, auth, api_user):
+    item = Item(name="Stable", quantity=1, user_id=api_user.id)
+    db.session.add(item)
+    db.session.commit()
+
+    patched = client.patch('/api/items/batch', headers=auth, json={
+        "items": [{"id": item.id, "quantity": 2}, {"id": [1]}, {"id": True}, "x"],
+    })
+    assert patched.status_code == 400
+    assert [e["index"] for e in patched.json["errors"]] == [1, 2, 3]
+
+    deleted = client.delete('/api/items/batch', headers=auth, json={"ids": [item.id, [1], "2", False]})
+    assert deleted.status_code == 400
+    assert [e["index"] for e in deleted.json["errors"]] == [1, 2, 3]
+
+    created = client.post('/api/items/batch', headers=auth, json={"items": [
+        {"name": "Ok", "quantity": 3},
+        {"name": "Staff list", "assigned_staff_id": [1]},
+        {"name": "Staff bool", "assigned_staff_id": True},
+        {"name": "Fraction", "quantity": 1.9},
+        {"name": "Text", "quantity": "3"},
+    ]})
+    assert created.status_code == 400
+    assert [e["index"] for e in created.json["errors"]] == [1, 2, 3, 4]
+    assert client.post('/api/items', headers=auth, json={"name": "One", "quantity": 1.9}).status_code == 400
+    assert db.session.get(Item, item.id).quantity == 1
+
+
+def test_changes_endpoint(client, app, auth):
+    app.config["SYNC_SETTLE_SECONDS"] = 0
+    client.post('/api/items', json={"name": "Handheld"}, headers=auth)
+    response = client.get('/api/items/changes', headers=auth)
+    assert response.status_code == 200
+    assert [c["op"] for c in response.json["changes"]] == ["insert"]
+    cursor = response.json["next_cursor"]
+
+    assert client.get(f'/api/items/changes?since={cursor}', headers=auth).json["changes"] == []
+    assert client.get('/api/items/changes?since=garbage', headers=auth).status_code == 400
@@ -0,0 +1,75 @@
+import pytest
+from email_utils import send_email
+from smtp_debug import DebugSMTPServer
+
+
+@pytest.fixture
+def smtp_server():
+    server = DebugSMTPServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def app_config(smtp_server):
+    return {
+        'MAIL_SUPPRESS_SEND': False,
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': smtp_server.port,
+        'MAIL_USE_TLS': False,
+        'MAIL_USERNAME': 'sender@example.com',
+        'MAIL_PASSWORD': 'secret',
+        'MAIL_RETRY_BACKOFF': 0.01,
+    }
+
+
+@pytest.fixture
+def mail_app(app):
+    yield app
+    app.extensions["mail_sender"].close(timeout=5)
+
+
+def test_a_wave_of_emails_shares_a_few_connections(mail_app, smtp_server):
+    for n in range(30):
+        send_email(f"Reset {n}", [f"user{n}@example.com"], "Follow the link")
+    sender = mail_app.extensions["mail_sender"]
+    assert sender.flush(timeout=10)
+
+    assert len(smtp_server.messages) == 30
+    assert len(sender.workers) == mail_app.config["MAIL_WORKERS"]
+    assert smtp_server.connections < 30
+    received = {m["message"]["Subject"] for m in smtp_server.messages}
+    assert received == {f"Reset {n}" for n in range(30)}
+
+
+def test_connection_failures_are_retried(mail_app, smtp_server):
+    smtp_server.fail_next = 2
+    send_email("Welcome", ["new@example.com"], "Your account")
+    assert mail_app.extensions["mail_sender"].flush(timeout=10)
+
+    assert [m["recipients"] for m in smtp_server.messages] == [["new@example.com"]]
+    assert smtp_server.connections == 3
+
+
+def test_gives_up_after_max_attempts_and_skips_refused_recipients(mail_app, smtp_server, caplog):
+    smtp_server.fail_next = 3
+    send_email("Lost", ["a@example.com"], "never delivered")
+    assert mail_app.extensions["mail_sender"].flush(timeout=10)
+    assert smtp_server.messages == []
+    assert "Giving up on 1 email(s)" in caplog.text
+
+    smtp_server.refused.add("ghost@example.com")
+    send_email("Bounce", ["ghost@example.com"], "rejected")
+    send_email("Hello", ["real@example.com"], "delivered")
+    assert mail_app.extensions["mail_sender"].flush(timeout=10)
+    assert [m["recipients"] for m in smtp_server.messages] == [["real@example.com"]]
+
+
+def test_a_rejected_message_does_not_hold_back_the_others(mail_app, smtp_server, caplog):
+    smtp_server.rejected_subjects.add("Spam")
+    for subject in ("First", "Spam", "Last"):
+        send_email(subject, ["someone@example.com"], "body")
+    assert mail_app.extensions["mail_sender"].flush(timeout=10)
+
+    assert sorted(m["message"]["Subject"] for m in smtp_server.messages) == ["First", "Last"]
+    assert "554" in caplog.text and "retrying" not in caplog.text
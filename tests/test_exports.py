@@ -0,0 +1,77 @@
+import csv
+import gzip
+import io
+from openpyxl import load_workbook
+from models import Item, Staff
+from extensions import db
+from exports import iter_items_csv, write_xlsx
+
+
+def test_csv_export_is_chunked(login):
+    user = login("exporter")
+    for i in range(7):
+        db.session.add(Item(name=f"Item {i}", quantity=i, serial_number=f"SN-{i}", user_id=user.id))
+    db.session.commit()
+
+    chunks = list(iter_items_csv(user.id, chunk_size=3))
+    assert len(chunks) == 3  # header + 3 rows, 3 rows, 1 row
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0][:2] == ["id", "name"]
+    assert [r[1] for r in rows[1:]] == [f"Item {i}" for i in range(7)]
+
+
+def test_csv_export_route_streams_gzip(client, login):
+    user = login("gzip_exporter")
+    db.session.add(Item(name="Écran, 24\"", quantity=3, user_id=user.id))
+    db.session.commit()
+
+    response = client.get('/export/csv')
+    assert response.is_streamed
+    assert "Content-Encoding" not in response.headers
+    assert "Écran, 24\"".encode("utf-8") in response.get_data()
+
+    response = client.get('/export/csv', headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = gzip.decompress(response.get_data()).decode("utf-8")
+    assert list(csv.reader(io.StringIO(body)))[1][1] == "Écran, 24\""
+
+
+def test_write_xlsx_streams_rows_into_each_sheet():
+    output = io.BytesIO()
+    write_xlsx(output, [
+        ("Items", ["Name", "Quantity"], ((f"Item {i}", i) for i in range(2500))),
+        ("Info", ["Note"], [["done"]]),
+    ])
+    output.seek(0)
+    workbook = load_workbook(output, read_only=True)
+    assert workbook.sheetnames == ["Items", "Info"]
+    rows = list(workbook["Items"].values)
+    assert rows[0] == ("Name", "Quantity")
+    assert len(rows) == 2501 and rows[-1] == ("Item 2499", 2499)
+
+
+def test_staff_list_export(client, login):
+    user = login("staff_lister")
+    db.session.add_all([Staff(name="Yasmine", email="y@example.com", user_id=user.id),
+                        Staff(name="Bilal", department="IT", user_id=user.id)])
+    db.session.commit()
+
+    response = client.get('/reports/staff/all')
+    assert response.status_code == 200
+    sheet = load_workbook(io.BytesIO(response.data))["Personnel"]
+    assert [row[0] for row in sheet.values] == ["Nom", "Bilal", "Yasmine"]
+
+
+def test_global_report_excel_has_the_selected_columns(client, login, app, tmp_path):
+    app.config["JOBS_DIR"] = str(tmp_path)
+    user = login("global_reporter")
+    db.session.add_all([Item(name=f"Poste {i}", quantity=i, user_id=user.id) for i in range(3)])
+    db.session.commit()
+
+    response = client.post('/reports/global', data={"format": "excel", "columns": ["name", "created_at"]})
+    assert response.status_code == 200  # inline job: the file is sent straight away
+    rows = list(load_workbook(io.BytesIO(response.data))["Rapport inventaire"].values)
+    assert rows[0] == ("Article", "Date de création")
+    assert [r[0] for r in rows[1:]] == ["Poste 0", "Poste 1", "Poste 2"]
+    assert len(rows[1][1]) == len("2026-01-01")
@@ -0,0 +1,51 @@
+from sqlalchemy.exc import OperationalError
+from extensions import db
+
+
+def test_ready_reports_each_check_with_timings(client):
+    response = client.get('/health/ready')
+    assert response.status_code == 200
+    report = response.json
+    assert report["status"] == "ok"
+    assert set(report["checks"]) == {"database", "pool", "uploads", "jobs", "disk"}
+    assert report["checks"]["database"]["latency_ms"] >= 0
+    assert all("ms" in check for check in report["checks"].values())
+
+
+def test_results_are_cached_between_probes(client, app, monkeypatch):
+    calls = []
+    real_execute = db.session.execute
+
+    def counting_execute(statement, *args, **kwargs):
+        calls.append(str(statement))
+        return real_execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db.session, "execute", counting_execute)
+    assert client.get('/health/ready').json["cached"] is False
+    assert client.get('/health/ready').json["cached"] is True
+    assert calls.count("SELECT 1") == 1
+
+    app.extensions["health"]["expires"] = 0  # entry expired
+    assert client.get('/health/ready').json["cached"] is False
+    assert calls.count("SELECT 1") == 2
+
+
+def test_dead_database_takes_the_worker_out_of_rotation(client, app, monkeypatch):
+    app.config["HEALTH_CACHE_SECONDS"] = 0
+
+    def dead(*args, **kwargs):
+        raise OperationalError("SELECT 1", {}, Exception("server closed the connection unexpectedly"))
+
+    monkeypatch.setattr(db.session, "execute", dead)
+    response = client.get('/health/ready')
+    assert response.status_code == 503
+    assert response.json["status"] == "fail"
+    assert "server closed" in response.json["checks"]["database"]["error"]
+
+
+def test_crossed_thresholds_are_degraded_not_failed(client, app):
+    app.config["HEALTH_MIN_FREE_MB"] = 10 ** 12
+    response = client.get('/health/ready')
+    assert response.status_code == 200
+    assert response.json["status"] == "degraded"
+    assert response.json["checks"]["disk"]["status"] == "degraded"
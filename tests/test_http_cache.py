@@ -0,0 +1,57 @@
+from extensions import db
+from models import Item, Staff
+
+
+def _item(user, name="Router"):
+    item = Item(name=name, quantity=3, user_id=user.id)
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def test_unchanged_item_page_is_not_rendered_again(client, login):
+    user = login("etag_user")
+    item = _item(user)
+
+    first = client.get(f'/item/{item.id}')
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"] and "private" in first.headers["Cache-Control"]
+    assert first.last_modified is not None
+
+    again = client.get(f'/item/{item.id}', headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    since = client.get(f'/item/{item.id}', headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+
+def test_changes_to_the_item_or_its_staff_invalidate_the_page(client, login):
+    user = login("etag_editor")
+    staff = Staff(name="Amal", user_id=user.id)
+    db.session.add(staff)
+    item = _item(user)
+    item.set_assigned_staff(staff)
+    db.session.commit()
+    etag = client.get(f'/item/{item.id}').headers["ETag"]
+
+    client.post(f'/staff/edit/{staff.id}', data={"name": "Amal B."})
+    changed = client.get(f'/item/{item.id}', headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert b"Amal B." in changed.data
+
+    item = db.session.get(Item, item.id)
+    assert item.updated_at > item.created_at
+
+
+def test_pending_flash_messages_are_always_rendered(client, login):
+    user = login("flash_user")
+    item = _item(user)
+    etag = client.get(f'/item/{item.id}').headers["ETag"]
+
+    with client.session_transaction() as session:
+        session["_flashes"] = [("success", "Item updated!")]
+    response = client.get(f'/item/{item.id}', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert b"Item updated!" in response.data
@@ -0,0 +1,105 @@
+import hashlib
+import io
+import os
+from PIL import Image
+from extensions import db
+from models import Item
+from images import derivative_path, image_url
+
+
+def _photo(size=(1200, 900), mode="RGB", fmt="JPEG"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, "red").save(buffer, fmt)
+    buffer.seek(0)
+    return buffer
+
+
+def test_upload_builds_small_derivatives(client, login, app, tmp_path):
+    app.root_path = str(tmp_path)
+    user = login("photographer")
+
+    client.post('/add', data={"name": "Laptop", "quantity": 1, "image": (_photo(), "phone.jpg")},
+                content_type="multipart/form-data")
+    item = Item.query.filter_by(user_id=user.id).one()
+
+    with app.test_request_context():
+        thumb = derivative_path("uploads", item.image_filename, "thumb", "webp")
+        medium = derivative_path("uploads", item.image_filename, "medium", "jpg")
+    with Image.open(thumb) as im:
+        assert im.size == (96, 96)
+    with Image.open(medium) as im:
+        assert im.size == (640, 480)
+
+    page = client.get('/')
+    assert b"/media/uploads/thumb/webp/" in page.data
+    assert f"uploads/{item.image_filename}".encode() not in page.data  # never the original
+
+
+def test_derivatives_are_built_lazily_and_cached(client, app, tmp_path):
+    app.root_path = str(tmp_path)
+    os.makedirs(tmp_path / "static" / "avatars")
+    Image.new("RGBA", (300, 200), (0, 0, 255, 128)).save(tmp_path / "static" / "avatars" / "old.png")
+
+    response = client.get('/media/avatars/thumb/jpg/old.png')
+    assert response.status_code == 200
+    assert response.mimetype == "image/jpeg"
+    assert Image.open(io.BytesIO(response.data)).size == (96, 96)
+    # legacy flat names may be overwritten: revalidate instead of caching forever
+    assert "immutable" not in response.headers["Cache-Control"]
+
+    assert client.get('/media/avatars/huge/jpg/old.png').status_code == 404
+    assert client.get('/media/avatars/thumb/jpg/missing.png').status_code == 404
+    assert client.get('/media/secrets/thumb/jpg/old.png').status_code == 404
+
+
+def test_cloudinary_urls_use_on_the_fly_transformations(app):
+    url = "https://res.cloudinary.com/demo/image/upload/v1/inventory_app/uploads/x.jpg"
+    with app.test_request_context():
+        assert image_url("uploads", url, "thumb", "webp") == \
+            "https://res.cloudinary.com/demo/image/upload/c_fill,w_96,h_96,q_auto,f_webp/v1/inventory_app/uploads/x.jpg"
+
+
+def _add_item(client, name, photo_bytes):
+    client.post('/add', data={"name": name, "quantity": 1, "image": (io.BytesIO(photo_bytes), "IMG_0001.JPG")},
+                content_type="multipart/form-data")
+    return Item.query.filter_by(name=name).one()
+
+
+def test_identical_uploads_share_one_blob_until_last_reference(client, login, app, tmp_path):
+    app.root_path = str(tmp_path)
+    login("deduper")
+    photo = _photo().getvalue()
+
+    first = _add_item(client, "Chaise 1", photo)
+    second = _add_item(client, "Chaise 2", photo)
+    assert first.image_filename == second.image_filename
+    digest = hashlib.sha256(photo).hexdigest()
+    assert first.image_filename == f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    blob = tmp_path / "static" / "uploads" / first.image_filename
+    with app.test_request_context():
+        thumb = derivative_path("uploads", first.image_filename, "thumb", "webp")
+
+    client.post(f'/delete/{first.id}')
+    assert blob.exists() and os.path.exists(thumb)  # still used by "Chaise 2"
+
+    client.post(f'/delete/{second.id}')
+    assert not blob.exists() and not os.path.exists(thumb)
+
+
+def test_content_addressed_images_are_immutable_with_etags(client, login, app, tmp_path):
+    app.root_path = str(tmp_path)
+    login("etagger")
+    item = _add_item(client, "Ecran", _photo().getvalue())
+
+    url = f'/media/uploads/thumb/webp/{item.image_filename}'
+    response = client.get(url)
+    assert response.status_code == 200
+    cache_control = response.headers["Cache-Control"]
+    assert "immutable" in cache_control and "max-age=31536000" in cache_control
+
+    revalidated = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    original = client.get(f'/media/uploads/original/{item.image_filename}')
+    assert original.status_code == 200 and original.mimetype == "image/jpeg"
+    assert client.get('/media/uploads/original/../../app.py').status_code == 404
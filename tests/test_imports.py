@@ -0,0 +1,97 @@
+import io
+import openpyxl
+from models import Item, Staff
+from extensions import db
+from imports import import_items_csv, import_staff_excel, report_path
+
+CSV = (
+    "name,quantity,assigned_date,serial_number\n"
+    "Laptop,3,2025-01-02,SN-1\n"
+    ",4,,\n"
+    "Chaise,beaucoup,,\n"
+    "Ecran,2,02/01/2025,\n"
+    "Clavier,,,SN-2\n"
+    "Souris,999999,,\n"
+    "Projecteur,1,,\n"
+)
+
+
+def test_bulk_import_reports_rejected_rows(login, app):
+    user = login("importer")
+
+    result = import_items_csv(io.BytesIO(CSV.encode("utf-8")), user.id, chunk_size=2)
+
+    assert result.imported == 3
+    assert result.rejected == 4
+    names = sorted(i.name for i in Item.query.filter_by(user_id=user.id))
+    assert names == ["Clavier", "Laptop", "Projecteur"]
+    assert Item.query.filter_by(name="Clavier").one().quantity == 0
+
+    with open(report_path(user.id, result.report_token), encoding="utf-8") as f:
+        report = f.read().splitlines()
+    assert report[0] == "line,reason,name,quantity,assigned_date,serial_number"
+    assert report[1].startswith("3,name is required")
+    assert report[2].startswith("4,quantity 'beaucoup' is not a whole number")
+    assert "is not YYYY-MM-DD" in report[3]
+    assert "quantity must be between" in report[4]
+
+
+def test_import_route_offers_error_report(client, login):
+    login("csv_uploader")
+    data = {"file": (io.BytesIO(CSV.encode("utf-8")), "items.csv")}
+    response = client.post('/import/csv', data=data, content_type="multipart/form-data")
+    assert response.status_code == 302
+    assert "report=" in response.headers["Location"]
+
+    token = response.headers["Location"].split("report=")[1]
+    report = client.get(f'/import/csv/report/{token}')
+    assert report.status_code == 200
+    assert b"name is required" in report.data
+
+    assert client.get('/import/csv/report/..%2Fsecret').status_code == 404
+
+
+def _staff_workbook(path, rows, header=("Nom", "Email", "Téléphone", "Fonction", "Département")):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def test_staff_sheet_is_streamed_in_chunks(login, tmp_path):
+    user = login("hr_manager")
+    rows = [(f"Agent {n}", f"agent{n}@example.com", 600000000 + n, "Technicien", "IT") for n in range(2500)]
+    rows[10] = (None, "nobody@example.com", None, None, None)
+    rows[20] = ("Trop long", None, "1" * 40, None, None)
+    rows.insert(30, (None, None, None, None, None))  # blank line: ignored
+    progress = []
+
+    result = import_staff_excel(_staff_workbook(tmp_path / "staff.xlsx", rows), user.id, chunk_size=1000,
+                                on_progress=lambda imported, rejected: progress.append(imported))
+
+    assert result.imported == 2498
+    assert result.rejected == 2
+    assert progress == [998, 1998, 2498]
+    agent = Staff.query.filter_by(user_id=user.id, name="Agent 5").one()
+    assert (agent.email, agent.phone, agent.position, agent.department) == \
+        ("agent5@example.com", "600000005", "Technicien", "IT")
+
+    with open(report_path(user.id, result.report_token), encoding="utf-8") as f:
+        report = f.read().splitlines()
+    assert report[1].startswith("12,name is required")
+    assert report[2].startswith("22,phone is longer than 20 characters")
+
+
+def test_staff_import_accepts_english_headers(client, login, tmp_path):
+    user = login("hr_english")
+    path = _staff_workbook(tmp_path / "staff_en.xlsx", [("Sam", "sam@example.com", "0102", "Clerk", "Finance")],
+                           header=(" NAME ", "Email", "Phone", "Position", "Department"))
+
+    with open(path, "rb") as f:
+        response = client.post('/staff/import', data={"file": (f, "staff_en.xlsx")},
+                               content_type="multipart/form-data")
+    assert response.status_code == 302
+    assert Staff.query.filter_by(user_id=user.id, name="Sam").one().department == "Finance"
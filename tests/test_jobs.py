@@ -0,0 +1,100 @@
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from extensions import db
+from models import Item, Job, Staff
+from jobs import HANDLERS, enqueue, job_handler, work
+
+CSV = "name,quantity\nLaptop,3\n,4\nEcran,2\n"
+
+
+@pytest.fixture
+def flaky_handler():
+    @job_handler("test_flaky")
+    def flaky(ctx):
+        if ctx.job.attempts < ctx.params["succeed_on"]:
+            raise RuntimeError("boom")
+        return {"attempt": ctx.job.attempts}
+
+    yield flaky
+    del HANDLERS["test_flaky"]
+
+
+def test_csv_import_runs_inline_by_default(client, login, app, tmp_path):
+    app.config["JOBS_DIR"] = str(tmp_path)
+    user = login("inline_user")
+
+    data = {"file": (io.BytesIO(CSV.encode("utf-8")), "items.csv")}
+    response = client.post('/import/csv', data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 302
+    assert "report=" in response.headers["Location"]
+    job = Job.query.one()
+    assert job.status == "done"
+    assert json.loads(job.result)["imported"] == 2
+    assert Item.query.filter_by(user_id=user.id).count() == 2
+    # the uploaded copy is removed once the job has finished
+    assert not list((tmp_path / "inputs").iterdir())
+
+
+def test_async_job_is_picked_up_by_worker(client, login, app, tmp_path):
+    app.config.update(JOBS_ASYNC=True, JOBS_DIR=str(tmp_path))
+    user = login("async_user")
+    staff = Staff(name="Amira", user_id=user.id)
+    db.session.add(staff)
+    db.session.commit()
+
+    response = client.get(f'/reports/staff/{staff.id}?format=excel')
+    job_id = Job.query.one().id
+    assert response.headers["Location"].endswith(f"/jobs/{job_id}")
+    assert client.get(f'/jobs/{job_id}/status').json["status"] == "queued"
+    assert client.get(f'/jobs/{job_id}/download').status_code == 404
+
+    with app.app_context():  # the worker runs outside any request
+        work(once=True)
+
+    status = client.get(f'/jobs/{job_id}/status').json
+    assert status["status"] == "done"
+    download = client.get(status["download_url"])
+    assert download.status_code == 200
+    assert download.data[:2] == b"PK"  # xlsx is a zip file
+
+
+def test_failed_job_is_retried_with_backoff(app, login, flaky_handler):
+    user_id = login("retry_user").id
+
+    job = enqueue("test_flaky", user_id, {"succeed_on": 2}, max_attempts=2)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert "boom" in job.error
+    assert job.run_after > datetime.utcnow()
+
+    job_id = job.id
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    with app.app_context():  # the worker runs outside any request
+        work(once=True)
+
+    job = db.session.get(Job, job_id)
+    assert job.status == "done"
+    assert json.loads(job.result) == {"attempt": 2}
+
+    failed = enqueue("test_flaky", user_id, {"succeed_on": 5})
+    assert failed.status == "failed"
+
+
+def test_jobs_are_private_to_their_owner(client, login, app):
+    owner = login("job_owner")
+    job = Job(kind="global_report", user_id=owner.id, status="queued")
+    db.session.add(job)
+    db.session.commit()
+
+    assert client.get(f'/jobs/{job.id}').status_code == 200
+    login("someone_else")
+    assert client.get(f'/jobs/{job.id}/status').status_code == 404
+    assert client.get(f'/jobs/{job.id}/download').status_code == 404
+
+
+def test_handlers_are_registered(app):
+    assert {"staff_report", "global_report", "import_items_csv", "import_staff"} <= set(HANDLERS)
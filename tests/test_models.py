@@ -18,3 +18,12 @@ def test_create_item(client):
     db.session.commit()
 
     assert item.id is not None
+
+def test_hot_query_indexes_exist(client):
+    inspector = db.inspect(db.engine)
+    item_indexes = {ix["name"] for ix in inspector.get_indexes("item")}
+    staff_indexes = {ix["name"] for ix in inspector.get_indexes("staff")}
+
+    assert {"ix_item_user_created", "ix_item_user_quantity",
+            "ix_item_user_assigned_to", "ix_item_user_category"} <= item_indexes
+    assert "ix_staff_user_name" in staff_indexes
@@ -0,0 +1,80 @@
+import datetime
+import pytest
+from models import Item
+from extensions import db
+from pagination import keyset_paginate, estimate_count, encode_cursor, decode_cursor, InvalidCursor
+
+
+def _seed(user, n):
+    base = datetime.datetime(2025, 1, 1)
+    for i in range(n):
+        # pairs of items share a timestamp so the id tie-breaker is exercised
+        db.session.add(Item(name=f"Item {i}", quantity=10, user_id=user.id,
+                            created_at=base + datetime.timedelta(minutes=i // 2)))
+    db.session.commit()
+
+
+def test_cursor_round_trip():
+    ts = datetime.datetime(2025, 3, 4, 5, 6, 7, 890)
+    token = encode_cursor(ts, 42, "prev")
+    assert decode_cursor(token) == (ts, 42, "prev")
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_walks_every_row_once(login):
+    user = login("pager")
+    _seed(user, 23)
+    query = Item.query.filter_by(user_id=user.id)
+    expected = [i.id for i in query.order_by(Item.created_at.desc(), Item.id.desc())]
+
+    seen, pages, cursor = [], [], None
+    while True:
+        page = keyset_paginate(query, Item, cursor=cursor, per_page=5)
+        pages.append(page)
+        seen.extend(i.id for i in page.items)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+
+    assert seen == expected
+    assert len(pages) == 5
+
+    # walking back from the last page returns the previous page exactly
+    back = keyset_paginate(query, Item, cursor=pages[-1].prev_cursor, per_page=5)
+    assert [i.id for i in back.items] == [i.id for i in pages[-2].items]
+    assert back.has_next
+
+    first = keyset_paginate(query, Item, cursor=pages[1].prev_cursor, per_page=5)
+    assert [i.id for i in first.items] == expected[:5]
+    assert not first.has_prev
+
+    assert keyset_paginate(query, Item, per_page=5, total="exact").total == 23
+    assert keyset_paginate(query, Item, per_page=5, total="approx").total == 23
+
+
+def test_index_switches_to_cursor_mode(client, app, login):
+    _seed(login("big_tenant"), 8)
+
+    response = client.get('/')
+    assert b"Page 1 / 2" in response.data
+
+    app.config["KEYSET_PAGINATION_THRESHOLD"] = 5
+    response = client.get('/')
+    assert b"8 articles" in response.data
+    assert b"cursor=" in response.data
+
+    assert client.get('/?cursor=garbage').status_code == 400
+
+
+def test_estimate_count_uses_planner_on_postgres(login):
+    # The EXPLAIN path only exists on Postgres; the suite runs on SQLite
+    # unless DATABASE_URL points at a Postgres server.
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("planner estimates are Postgres-only")
+
+    user = login("estimator")
+    _seed(user, 10)
+    query = Item.query.filter(Item.user_id == user.id, Item.created_at >= datetime.datetime(2025, 1, 1))
+    assert isinstance(estimate_count(query), int)
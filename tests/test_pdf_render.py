@@ -0,0 +1,94 @@
+import io
+import os
+import threading
+import time
+import pytest
+from pypdf import PdfReader
+from extensions import db
+from models import Item, Staff
+from pdf_render import PdfBusy, PdfRenderer, PdfRenderError, PdfTimeout, merge_pdfs
+
+HTML = "<html><body><h1>Rapport</h1><p>Écran 24\"</p></body></html>"
+
+
+@pytest.fixture
+def renderer(app):
+    app.config.update(PDF_WORKERS=1, PDF_TIMEOUT=20)
+    renderer = PdfRenderer(app)
+    yield renderer
+    renderer.close()
+
+
+def test_pdf_is_rendered_in_a_worker_process(renderer, tmp_path):
+    path = tmp_path / "report.pdf"
+    renderer.render(HTML, str(path))
+    assert path.read_bytes()[:4] == b"%PDF"
+    assert renderer.call(os.getpid) != os.getpid()
+
+
+def test_hung_and_crashed_workers_are_replaced(renderer, app, tmp_path):
+    app.config["PDF_TIMEOUT"] = 1
+    with pytest.raises(PdfTimeout):
+        renderer.call(time.sleep, 30)
+
+    app.config["PDF_TIMEOUT"] = 20
+    with pytest.raises(PdfRenderError):
+        renderer.call(os._exit, 1)
+
+    with pytest.raises(PdfRenderError):
+        renderer.call(bytearray, 4 * 1024 ** 3)  # over PDF_MAX_MEMORY_MB
+
+    renderer.render(HTML, str(tmp_path / "after.pdf"))
+    assert (tmp_path / "after.pdf").exists()
+
+
+def test_pending_renders_are_bounded(app):
+    app.config.update(PDF_WORKERS=1, PDF_MAX_PENDING=1, PDF_QUEUE_TIMEOUT=0.2)
+    renderer = PdfRenderer(app)
+    try:
+        busy = threading.Thread(target=renderer.call, args=(time.sleep, 3))
+        busy.start()
+        time.sleep(0.5)
+        with pytest.raises(PdfBusy):
+            renderer.call(time.sleep, 0)
+        busy.join()
+    finally:
+        renderer.close()
+
+
+def test_staff_pdf_report(client, login, app):
+    app.config["PDF_WORKERS"] = 1
+    user = login("pdf_reporter")
+    staff = Staff(name="Salma", user_id=user.id)
+    db.session.add(staff)
+    db.session.commit()
+
+    response = client.get(f'/reports/staff/{staff.id}?format=pdf')
+    assert response.status_code == 200
+    assert response.data[:4] == b"%PDF"
+
+
+def test_large_global_pdf_is_rendered_in_parts_and_merged(client, login, app):
+    app.config.update(PDF_WORKERS=2, GLOBAL_PDF_CHUNK_ROWS=40)
+    user = login("chunked_reporter")
+    db.session.add_all([Item(name=f"Poste {i:03d}", quantity=i, user_id=user.id) for i in range(100)])
+    db.session.commit()
+
+    response = client.post('/reports/global', data={"format": "pdf", "columns": ["name", "quantity"]})
+    assert response.status_code == 200
+    pages = [page.extract_text() for page in PdfReader(io.BytesIO(response.data)).pages]
+    text = "\n".join(pages)
+    assert all(f"Poste {i:03d}" in text for i in range(100))
+    assert text.count("Rapport global d'inventaire") == 1  # title on the first part only
+    assert f"{len(pages)} / {len(pages)}" in pages[-1]
+    assert "1 / " in pages[0]
+
+
+def test_merge_numbers_pages_across_parts(renderer, tmp_path):
+    parts = []
+    for n in range(3):
+        parts.append(str(tmp_path / f"part{n}.pdf"))
+        renderer.render(f"<p>Part {n}</p>", parts[-1])
+    assert merge_pdfs(parts, str(tmp_path / "all.pdf")) == 3
+    pages = PdfReader(str(tmp_path / "all.pdf")).pages
+    assert "Part 2" in pages[2].extract_text() and "3 / 3" in pages[2].extract_text()
@@ -0,0 +1,64 @@
+import json
+import logging
+import pytest
+from extensions import db
+from models import Item
+
+
+PROFILED = {
+    'PROFILER_ENABLED': True,
+    'PROFILER_DUPLICATE_THRESHOLD': 3,
+    'SLOW_QUERY_MS': 0,
+}
+
+
+@pytest.mark.parametrize("app_config", [PROFILED])
+def test_server_timing_and_slow_query_log(client, login, caplog):
+    admin = login("root_admin", role="admin")
+    db.session.add(Item(name="Laptop", user_id=admin.id))
+    db.session.commit()
+
+    with caplog.at_level(logging.WARNING, logger="inventory.slow_query"):
+        response = client.get('/')
+
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert "queries" in timing and "render;dur=" in timing and "total;dur=" in timing
+
+    slow = [json.loads(r.getMessage()) for r in caplog.records]
+    assert any(e["event"] == "slow_query" and e["endpoint"] == "main.index" for e in slow)
+
+    page = client.get('/admin/profiler')
+    assert page.status_code == 200
+    assert b"main.index" in page.data
+
+
+@pytest.mark.parametrize("app_config", [PROFILED])
+def test_repeated_statements_are_flagged(app, client, login, caplog):
+    ids = []
+
+    @app.route('/_n_plus_one')
+    def n_plus_one():
+        # one SELECT per item: the classic N+1
+        return {"names": [db.session.get(Item, i).name for i in ids]}
+
+    admin = login("root_admin", role="admin")
+    items = [Item(name=f"Item {i}", user_id=admin.id) for i in range(4)]
+    db.session.add_all(items)
+    db.session.commit()
+    ids.extend(i.id for i in items)
+    db.session.expunge_all()
+
+    with caplog.at_level(logging.WARNING, logger="inventory.slow_query"):
+        client.get('/_n_plus_one')
+
+    repeated = [json.loads(r.getMessage()) for r in caplog.records]
+    repeated = [e for e in repeated if e["event"] == "repeated_statements"]
+    assert repeated and repeated[0]["statements"][0]["count"] == 4
+
+
+def test_profiler_page_is_admin_only_and_off_by_default(client, login):
+    login("not_admin")
+    response = client.get('/admin/profiler')
+    assert response.status_code == 302
+    assert "Server-Timing" not in client.get('/').headers
@@ -0,0 +1,91 @@
+import io
+import json
+from datetime import datetime
+from PIL import Image
+from extensions import db
+from jobs import work
+from models import Item, Job
+
+
+def _photo():
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 150), "green").save(buffer, "JPEG")
+    buffer.seek(0)
+    return buffer
+
+
+def _use_stub(app, tmp_path):
+    app.root_path = str(tmp_path)
+    app.config["REMOTE_STORAGE"] = "stub"
+    app.config["REMOTE_STUB_DIR"] = str(tmp_path / "remote")
+    app.config["REMOTE_STUB_BASE_URL"] = "https://cdn.example.com"
+
+
+def _add_item(client, name):
+    client.post('/add', data={"name": name, "quantity": 1, "image": (_photo(), "photo.jpg")},
+                content_type="multipart/form-data")
+
+
+def test_upload_is_pushed_and_swapped_to_the_remote_url(client, login, app, tmp_path):
+    _use_stub(app, tmp_path)
+    login("uploader")
+
+    _add_item(client, "Camera")
+    item = Item.query.filter_by(name="Camera").one()
+    job = Job.query.filter_by(kind="remote_upload").one()
+    local_name = json.loads(job.params)["filename"]
+    # queued even with JOBS_ASYNC off: the request doesn't wait for the upload
+    assert job.status == "queued"
+    assert item.image_filename == local_name
+
+    with app.app_context():  # the worker runs outside any request
+        work(once=True)
+    db.session.expire_all()
+    assert job.status == "done"
+    assert item.image_filename.startswith("https://cdn.example.com/uploads/")
+    assert (tmp_path / "remote" / "uploads" / item.image_filename.rsplit("/", 1)[1]).exists()
+    assert not (tmp_path / "static" / "uploads" / local_name).exists()
+
+
+def test_failed_uploads_are_retried_with_backoff(client, login, app, tmp_path, monkeypatch):
+    _use_stub(app, tmp_path)
+    app.config["JOBS_ASYNC"] = True
+    login("flaky")
+    calls = []
+
+    def flaky_upload(self, path, folder, public_id):
+        calls.append(path)
+        raise ConnectionError("remote store unavailable")
+
+    monkeypatch.setattr("storage_utils.LocalStubStorage.upload", flaky_upload)
+    _add_item(client, "Tripod")
+    item = Item.query.filter_by(name="Tripod").one()
+    local_name, item_id = item.image_filename, item.id
+    assert not local_name.startswith("http")  # the request did not wait for the upload
+
+    with app.app_context():
+        work(once=True)
+    job = Job.query.filter_by(kind="remote_upload").one()
+    assert len(calls) == 1
+    assert job.status == "queued" and job.attempts == 1
+    assert "remote store unavailable" in job.error
+    assert job.run_after > datetime.utcnow()
+    assert (tmp_path / "static" / "uploads" / local_name).exists()  # still served locally
+
+    monkeypatch.undo()
+    job.run_after = datetime.utcnow()
+    db.session.commit()
+    with app.app_context():
+        work(once=True)
+    assert db.session.get(Item, item_id).image_filename.startswith("https://cdn.example.com/")
+    assert Job.query.filter_by(kind="remote_upload").one().status == "done"
+
+
+def test_nothing_is_queued_without_a_remote_store(client, login, app, tmp_path):
+    app.root_path = str(tmp_path)
+    app.config["REMOTE_STORAGE"] = ""
+    login("local_only")
+
+    _add_item(client, "Lamp")
+    assert Job.query.filter_by(kind="remote_upload").count() == 0
+    assert not Item.query.filter_by(name="Lamp").one().image_filename.startswith("http")
@@ -0,0 +1,63 @@
+import io
+import os
+from extensions import db
+from models import Item, Job, Staff
+import report_cache
+from report_cache import data_version
+from imports import import_items_csv
+
+
+def test_item_and_staff_writes_bump_data_version(login):
+    user = login("versioned")
+    assert data_version(user.id) == 0
+
+    item = Item(name="Laptop", user_id=user.id)
+    db.session.add(item)
+    db.session.commit()
+    assert data_version(user.id) == 1
+
+    item.quantity = 3
+    db.session.commit()
+    db.session.add(Staff(name="Amira", user_id=user.id))
+    db.session.commit()
+    assert data_version(user.id) == 3
+
+    import_items_csv(io.BytesIO(b"name\nEcran\nClavier\n"), user.id)
+    assert data_version(user.id) == 4
+
+
+def test_report_is_served_from_cache_until_data_changes(client, login, app, tmp_path):
+    app.config.update(REPORT_CACHE_DIR=str(tmp_path / "cache"), JOBS_DIR=str(tmp_path / "jobs"))
+    user = login("cached_reports")
+    db.session.add(Item(name="Laptop", category="IT", user_id=user.id))
+    db.session.commit()
+    form = {"format": "excel", "columns": ["name", "category"]}
+
+    first = client.post('/reports/global', data=form)
+    assert first.status_code == 200
+    assert Job.query.count() == 1
+
+    again = client.post('/reports/global', data=form)
+    assert again.data == first.data
+    assert Job.query.count() == 1  # no job, no rendering
+
+    client.post('/reports/global', data={"format": "excel", "columns": ["name"]})
+    assert Job.query.count() == 2  # other columns, other artifact
+
+    db.session.add(Item(name="Ecran", user_id=user.id))
+    db.session.commit()
+    client.post('/reports/global', data=form)
+    assert Job.query.count() == 3
+
+
+def test_eviction_drops_least_recently_used(app, tmp_path):
+    app.config["REPORT_CACHE_DIR"] = str(tmp_path)
+    for i, name in enumerate(["old", "used", "new"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    os.utime(tmp_path / "used", (2000, 2000))  # a cache hit touches the file
+    report_cache.evict(250)
+
+    assert sorted(os.listdir(tmp_path)) == ["new", "used"]
@@ -0,0 +1,67 @@
+from models import User, Item, Staff
+from extensions import db
+from search_index import search_items, search_staff, rebuild_search_index
+
+
+def _names(query):
+    return [i.name for i in query.all()]
+
+
+def test_search_matches_codes_and_ranks_names_first(login):
+    user = login("searcher")
+    db.session.add_all([
+        Item(name="Cable HDMI", description="pour le laptop de la salle B", user_id=user.id),
+        Item(name="Laptop Dell", serial_number="SN-00420042", user_id=user.id),
+        Item(name="Chaise", reference_code="REF-77", category="mobilier", user_id=user.id),
+    ])
+    other = User(username="other_tenant", email="other_tenant@example.com")
+    other.set_password("x")
+    db.session.add(other)
+    db.session.commit()
+    db.session.add(Item(name="Laptop HP", user_id=other.id))
+    db.session.commit()
+
+    # name match outranks a description match; other tenants never leak in
+    assert _names(search_items(user.id, "laptop")) == ["Laptop Dell", "Cable HDMI"]
+    # word prefix and substring of a serial number
+    assert _names(search_items(user.id, "lapt")) == ["Laptop Dell", "Cable HDMI"]
+    assert _names(search_items(user.id, "0042")) == ["Laptop Dell"]
+    assert _names(search_items(user.id, "ref-77")) == ["Chaise"]
+    assert _names(search_items(user.id, "mobilier")) == ["Chaise"]
+    assert _names(search_items(user.id, "%")) == []
+
+
+def test_search_index_follows_updates_and_deletes(login):
+    user = login("indexer")
+    item = Item(name="Projecteur", user_id=user.id)
+    db.session.add(item)
+    db.session.commit()
+    assert _names(search_items(user.id, "projecteur")) == ["Projecteur"]
+
+    item.name = "Ecran"
+    db.session.commit()
+    assert _names(search_items(user.id, "projecteur")) == []
+    assert _names(search_items(user.id, "ecran")) == ["Ecran"]
+
+    db.session.delete(item)
+    db.session.commit()
+    assert _names(search_items(user.id, "ecran")) == []
+
+    rebuild_search_index()
+    assert _names(search_items(user.id, "ecran")) == []
+
+
+def test_staff_search_and_route(client, login):
+    user = login("hr_manager")
+    db.session.add_all([
+        Staff(name="Amira Ben Salah", department="Informatique", user_id=user.id),
+        Staff(name="Karim", email="karim@corp.tn", position="Technicien informatique", user_id=user.id),
+    ])
+    db.session.commit()
+
+    assert [s.name for s in search_staff(user.id, "informatique")] == ["Amira Ben Salah", "Karim"]
+    assert [s.name for s in search_staff(user.id, "karim")] == ["Karim"]
+
+    response = client.get('/search?q=amira')
+    assert response.status_code == 200
+    assert b"Amira Ben Salah" in response.data
@@ -0,0 +1,92 @@
+import io
+from sqlalchemy import event
+from extensions import db
+from models import Item, Staff
+from imports import import_items_csv
+from report_cache import data_version
+from search_index import search_items
+
+
+def test_item_form_links_staff_by_id(client, login):
+    user = login("assigner")
+    staff = Staff(name="Amira", user_id=user.id)
+    db.session.add(staff)
+    db.session.commit()
+
+    client.post('/add', data={"name": "Laptop", "quantity": 1, "assigned_staff_id": str(staff.id)})
+    item = Item.query.filter_by(name="Laptop").one()
+    assert item.assigned_staff_id == staff.id
+    assert item.assigned_to == "Amira"
+
+    # renaming the staff member follows through to the display name
+    client.post(f'/staff/edit/{staff.id}', data={"name": "Amira B."})
+    db.session.refresh(item)
+    assert item.assigned_to == "Amira B."
+
+    client.post(f'/edit/{item.id}', data={"name": "Laptop", "quantity": 1, "category": "", "assigned_staff_id": ""})
+    db.session.refresh(item)
+    assert item.assigned_staff_id is None
+    assert item.assigned_to is None
+
+
+def test_renaming_and_deleting_staff_update_items_in_one_statement(client, login):
+    user = login("bulk_assigner")
+    staff = Staff(name="Yanis", user_id=user.id)
+    db.session.add(staff)
+    items = [Item(name=f"Poste {n}", quantity=1, user_id=user.id) for n in range(20)]
+    db.session.add_all(items)
+    for item in items:
+        item.set_assigned_staff(staff)
+    db.session.commit()
+    version = data_version(user.id)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        client.post(f'/staff/edit/{staff.id}', data={"name": "Yanis K."})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert len([s for s in statements if s.startswith("UPDATE item ")]) == 1
+    assert not any(s.startswith("SELECT item.") for s in statements)
+    db.session.expire_all()
+    assert {i.assigned_to for i in Item.query.filter_by(user_id=user.id)} == {"Yanis K."}
+    assert data_version(user.id) > version
+
+    client.post(f'/staff/delete/{staff.id}')
+    db.session.expire_all()
+    assert {(i.assigned_staff_id, i.assigned_to) for i in Item.query.filter_by(user_id=user.id)} == {(None, None)}
+
+
+def test_cannot_assign_another_users_staff(client, login):
+    owner = login("staff_owner")
+    foreign = Staff(name="Not yours", user_id=owner.id)
+    db.session.add(foreign)
+    db.session.commit()
+
+    login("intruder")
+    client.post('/add', data={"name": "Chaise", "quantity": 1, "assigned_staff_id": str(foreign.id)})
+    assert Item.query.filter_by(name="Chaise").count() == 0
+
+
+def test_search_and_import_use_the_staff_link(login):
+    user = login("linker")
+    staff = Staff(name="Karim", department="Informatique", user_id=user.id)
+    db.session.add(staff)
+    db.session.commit()
+
+    import_items_csv(io.BytesIO(b"name,assigned_to\nEcran,Karim\nClavier,Inconnu\n"), user.id)
+    ecran = Item.query.filter_by(name="Ecran").one()
+    assert ecran.assigned_staff_id == staff.id
+    assert Item.query.filter_by(name="Clavier").one().assigned_staff_id is None
+
+    assert [i.name for i in search_items(user.id, "karim")] == ["Ecran"]
+    assert [i.name for i in search_items(user.id, "informatique")] == ["Ecran"]
+
+    db.session.delete(staff)
+    db.session.commit()
+    db.session.refresh(ecran)
+    assert ecran.assigned_staff_id is None
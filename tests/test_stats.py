@@ -0,0 +1,50 @@
+from models import User, Item
+from extensions import db
+from stats import get_inventory_stats, get_low_stock_items
+
+
+def test_inventory_stats_single_query(login):
+    user = login("stats_user")
+    other = User(username="other", email="other@example.com")
+    other.set_password("x")
+    db.session.add(other)
+    db.session.commit()
+
+    for qty in (0, 2, 4, 5, 50):
+        db.session.add(Item(name=f"Item {qty}", quantity=qty, user_id=user.id))
+    db.session.add(Item(name="Not mine", quantity=1, user_id=other.id))
+    db.session.commit()
+
+    stats = get_inventory_stats(user.id, low_stock_threshold=5)
+    assert stats.total_items == 5
+    assert stats.low_stock_count == 3
+    assert stats.total_quantity == 61
+
+    empty = get_inventory_stats(12345, low_stock_threshold=5)
+    assert empty.total_items == 0 and empty.low_stock_count == 0
+
+
+def test_low_stock_list_is_capped(client, app, login):
+    user = login("capped_user")
+    for i in range(15):
+        db.session.add(Item(name=f"Low {i}", quantity=i % 3, user_id=user.id))
+    db.session.commit()
+
+    low = get_low_stock_items(user.id, low_stock_threshold=5, limit=4)
+    assert len(low) == 4
+    assert [i.quantity for i in low] == sorted(i.quantity for i in low)
+
+    app.config["LOW_STOCK_LIST_LIMIT"] = 3
+    response = client.get('/dashboard/')
+    assert response.status_code == 200
+    assert b"+ 12 more" in response.data
+
+    # the legacy /dashboard route in main.py renders the same template
+    response = client.get('/dashboard')
+    assert response.status_code == 200
+    assert b"+ 12 more" in response.data
+    assert b"Low 0" in response.data
+
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b"Page 1 / 3" in response.data
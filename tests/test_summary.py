@@ -0,0 +1,138 @@
+import io
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from imports import import_items_csv
+from models import AssigneeSummary, CategorySummary, InventorySummary, Item, Staff, User
+from stats import compute_inventory_stats, get_inventory_stats
+from summary import check, get_categories, get_summary, rebuild
+
+
+def _stored(model, user_id):
+    return {tuple(row)[1:] for row in db.session.query(*model.__table__.c).filter(model.user_id == user_id)
+            if any(tuple(row)[-2:])}
+
+
+def test_summary_follows_item_writes(app, make_user):
+    user = make_user("rollup")
+    alice, bob = Staff(name="Alice", user_id=user.id), Staff(name="Bob", user_id=user.id)
+    db.session.add_all([alice, bob, Item(name="Old", quantity=10, category="office", user_id=user.id)])
+    db.session.commit()
+    assert get_summary(user.id).total_items == 1  # built from the item table on first read
+
+    laptop = Item(name="Laptop", quantity=2, category="it", user_id=user.id)
+    chair = Item(name="Chair", quantity=8, category="office", user_id=user.id)
+    db.session.add_all([laptop, chair])
+    laptop.set_assigned_staff(alice)
+    db.session.commit()
+
+    laptop.quantity = 20
+    laptop.category = "computers"
+    laptop.set_assigned_staff(bob)
+    db.session.commit()
+
+    db.session.delete(chair)
+    db.session.commit()
+
+    stats = get_inventory_stats(user.id)
+    assert stats == compute_inventory_stats(user.id)
+    assert (stats.total_items, stats.total_quantity, stats.low_stock_count) == (2, 30, 0)
+    assert _stored(CategorySummary, user.id) == {("computers", 1, 20), ("office", 1, 10)}
+    assert _stored(AssigneeSummary, user.id) == {(bob.id, 1, 20)}
+    assert get_categories(user.id) == ["computers", "office"]
+    assert check(user.id) == []
+
+
+def test_deleting_staff_and_bulk_imports_are_counted(app, make_user):
+    user = make_user("bulk_rollup")
+    staff = Staff(name="Karim", user_id=user.id)
+    db.session.add(staff)
+    item = Item(name="Phone", quantity=1, user_id=user.id)
+    db.session.add(item)
+    item.set_assigned_staff(staff)
+    db.session.commit()
+    get_summary(user.id)
+
+    db.session.delete(staff)
+    db.session.commit()
+    assert _stored(AssigneeSummary, user.id) == set()
+
+    result = import_items_csv(io.BytesIO(b"name,quantity,category\nCable,3,it\nDesk,9,office\n"), user.id)
+    assert result.imported == 2
+    assert get_inventory_stats(user.id) == compute_inventory_stats(user.id)
+    assert get_summary(user.id).low_stock_count == 2
+    assert check(user.id) == []
+
+
+def test_a_failed_flush_leaves_no_stale_snapshot(app, make_user):
+    user = make_user("failed_flush")
+    item = Item(name="Mouse", quantity=3, user_id=user.id)
+    db.session.add(item)
+    db.session.commit()
+    get_summary(user.id)
+
+    item.quantity = 30
+    db.session.add(User(username="failed_flush", email="other@example.com"))  # duplicate username
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+    assert "summary_before" not in db.session.info
+
+    db.session.add(Item(name="Pad", quantity=1, user_id=user.id))
+    db.session.commit()
+    assert get_summary(user.id).total_quantity == 4
+    assert check(user.id) == []
+
+
+def test_threshold_change_rebuilds(app, make_user):
+    user = make_user("threshold")
+    db.session.add_all([Item(name="A", quantity=3, user_id=user.id), Item(name="B", quantity=7, user_id=user.id)])
+    db.session.commit()
+    assert get_inventory_stats(user.id).low_stock_count == 1
+
+    app.config["LOW_STOCK_THRESHOLD"] = 10
+    assert get_inventory_stats(user.id).low_stock_count == 2
+    assert get_summary(user.id).low_stock_threshold == 10
+
+
+def test_check_reports_drift_and_rebuild_fixes_it(app, make_user):
+    user = make_user("drifted")
+    db.session.add(Item(name="Router", quantity=4, category="it", user_id=user.id))
+    db.session.commit()
+    get_summary(user.id)
+
+    # writes that bypass the ORM events (raw SQL, another tool...)
+    db.session.execute(update(Item).values(quantity=40).execution_options(synchronize_session=False))
+    db.session.commit()
+    problems = check(user.id)
+    assert {table for table, *_ in problems} == {"inventory_summary", "category_summary"}
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["summary-check"])
+    assert result.exit_code == 1 and "summary-rebuild" in result.output
+    result = runner.invoke(args=["summary-rebuild"])
+    assert result.exit_code == 0
+    assert runner.invoke(args=["summary-check"]).exit_code == 0
+    assert db.session.get(InventorySummary, user.id).total_quantity == 40
+
+
+def test_dashboard_reads_the_summary_row(client, login):
+    user = login("dash_rollup")
+    db.session.add_all([Item(name=f"Item {n}", quantity=n, category="it", user_id=user.id) for n in range(4)])
+    db.session.commit()
+    rebuild(user.id)
+    db.session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        assert client.get('/dashboard/').status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert not any("count(" in s.lower() for s in statements)
+    assert any("inventory_summary" in s for s in statements)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+import pytest
+from extensions import db
+from models import Item, ItemTombstone
+from pagination import InvalidCursor
+from sync import CursorExpired, encode_cursor, item_changes, purge_tombstones
+
+
+@pytest.fixture
+def settled(app):
+    app.config["SYNC_SETTLE_SECONDS"] = 0
+    return app
+
+
+def _sync_all(user_id, since=None, limit=None):
+    changes = []
+    while True:
+        batch, since, has_more = item_changes(user_id, since=since, limit=limit)
+        changes.extend(batch)
+        if not has_more:
+            return changes, since
+
+
+def test_initial_sync_pages_through_everything(settled, make_user):
+    user = make_user("scanner")
+    other = make_user("someone_else")
+    db.session.add_all([Item(name=f"Item {n}", user_id=user.id) for n in range(7)])
+    db.session.add(Item(name="Not mine", user_id=other.id))
+    db.session.commit()
+
+    first, cursor, has_more = item_changes(user.id, limit=3)
+    assert len(first) == 3 and has_more
+    assert {c["op"] for c in first} == {"insert"}
+    changes, cursor = _sync_all(user.id, limit=3)
+    assert [c["item"]["name"] for c in changes] == [f"Item {n}" for n in range(7)]
+
+    # nothing new: empty batch, same cursor
+    assert item_changes(user.id, since=cursor) == ([], cursor, False)
+
+
+def test_only_changes_since_the_cursor_are_returned(settled, make_user):
+    user = make_user("handheld")
+    kept, edited, removed = (Item(name=n, user_id=user.id) for n in ("Kept", "Edited", "Removed"))
+    db.session.add_all([kept, edited, removed])
+    db.session.commit()
+    removed_id = removed.id
+    _, cursor = _sync_all(user.id)
+
+    edited.quantity = 9
+    db.session.delete(removed)
+    db.session.add(Item(name="New", user_id=user.id))
+    db.session.commit()
+
+    changes, _ = _sync_all(user.id, since=cursor)
+    summary = {(c["op"], c["item"]["name"] if "item" in c else c["id"]) for c in changes}
+    assert summary == {("update", "Edited"), ("delete", removed_id), ("insert", "New")}
+    assert next(c for c in changes if c["op"] == "update")["item"]["quantity"] == 9
+
+
+def test_recent_writes_wait_for_the_settle_window(app, make_user):
+    app.config["SYNC_SETTLE_SECONDS"] = 60
+    user = make_user("patient")
+    db.session.add(Item(name="Just added", user_id=user.id))
+    db.session.commit()
+    assert item_changes(user.id)[0] == []
+
+
+def test_invalid_and_expired_cursors(settled, make_user):
+    user = make_user("stale_client")
+    with pytest.raises(InvalidCursor):
+        item_changes(user.id, since="not-a-cursor")
+
+    old = encode_cursor(datetime.utcnow() - timedelta(days=365), "u", 1)
+    with pytest.raises(CursorExpired):
+        item_changes(user.id, since=old)
+
+
+def test_old_tombstones_are_purged(settled, make_user):
+    user = make_user("purger")
+    db.session.add_all([
+        ItemTombstone(item_id=1, user_id=user.id, deleted_at=datetime.utcnow() - timedelta(days=90)),
+        ItemTombstone(item_id=2, user_id=user.id),
+    ])
+    db.session.commit()
+    assert purge_tombstones() == 1
+    assert [t.item_id for t in ItemTombstone.query.all()] == [2]
+
+
+def test_an_update_and_a_delete_at_the_same_instant_are_both_delivered(settled, make_user):
+    user = make_user("tie_breaker")
+    instant = datetime.utcnow() - timedelta(seconds=1)
+    item = Item(name="Same time", user_id=user.id)
+    db.session.add(item)
+    db.session.commit()
+    item.updated_at = instant
+    db.session.add(ItemTombstone(item_id=424242, user_id=user.id, deleted_at=instant))
+    db.session.commit()
+
+    changes, _ = _sync_all(user.id, limit=1)
+    assert [c["op"] for c in changes] == ["insert", "delete"]
+
+
+def test_non_positive_limits_still_make_progress(settled, make_user):
+    user = make_user("negative_limit")
+    db.session.add_all([Item(name=f"Item {n}", user_id=user.id) for n in range(2)])
+    db.session.commit()
+
+    changes, cursor, has_more = item_changes(user.id, limit=-3)
+    assert len(changes) == 1 and cursor is not None and has_more
@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from extensions import db
+from models import User
+from user_cache import LocalUserCache, load_user
+
+
+@contextmanager
+def user_selects():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and 'FROM "user"' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _new_request_session():
+    # each real request starts with an empty session
+    db.session.remove()
+
+
+def test_logged_in_user_is_not_queried_on_every_request(login):
+    user_id = login("cached_user").id
+    _new_request_session()
+    assert load_user(str(user_id)).username == "cached_user"  # fills the cache
+
+    _new_request_session()
+    with user_selects() as selects:
+        user = load_user(str(user_id))
+        assert user.username == "cached_user"
+        assert user in db.session
+    assert selects == []
+
+
+def test_user_changes_invalidate_the_cache(login, app):
+    user_id = login("changing_user").id
+    cache = app.extensions["user_cache"]
+    _new_request_session()
+    load_user(user_id)
+    assert cache.get(user_id)["username"] == "changing_user"
+
+    user = db.session.get(User, user_id)
+    user.role = "admin"
+    db.session.commit()
+    assert cache.get(user_id) is None
+
+    _new_request_session()
+    assert load_user(user_id).role == "admin"
+    assert cache.get(user_id)["role"] == "admin"
+
+    # a rolled back change leaves the entry alone
+    user = db.session.get(User, user_id)
+    user.bio = "draft"
+    db.session.flush()
+    db.session.rollback()
+    assert cache.get(user_id) is not None
+
+    # rejected / deleted users are dropped as well
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+    assert cache.get(user_id) is None
+
+
+def test_approving_a_user_logs_them_in_with_fresh_data(client, login, app):
+    pending = User(username="pending_user", email="pending@example.com", is_approved=False)
+    pending.set_password("pass")
+    db.session.add(pending)
+    db.session.commit()
+    pending_id = pending.id
+    load_user(pending_id)  # cached while still pending
+
+    admin = login("the_admin")
+    admin.role = "admin"
+    db.session.commit()
+    client.post(f'/admin/approve/{pending_id}')
+
+    assert app.extensions["user_cache"].get(pending_id) is None
+    _new_request_session()
+    assert load_user(pending_id).is_approved
+
+
+def test_local_cache_ttl_and_lru(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("user_cache.time.monotonic", lambda: now[0])
+    cache = LocalUserCache(maxsize=2, ttl=10)
+
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)        # 1 is now the most recently used
+    cache.set(3, "c")   # evicts 2
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+
+    now[0] += 11
+    assert cache.get(1) is None
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from werkzeug.utils import import_string
+from extensions import db
+from models import User
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+class LocalUserCache:
+    """
+    In-process TTL + LRU cache. Each gunicorn worker has its own copy, so a
+    change made through another worker is seen after at most `ttl` seconds.
+
+    A shared backend (Redis, memcached...) only needs the same three methods;
+    set USER_CACHE_BACKEND to its import path. It is built with the
+    (maxsize, ttl) arguments and must be safe to share between threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+def _backend():
+    return current_app.extensions.get("user_cache") if has_app_context() else None
+
+
+# -----------------------------
+# LOAD
+# -----------------------------
+USER_COLUMNS = [c.key for c in User.__table__.columns]
+
+
+def load_user(user_id):
+    """
+    Returns the User for a session id, from the cache when possible.
+
+    Cached values are plain column dicts; on a hit the User is rebuilt and
+    merged into the session with load=False, so no SELECT is issued.
+    """
+    user_id = int(user_id)
+    cache = _backend()
+    if cache is None:
+        return db.session.get(User, user_id)
+
+    data = cache.get(user_id)
+    if data is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            cache.set(user_id, {k: getattr(user, k) for k in USER_COLUMNS})
+        return user
+
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def invalidate(user_id):
+    cache = _backend()
+    if cache is not None:
+        cache.delete(int(user_id))
+
+
+# -----------------------------
+# INVALIDATION
+# -----------------------------
+# Any committed change to a User row (profile, avatar, password, role,
+# approval, last login, deletion) drops its cache entry, wherever it is made.
+@event.listens_for(db.session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("user_cache_changed", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("user_cache_changed", ()):
+        invalidate(user_id)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("user_cache_changed", None)
+
+
+def init_app(app):
+    backend = app.config.get("USER_CACHE_BACKEND", "local")
+    if not backend:
+        return
+    cls = LocalUserCache if backend == "local" else import_string(backend)
+    app.extensions["user_cache"] = cls(
+        maxsize=app.config.get("USER_CACHE_MAXSIZE", 1024),
+        ttl=app.config.get("USER_CACHE_TTL", 60),
+    )